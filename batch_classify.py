@@ -0,0 +1,150 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+
+from render_message import MessageClassifier, PRACTICE, SENT
+from phone_numbers import normalize_phone
+from records import ClassifiedMessage, RawMessage
+from timestamp_parser import TIMESTAMP_PATTERN
+
+_TIMESTAMP_COLUMNS = r"^" + TIMESTAMP_PATTERN + r"\Z"
+_DAYS_IN_MONTH = np.array([31, 28, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31])
+
+
+def _valid(year, month, day, hour, minute):
+    """Element-wise: would datetime(year, month, day, hour, minute) accept these fields?"""
+    leap = (year % 4 == 0) & ((year % 100 != 0) | (year % 400 == 0))
+    days = _DAYS_IN_MONTH[np.clip(month, 1, 12) - 1] + (leap & (month == 2))
+    return (year >= 1) & (month >= 1) & (month <= 12) & (day >= 1) & (day <= days) & (hour <= 23) & (minute <= 59)
+
+
+def _sort_key(year, month, day, hour, minute):
+    """One int64 per timestamp that orders like the datetimes."""
+    return (((year * 13 + month) * 32 + day) * 24 + hour) * 60 + minute
+
+
+def _codes(values):
+    """Factorize, with None kept as a value of its own."""
+    codes, uniques = pd.factorize(np.asarray(values, dtype=object), use_na_sentinel=False)
+    return codes, [None if value is None or value != value else value for value in uniques]
+
+
+class BatchClassifier(MessageClassifier):
+    """
+    Columnar form of MessageClassifier for large imports (backfills, chat exports).
+
+    add_columns() takes arrays of senders, timestamps, texts and groups:
+    each distinct text and sender is normalized and classified once, the
+    timestamps are parsed and validated as integer arrays, and the
+    keep-latest reduction is a sort over (sender, timestamp) instead of a
+    Python loop over the messages. updates() returns exactly what
+    message_formatter would for the same messages in the same order:
+    same matcher, same TIMESTAMP_ORDER detection, same tie-breaks and the
+    same first-appearance order of senders.
+    """
+
+    def add_columns(self, senders, timestamps, texts, groups=None):
+        size = len(senders)
+        if size == 0:
+            return
+        self.count += size
+
+        # Classify every distinct text once
+        text_codes, unique_texts = pd.factorize(np.asarray([text or "" for text in texts], dtype=object))
+        unique_masks = np.fromiter((self.matcher.match_mask(text) for text in unique_texts), dtype=np.int64, count=len(unique_texts))
+        masks = unique_masks[text_codes]
+
+        rows = np.flatnonzero(masks)
+        if not rows.size:
+            return
+
+        # Timestamps of the matched messages only, like the formatter
+        fields = pd.Series(np.asarray(timestamps, dtype=object)[rows], dtype=object).str.extract(_TIMESTAMP_COLUMNS)
+        well_formed = fields.notna().all(axis=1).to_numpy()
+        rows = rows[well_formed]
+        hour, minute, first, second, year = fields[well_formed].to_numpy(dtype=np.int64).T
+
+        month_first, day_first = self._resolve_order(
+            _valid(year, first, second, hour, minute),
+            _valid(year, second, first, hour, minute),
+        )
+        parsed = month_first | day_first
+        month = np.where(month_first, first, second)[parsed]
+        day = np.where(month_first, second, first)[parsed]
+        hour, minute, year, rows = hour[parsed], minute[parsed], year[parsed], rows[parsed]
+        if not rows.size:
+            return
+
+        # (group, normalized sender) keys, numbered in order of first appearance
+        sender_codes, unique_senders = pd.factorize(np.asarray(senders, dtype=object)[rows])
+        phone_of_sender, phones = pd.factorize(np.asarray([normalize_phone(sender) for sender in unique_senders], dtype=object))
+        group_codes, group_names = _codes(np.asarray(groups, dtype=object)[rows] if groups is not None else [None] * rows.size)
+        key_codes, key_pairs = pd.factorize(group_codes * len(phones) + phone_of_sender[sender_codes])
+        keys = [(group_names[pair // len(phones)], phones[pair % len(phones)]) for pair in key_pairs]
+
+        when = _sort_key(year, month, day, hour, minute)
+        masks = masks[rows]
+        position = np.arange(rows.size)
+
+        candidates = {}
+        for slot, name in ((PRACTICE, 'practice'), (SENT, 'sent')):
+            selected = np.flatnonzero(masks & (1 << self.matcher.names.index(name)))
+            # Per key: the latest timestamp, the earliest message among equal ones
+            order = selected[np.lexsort((position[selected], -when[selected], key_codes[selected]))]
+            first_of_key = np.ones(order.size, dtype=bool)
+            first_of_key[1:] = key_codes[order][1:] != key_codes[order][:-1]
+            for index in order[first_of_key]:
+                candidates[(key_codes[index], slot)] = index
+
+        for code, key in enumerate(keys):
+            latest = self.phone_messages.get(key)
+            if latest is None:
+                latest = self.phone_messages[key] = [None, None]
+            for slot in (PRACTICE, SENT):
+                index = candidates.get((code, slot))
+                if index is None:
+                    continue
+                sent_at = datetime(int(year[index]), int(month[index]), int(day[index]), int(hour[index]), int(minute[index]))
+                if latest[slot] is None or sent_at > latest[slot].sent_at:
+                    latest[slot] = ClassifiedMessage(key[1], key[0], sent_at)
+
+    def _resolve_order(self, mdy_valid, dmy_valid):
+        """
+        Which rows parse month-first and which day-first, following the
+        TimestampParser rules in message order (and updating its detection).
+        """
+        parser = self.timestamp_parser
+        order = parser.detected or parser.order
+        if order == "MDY":
+            return mdy_valid, np.zeros_like(mdy_valid)
+        if order == "DMY":
+            return np.zeros_like(dmy_valid), dmy_valid
+
+        month_first = mdy_valid.copy()
+        day_first = dmy_valid & ~mdy_valid
+        unambiguous = np.flatnonzero(mdy_valid != dmy_valid)
+        if unambiguous.size:
+            lock = unambiguous[0]
+            parser.detected = "DMY" if dmy_valid[lock] else "MDY"
+            after = slice(lock + 1, None)
+            if parser.detected == "DMY":
+                month_first[after] = False
+                day_first[after] = dmy_valid[after]
+            else:
+                day_first[after] = False
+        return month_first, day_first
+
+    def add_messages(self, messages):
+        """add_columns() for RawMessage records (or the equivalent dicts)."""
+        messages = [RawMessage.coerce(message) for message in messages]
+        if messages:
+            senders, timestamps, texts, groups = zip(*messages)
+            self.add_columns(senders, timestamps, texts, groups)
+
+
+def classify_batch(senders, timestamps, texts, groups=None):
+    """message_formatter's result for messages given as columns."""
+    classifier = BatchClassifier()
+    classifier.add_columns(senders, timestamps, texts, groups)
+    return classifier.updates()
@@ -0,0 +1,56 @@
+"""
+Benchmark: message_formatter vs BatchClassifier on a large history import.
+
+Run from the repository root:
+    python benchmarks/bench_batch_classify.py
+"""
+
+import contextlib
+import io
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from batch_classify import BatchClassifier
+from render_message import message_formatter
+from records import RawMessage
+
+TEXTS = ["עלה תרגול", "העליתי תרגול", "שלחתי הודעה", "בוקר טוב", "תודה רבה!", "מישהו יודע מתי השיעור?", "👍"]
+
+
+def make_history(rng, count, senders):
+    messages = []
+    for _ in range(count):
+        timestamp = f"{rng.randint(0, 23):02d}:{rng.randint(0, 59):02d}, {rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/2025"
+        text = rng.choice(TEXTS)
+        if rng.random() < 0.5:
+            text = f"{text} {rng.randint(0, 10**6)}"
+        messages.append(RawMessage(f"+972 50-{rng.randint(0, senders):07d}", timestamp, text, "Course A"))
+    return messages
+
+
+def batch(messages, chunk):
+    classifier = BatchClassifier()
+    for start in range(0, len(messages), chunk):
+        classifier.add_messages(messages[start:start + chunk])
+    return classifier.updates()
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'messages':>9} {'formatter':>10} {'batch':>10} {'speedup':>8}")
+    for count in (1_000, 10_000, 100_000):
+        messages = make_history(rng, count, senders=300)
+        # The formatter prints a line per message: time it as it runs, output discarded
+        with contextlib.redirect_stdout(io.StringIO()):
+            assert batch(messages, 5000) == message_formatter(messages)
+            formatter_time = min(timeit.repeat(lambda: message_formatter(messages), number=1, repeat=3))
+            batch_time = min(timeit.repeat(lambda: batch(messages, 5000), number=1, repeat=3))
+        print(f"{count:>9} {formatter_time:>9.3f}s {batch_time:>9.3f}s {formatter_time / batch_time:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""
+Microbenchmark: KeywordMatcher vs the two `any(term in text ...)` scans message_formatter used.
+
+Run from the repository root:
+    python benchmarks/bench_keyword_matcher.py
+"""
+
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from keyword_matcher import KeywordMatcher
+from hebrew_normalize import normalize_hebrew
+
+HEBREW = "אבגדהוזחטיכלמנסעפצקרשתךםןףץ"
+BASE_PRACTICE = ["עלה תרגול", "העליתי תרגול", "העלתי תרגול", "תרגול עלה לתיקייה", "עלה תרגןל"]
+BASE_MESSAGE = ["שלחתי הודעה", "כתבתי הודעה", "שלחתי שאלה"]
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(HEBREW) for _ in range(length))
+
+
+def make_terms(rng, count, base):
+    terms = list(base)
+    while len(terms) < count:
+        terms.append(f"{random_word(rng, rng.randint(3, 6))} {random_word(rng, rng.randint(3, 7))}")
+    return terms
+
+
+def make_messages(rng, count, practice, message):
+    messages = []
+    for _ in range(count):
+        words = [random_word(rng, rng.randint(2, 7)) for _ in range(rng.randint(3, 15))]
+        roll = rng.random()
+        if roll < 0.2:
+            words.insert(rng.randint(0, len(words)), rng.choice(practice))
+        elif roll < 0.3:
+            words.insert(rng.randint(0, len(words)), rng.choice(message))
+        messages.append(" ".join(words))
+    return messages
+
+
+def naive(messages, practice, message):
+    return [(any(t in text for t in practice), any(t in text for t in message)) for text in messages]
+
+
+def compiled(messages, matcher):
+    result = []
+    for text in messages:
+        matched = matcher.match(text)
+        result.append(('practice' in matched, 'sent' in matched))
+    return result
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'terms':>6} {'messages':>9} {'any() x2':>11} {'matcher':>11} {'automaton':>11} {'speedup':>8} {'fuzzy':>11}")
+    for term_count in (8, 20, 40, 50, 100, 200, 500, 1000):
+        practice = make_terms(rng, term_count * 2 // 3, BASE_PRACTICE)
+        message = make_terms(rng, term_count - len(practice), BASE_MESSAGE)
+        messages = make_messages(rng, 20_000, practice, message)
+        matcher = KeywordMatcher({'practice': practice, 'sent': message})
+        automaton = KeywordMatcher({'practice': practice, 'sent': message}, small_term_set=0)
+        # What message_formatter runs by default: normalized text, one typo allowed
+        fuzzy = KeywordMatcher({'practice': practice, 'sent': message}, normalize=normalize_hebrew, max_distance=1)
+
+        assert naive(messages, practice, message) == compiled(messages, matcher) == compiled(messages, automaton)
+
+        naive_time = min(timeit.repeat(lambda: naive(messages, practice, message), number=1, repeat=3))
+        matcher_time = min(timeit.repeat(lambda: compiled(messages, matcher), number=1, repeat=3))
+        automaton_time = min(timeit.repeat(lambda: compiled(messages, automaton), number=1, repeat=3))
+        fuzzy_time = min(timeit.repeat(lambda: compiled(messages, fuzzy), number=1, repeat=3))
+        print(
+            f"{term_count:>6} {len(messages):>9} {naive_time:>10.3f}s {matcher_time:>10.3f}s "
+            f"{automaton_time:>10.3f}s {naive_time / matcher_time:>7.1f}x {fuzzy_time:>10.3f}s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,58 @@
+"""
+Microbenchmark: TimestampParser vs the strptime month-first / day-first fallback.
+
+Run from the repository root:
+    python benchmarks/bench_timestamp_parser.py
+"""
+
+from datetime import datetime, timedelta
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from timestamp_parser import TimestampParser
+
+
+def strptime_fallback(timestamp):
+    try:
+        return datetime.strptime(timestamp, "%H:%M, %m/%d/%Y")
+    except ValueError:
+        try:
+            return datetime.strptime(timestamp, "%H:%M, %d/%m/%Y")
+        except ValueError:
+            return None
+
+
+def make_timestamps(rng, count, fmt):
+    start = datetime(2025, 1, 1)
+    return [(start + timedelta(minutes=rng.randint(0, 525_600))).strftime(fmt) for _ in range(count)]
+
+
+def main():
+    rng = random.Random(42)
+    print(f"{'dates':<12} {'count':>7} {'strptime':>10} {'auto':>10} {'DMY':>10} {'speedup':>8}")
+    for label, fmt in (("day-first", "%H:%M, %d/%m/%Y"), ("month-first", "%H:%M, %m/%d/%Y")):
+        timestamps = make_timestamps(rng, 50_000, fmt)
+
+        def run_auto():
+            parser = TimestampParser("auto")
+            return [parser.parse(t) for t in timestamps]
+
+        def run_dmy():
+            parser = TimestampParser("DMY")
+            return [parser.parse(t) for t in timestamps]
+
+        if label == "month-first":
+            assert run_auto() == [strptime_fallback(t) for t in timestamps]
+
+        old = min(timeit.repeat(lambda: [strptime_fallback(t) for t in timestamps], number=1, repeat=3))
+        auto = min(timeit.repeat(run_auto, number=1, repeat=3))
+        dmy = min(timeit.repeat(run_dmy, number=1, repeat=3))
+        print(f"{label:<12} {len(timestamps):>7} {old:>9.3f}s {auto:>9.3f}s {dmy:>9.3f}s {old / auto:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
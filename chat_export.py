@@ -0,0 +1,79 @@
+import os
+import re
+
+from hebrew_normalize import INVISIBLE_MARKS
+from records import RawMessage
+
+# First line of a message in a WhatsApp "Export chat" file:
+#   Android: "25/08/2025, 20:15 - +972 50-123-4567: text"  (or "8/25/25, 8:15 PM - ...")
+#   iOS:     "[25/08/2025, 20:15:32] +972 50-123-4567: text"
+# Groups: first date field, second date field, year, hour, minute, AM/PM letter, rest of the line
+_HEADER = re.compile(
+    r"[" + INVISIBLE_MARKS + r"]*\[?(\d{1,2})[./-](\d{1,2})[./-](\d{2,4}),?\s+"
+    r"(\d{1,2}):(\d{2})(?::\d{2})?(?:\s*([AaPp])\.?\s*[Mm]\.?)?(?:\] | - )(.*)"
+)
+# "WhatsApp Chat with Course A.txt" (Android), "WhatsApp Chat - Course A.txt" (iOS)
+_EXPORT_NAME = re.compile(r"WhatsApp Chat (?:with|-) (.+)\.txt", re.IGNORECASE)
+
+
+def _timestamp(first, second, year, hour, minute, meridiem):
+    """The header's date and time as a data-pre-plain-text timestamp ("HH:MM, first/second/YYYY")."""
+    hour = int(hour)
+    if meridiem:
+        hour = hour % 12 + (12 if meridiem in "Pp" else 0)
+    if len(year) == 2:
+        year = "20" + year
+    # The date field order is left to TimestampParser (TIMESTAMP_ORDER), like scraped timestamps
+    return f"{hour:02d}:{minute}, {first}/{second}/{year}"
+
+
+def parse_chat_export(lines, group=None):
+    """
+    Yield a RawMessage per message of an exported chat, given its lines.
+
+    Lines that don't start a new message are continuation lines of a
+    multi-line message and are appended to its text. System lines without a
+    sender ("Messages and calls are end-to-end encrypted", "X joined", ...)
+    are skipped along with their continuation lines. Only the message being
+    read is held in memory.
+    """
+    current = None
+    parts = []
+    for line in lines:
+        line = line.rstrip("\r\n")
+        header = _HEADER.fullmatch(line)
+        if header is None:
+            if current is not None:
+                parts.append(line)
+            continue
+
+        if current is not None:
+            yield current._replace(text="\n".join(parts))
+            current = None
+
+        *stamp, rest = header.groups()
+        sender, separator, text = rest.partition(": ")
+        if not separator:
+            continue
+        current = RawMessage(sender.strip(INVISIBLE_MARKS + " "), _timestamp(*stamp), "", group)
+        parts = [text.lstrip(INVISIBLE_MARKS)]
+
+    if current is not None:
+        yield current._replace(text="\n".join(parts))
+
+
+def export_group_name(path):
+    """The chat name in an export's default file name, or None for any other name."""
+    match = _EXPORT_NAME.fullmatch(os.path.basename(path))
+    return match.group(1) if match else None
+
+
+def iter_chat_export(path, group=None):
+    """
+    Stream the messages of a WhatsApp "Export chat" .txt file as RawMessage
+    records, tagged with `group` (by default the chat name in the file name).
+    """
+    if group is None:
+        group = export_group_name(path)
+    with open(path, encoding="utf-8-sig", errors="replace") as lines:
+        yield from parse_chat_export(lines, group)
@@ -1,25 +1,19 @@
 import os
 import csv
-import gspread
 from datetime import datetime
-from google.oauth2.service_account import Credentials
 from dotenv import load_dotenv
 
+from sheets_session import get_sheets_session
+
 def download_data_to_folder():
     # === LOAD ENVIRONMENT VARIABLES ===
     load_dotenv()
 
-    SERVICE_ACCOUNT_FILE = os.getenv("KEY_PATH")
     SPREADSHEET_ID = os.getenv("SHEET_ID")
     BASE_FOLDER = os.getenv("CSV_DOWNLOAD", "downloads")
 
-    # === AUTHENTICATION ===
-    scopes = ["https://www.googleapis.com/auth/spreadsheets.readonly"]
-    creds = Credentials.from_service_account_file(SERVICE_ACCOUNT_FILE, scopes=scopes)
-    gc = gspread.authorize(creds)
-
-    # === CONNECT TO SPREADSHEET ===
-    spreadsheet = gc.open_by_key(SPREADSHEET_ID)
+    # === CONNECT TO SPREADSHEET (shared client, already open after the update stage) ===
+    spreadsheet = get_sheets_session().spreadsheet(SPREADSHEET_ID)
 
     # === CREATE TIMESTAMPED SUBFOLDER ===
     timestamp = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
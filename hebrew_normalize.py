@@ -0,0 +1,34 @@
+import re
+import unicodedata
+
+# Final letter forms -> regular forms (ך→כ, ם→מ, ן→נ, ף→פ, ץ→צ)
+FINAL_LETTERS = {"ך": "כ", "ם": "מ", "ן": "נ", "ף": "פ", "ץ": "צ"}
+
+# Direction and zero-width marks WhatsApp leaves around mixed Hebrew/Latin text
+INVISIBLE_MARKS = "\u200b\u200c\u200d\u200e\u200f\u202a\u202b\u202c\u202d\u202e\u2066\u2067\u2068\u2069\ufeff"
+
+
+def _build_table():
+    table = {ord(final): regular for final, regular in FINAL_LETTERS.items()}
+    # Niqqud and cantillation: the combining marks of the Hebrew block.
+    # The block's punctuation (maqaf, paseq, sof pasuq, ...) is left alone.
+    for code in range(0x0591, 0x05C8):
+        if unicodedata.category(chr(code)) == "Mn":
+            table[code] = None
+    for mark in INVISIBLE_MARKS:
+        table[ord(mark)] = None
+    return table
+
+
+_TABLE = _build_table()
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_hebrew(text):
+    """
+    Canonical form used for keyword matching: niqqud and cantillation marks
+    stripped, final letters replaced by their regular forms, invisible
+    direction marks removed and whitespace runs collapsed to one space.
+    "עָלָה  תִּרְגּוּל" and "עלה תרגול" normalize to the same string.
+    """
+    return _WHITESPACE.sub(" ", text.translate(_TABLE)).strip()
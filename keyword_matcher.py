@@ -0,0 +1,217 @@
+from collections import Counter, deque
+from operator import add
+
+# Below this many terms, C-level `term in text` scans beat a Python-level automaton
+# (see benchmarks/bench_keyword_matcher.py)
+SMALL_TERM_SET = 40
+
+# Terms shorter than this are only matched exactly: one edit in a short term
+# matches too many unrelated words
+FUZZY_MIN_LENGTH = 5
+
+
+def _bigrams(text):
+    return map(add, text, text[1:])
+
+
+def _char_masks(term):
+    """Bit i of masks[ch] is set where term[i] == ch."""
+    masks = {}
+    for i, ch in enumerate(term):
+        masks[ch] = masks.get(ch, 0) | 1 << i
+    return masks
+
+
+def within_distance(term, text, max_distance, char_masks=None):
+    """
+    True if some substring of `text` is at most `max_distance` edits
+    (insertions, deletions, substitutions) away from `term`.
+
+    Myers' bit-parallel algorithm: a column of the edit-distance table is
+    kept as two bit vectors, so each text character costs a few integer
+    operations instead of a loop over the term.
+    """
+    m = len(term)
+    if m <= max_distance:
+        return True
+    if char_masks is None:
+        char_masks = _char_masks(term)
+
+    full = (1 << m) - 1
+    last = 1 << (m - 1)
+    positive, negative = full, 0
+    score = m
+    for ch in text:
+        eq = char_masks.get(ch, 0)
+        xv = eq | negative
+        xh = (((eq & positive) + positive) ^ positive) | eq
+        h_positive = negative | (~(xh | positive) & full)
+        h_negative = positive & xh
+        if h_positive & last:
+            score += 1
+        elif h_negative & last:
+            score -= 1
+            if score <= max_distance:
+                return True
+        # A match may start anywhere in the text: no carry into row 0
+        h_positive = (h_positive << 1) & full
+        h_negative = (h_negative << 1) & full
+        positive = h_negative | (~(xv | h_positive) & full)
+        negative = h_positive & xv
+    return False
+
+
+class FuzzyTermIndex:
+    """
+    Bounded edit-distance search for many terms, filtered by a bigram index.
+
+    A substring within k edits of a term of length m still contains at least
+    (m - 1) - 2k of the term's bigrams (each edit destroys at most two of
+    them), so only the terms that share that many bigrams with
+    the text are verified with the edit-distance scan. Terms too short for
+    that bound to filter anything are left to exact matching.
+    """
+
+    def __init__(self, categories, max_distance, min_length=FUZZY_MIN_LENGTH):
+        self.max_distance = max_distance
+        self.terms = []
+        self.index = {}
+        for bit, terms in enumerate(categories):
+            for term in terms:
+                threshold = len(term) - 1 - 2 * max_distance
+                if len(term) < min_length or threshold <= 0:
+                    continue
+                term_id = len(self.terms)
+                self.terms.append((term, 1 << bit, threshold, _char_masks(term)))
+                for gram, count in Counter(_bigrams(term)).items():
+                    self.index.setdefault(gram, []).append((term_id, count))
+
+    def match_mask(self, text, skip_mask=0):
+        """Bitmask of the categories with a term within max_distance of part of `text`."""
+        if not self.terms:
+            return 0
+        shared = {}
+        index = self.index
+        for gram in index.keys() & _bigrams(text):
+            for term_id, count in index[gram]:
+                shared[term_id] = shared.get(term_id, 0) + count
+
+        mask = skip_mask
+        for term_id, count in shared.items():
+            term, bit, threshold, char_masks = self.terms[term_id]
+            if mask & bit or count < threshold:
+                continue
+            if within_distance(term, text, self.max_distance, char_masks):
+                mask |= bit
+        return mask & ~skip_mask
+
+
+class KeywordMatcher:
+    """
+    Multi-pattern substring matcher (Aho-Corasick) over named term lists.
+
+    Built once from e.g. {'practice': PRACTICE_WORDS, 'sent': MESSAGE_WORDS};
+    match(text) then scans the text a single time, whatever the number of
+    terms, and returns the names of the categories that have a term in it.
+    Results are identical to `any(term in text for term in terms)` per category.
+
+    The fail links are folded into each state's transition table at build
+    time (a DFA), so matching is one dict lookup per character. Small term
+    sets (fewer than SMALL_TERM_SET terms) are matched with plain substring
+    scans instead, which are faster at that size.
+
+    With `normalize` (e.g. hebrew_normalize.normalize_hebrew) terms and texts
+    are both normalized before matching. With `max_distance` > 0, categories
+    without an exact hit also match terms of at least `min_fuzzy_length`
+    characters that are within `max_distance` edits of part of the text.
+    """
+
+    def __init__(self, categories, small_term_set=SMALL_TERM_SET, normalize=None,
+                 max_distance=0, min_fuzzy_length=FUZZY_MIN_LENGTH):
+        self.normalize = normalize
+        if normalize is not None:
+            categories = {name: [normalize(term) for term in terms] for name, terms in categories.items()}
+
+        self.names = list(categories)
+        self._full_mask = (1 << len(self.names)) - 1
+        self._mask_names = {}
+
+        self._scan_terms = None
+        if sum(len(categories[name]) for name in self.names) < small_term_set:
+            self._scan_terms = [(1 << bit, tuple(categories[name])) for bit, name in enumerate(self.names)]
+
+        goto = [{}]
+        output = [0]
+        for bit, name in enumerate(self.names):
+            for term in categories[name]:
+                state = 0
+                for ch in term:
+                    next_state = goto[state].get(ch)
+                    if next_state is None:
+                        next_state = len(goto)
+                        goto[state][ch] = next_state
+                        goto.append({})
+                        output.append(0)
+                    state = next_state
+                output[state] |= 1 << bit
+
+        # Breadth-first: a state's fail target is always finished before the state itself
+        delta = [None] * len(goto)
+        delta[0] = dict(goto[0])
+        fail = [0] * len(goto)
+        queue = deque(goto[0].values())
+        while queue:
+            state = queue.popleft()
+            output[state] |= output[fail[state]]
+            delta[state] = {**delta[fail[state]], **goto[state]}
+            for ch, child in goto[state].items():
+                fail[child] = delta[fail[state]].get(ch, 0)
+                queue.append(child)
+
+        self._delta = delta
+        self._output = output
+
+        self._fuzzy = None
+        if max_distance > 0:
+            self._fuzzy = FuzzyTermIndex([categories[name] for name in self.names], max_distance, min_fuzzy_length)
+
+    def match_mask(self, text):
+        """Bitmask of matched categories (bit i = self.names[i])."""
+        if self.normalize is not None:
+            text = self.normalize(text)
+        mask = self._exact_mask(text)
+        if self._fuzzy is not None and mask != self._full_mask:
+            mask |= self._fuzzy.match_mask(text, skip_mask=mask)
+        return mask
+
+    def _exact_mask(self, text):
+        if self._scan_terms is not None:
+            mask = 0
+            for bit, terms in self._scan_terms:
+                for term in terms:
+                    if term in text:
+                        mask |= bit
+                        break
+            return mask
+
+        delta = self._delta
+        output = self._output
+        full = self._full_mask
+        mask = output[0]
+        state = 0
+        for ch in text:
+            state = delta[state].get(ch, 0)
+            if output[state]:
+                mask |= output[state]
+                if mask == full:
+                    break
+        return mask
+
+    def match(self, text):
+        """Frozenset of the category names that have at least one term in `text`."""
+        mask = self.match_mask(text)
+        names = self._mask_names.get(mask)
+        if names is None:
+            names = frozenset(name for bit, name in enumerate(self.names) if mask >> bit & 1)
+            self._mask_names[mask] = names
+        return names
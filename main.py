@@ -1,58 +1,70 @@
 import time
 import logging
+from datetime import datetime
 import os
 import sys
 import pytest
 from dotenv import load_dotenv
 
-from selenium_read import open_whatsapp
+from whatsapp_scraper import iter_whatsapp, backfill_whatsapp
+from whatsapp_session import WhatsAppSession
+from scrape_pool import GridScrapePool
+from whatsapp_stream import stream_messages
+from whatsapp_dom import get_group_names
+from chat_export import iter_chat_export
+from message_cursor import load_cursors, save_cursors, cursor_for
 from render_message import message_formatter
-from sheets_update import update_sheets_data
+from sheets_update import update_sheets_for_groups, destination_sheet_ids, rebuild_phone_index, check_phone_index
+from pipeline import MessagePipeline, write_stream
 from sheets_last_update import last_time_updated
 from download_csv_backup import download_data_to_folder
+from sheets_session import reset_sheets_session
 from time_log import timed, table_log, setup_handler, no_messages
 
 
 # === Configuration ===
 load_dotenv()
 CSV_DOWNLOAD = os.getenv("CSV_DOWNLOAD")
+POLL_INTERVAL = int(os.getenv("POLL_INTERVAL", "300"))
+STREAM_INTERVAL = float(os.getenv("STREAM_INTERVAL", "5"))
+# Backfill stop conditions: a "YYYY-MM-DD HH:MM" lower bound and/or a message cap
+BACKFILL_UNTIL = os.getenv("BACKFILL_UNTIL", "")
+BACKFILL_MAX_MESSAGES = os.getenv("BACKFILL_MAX_MESSAGES", "")
 
 # Initialize logging before any log message
 setup_handler()
 
 
-if __name__ == "__main__":
-    # Check for test flags
-    if "--test" in sys.argv or "--test-unit" in sys.argv:
-        # Run unit tests
-        exit_code = pytest.main([
-            "tests/unit/test_sheets_last_time_update.py",
-            "tests/unit/test_sheets_update.py",
-            "-v",  # verbose
-            "-s",  # show print statements
-        ])
-        sys.exit(exit_code)
-    
-    # Normal execution starts here
+def run_once(session=None, pool=None):
+    """
+    Run one full scrape -> format -> sheets cycle.
+    With a GridScrapePool the groups are scraped in parallel on the grid,
+    otherwise sequentially on `session`, and formatted while they are scraped.
+    """
     total_start = time.time()
     logging.info("\n" + "=" * 70)
     logging.info("Script started.")
 
     runtimes = {}
 
-    elapsed, msgs = timed("open_whatsapp", open_whatsapp)
-    runtimes["open_whatsapp"] = elapsed
+    if pool is not None:
+        def scraped():
+            yield from pool.scrape(load_cursors())
+        messages = scraped()
+    else:
+        messages = iter_whatsapp(session, load_cursors())
+
+    pipeline = MessagePipeline()
+    elapsed, count = timed("scrape_format_update", pipeline.run, messages)
+    runtimes["scrape_format_update"] = elapsed
 
     
-    if len(msgs) == 0:
+    if count == 0:
         no_messages(elapsed)
         
     else:
-        elapsed, msgs = timed("message_formatter", message_formatter, msgs)
-        runtimes["message_formatter"] = elapsed
-
-        elapsed, _ = timed("update_sheets", update_sheets_data, msgs)
-        runtimes["update_sheets"] = elapsed
+        # Only advance the cursors once the sheet has the messages (oldest first: the last one is the newest)
+        save_cursors(pipeline.last_by_group.values())
 
         elapsed, _ = timed("last_time_updated", last_time_updated)
         runtimes["last_time_updated"] = elapsed
@@ -62,4 +74,153 @@ if __name__ == "__main__":
 
         total_elapsed = time.time() - total_start
 
-        table_log(runtimes, total_elapsed)
\ No newline at end of file
+        table_log(runtimes, total_elapsed)
+
+
+def run_backfill(session=None):
+    """Scroll back through the group history (until the cursor / BACKFILL_UNTIL) and process it."""
+    total_start = time.time()
+    logging.info("\n" + "=" * 70)
+    logging.info("Backfill started.")
+
+    since = datetime.strptime(BACKFILL_UNTIL, "%Y-%m-%d %H:%M") if BACKFILL_UNTIL else None
+    max_messages = int(BACKFILL_MAX_MESSAGES) if BACKFILL_MAX_MESSAGES else None
+    history = backfill_whatsapp(session, load_cursors(), since, max_messages)
+
+    runtimes = {}
+
+    # The formatter consumes messages while the scraper is still scrolling, in columnar chunks
+    pipeline = MessagePipeline(classify_mode=os.getenv("BACKFILL_CLASSIFY_MODE", "batch"))
+    elapsed, count = timed("backfill_format_update", pipeline.run, history)
+    runtimes["backfill_format_update"] = elapsed
+
+    if count == 0:
+        no_messages(elapsed)
+        return
+
+    # History arrives newest first per group: each group's first message is its cursor
+    save_cursors(pipeline.first_by_group.values())
+
+    elapsed, _ = timed("last_time_updated", last_time_updated)
+    runtimes["last_time_updated"] = elapsed
+
+    table_log(runtimes, time.time() - total_start)
+
+
+def run_import(path, group=None):
+    """Rebuild the sheet from a WhatsApp "Export chat" .txt file, without a browser."""
+    total_start = time.time()
+    logging.info("\n" + "=" * 70)
+    logging.info(f"Chat export import started: {path}")
+
+    runtimes = {}
+
+    # The export is read line by line into the pipeline, never loaded whole
+    pipeline = MessagePipeline(classify_mode=os.getenv("BACKFILL_CLASSIFY_MODE", "batch"))
+    elapsed, count = timed("import_format_update", pipeline.run, iter_chat_export(path, group))
+    runtimes["import_format_update"] = elapsed
+
+    if count == 0:
+        no_messages(elapsed)
+        return
+
+    # The message cursors are left alone: they track what the live scraper has seen
+    elapsed, _ = timed("last_time_updated", last_time_updated)
+    runtimes["last_time_updated"] = elapsed
+
+    table_log(runtimes, time.time() - total_start)
+
+
+def watch(poll_interval=POLL_INTERVAL, grid=False):
+    """Poll forever on warm browser session(s), reconnecting only when one dies."""
+    logging.info(f"Watch mode: polling every {poll_interval}s")
+    with (GridScrapePool() if grid else WhatsAppSession()) as browser:
+        while True:
+            try:
+                if grid:
+                    run_once(pool=browser)
+                else:
+                    run_once(browser)
+            except Exception as e:
+                # timed() already logged the traceback, keep polling
+                logging.error(f"Cycle failed, retrying in {poll_interval}s: {e}")
+                # Authorize and reopen the spreadsheets next cycle, in case the cached handles went stale
+                reset_sheets_session()
+            time.sleep(poll_interval)
+
+
+def stream(interval=STREAM_INTERVAL):
+    """Push new messages of the first GROUP_NAME group to Sheets seconds after they arrive."""
+    group_names = get_group_names()
+    if not group_names:
+        raise ValueError("GROUP_NAME environment variable is not set.")
+    if len(group_names) > 1:
+        logging.warning(f"Stream mode follows one chat, only '{group_names[0]}' is streamed")
+    group_name = group_names[0]
+
+    def write(messages):
+        logging.info(f"Stream: writing {len(messages)} new messages")
+        timed("update_sheets", update_sheets_for_groups, message_formatter(messages))
+
+    with WhatsAppSession() as session:
+        batches = stream_messages(session, group_name, cursor_for(load_cursors(), group_name), interval)
+        # A failed batch is written again with the next one: the cursor only moves past written messages
+        for written in write_stream(batches, write):
+            save_cursors(written)
+            try:
+                timed("last_time_updated", last_time_updated)
+            except Exception as e:
+                logging.error(f"Dashboard update failed: {e}")
+
+
+if __name__ == "__main__":
+    # Check for test flags
+    if "--test" in sys.argv or "--test-unit" in sys.argv:
+        # Run unit tests
+        exit_code = pytest.main([
+            "tests/unit/test_sheets_last_time_update.py",
+            "tests/unit/test_sheets_update.py",
+            "-v",  # verbose
+            "-s",  # show print statements
+        ])
+        sys.exit(exit_code)
+
+    if "--rebuild-index" in sys.argv:
+        # Re-read the phone columns of every destination spreadsheet into the phone index
+        for sheet_id in destination_sheet_ids():
+            logging.info(f"Phone index of {sheet_id}: {rebuild_phone_index(sheet_id)} rows")
+        sys.exit(0)
+
+    if "--check-index" in sys.argv:
+        # Compare the phone index with the sheets, exit status 1 if they differ
+        consistent = True
+        for sheet_id in destination_sheet_ids():
+            problems = check_phone_index(sheet_id)
+            for problem in problems:
+                logging.warning(f"Phone index of {sheet_id}: {problem}")
+            if not problems:
+                logging.info(f"Phone index of {sheet_id} matches the sheet")
+            consistent = consistent and not problems
+        sys.exit(0 if consistent else 1)
+
+    if "--import-export" in sys.argv:
+        # Offline history import: python main.py --import-export "WhatsApp Chat with X.txt" [--group "X"]
+        path = sys.argv[sys.argv.index("--import-export") + 1]
+        group = sys.argv[sys.argv.index("--group") + 1] if "--group" in sys.argv else None
+        run_import(path, group)
+    elif "--stream" in sys.argv:
+        # Event-driven: a MutationObserver in the open chat feeds the pipeline every STREAM_INTERVAL seconds
+        stream()
+    elif "--backfill" in sys.argv:
+        # Deep history import, stops at the cursor / BACKFILL_UNTIL / BACKFILL_MAX_MESSAGES
+        run_backfill()
+    elif "--watch" in sys.argv:
+        # Keep the browser warm and poll every POLL_INTERVAL seconds
+        watch(grid="--grid" in sys.argv)
+    elif "--grid" in sys.argv:
+        # Groups in parallel across GRID_WORKERS Selenium Grid sessions
+        with GridScrapePool() as pool:
+            run_once(pool=pool)
+    else:
+        # Normal execution starts here
+        run_once()
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+from dotenv import load_dotenv
+
+from records import RawMessage
+
+CURSOR_FILE = "message_cursor.json"
+
+
+def message_key(message):
+    """Identity of a message: (timestamp, sender, short hash of the text)."""
+    message = RawMessage.coerce(message)
+    text_hash = hashlib.sha1(message.text.encode("utf-8")).hexdigest()[:16]
+    return message.timestamp, message.sender, text_hash
+
+
+def cursor_path():
+    """The cursor lives next to the CSV backups and runtime.log."""
+    load_dotenv()
+    return os.path.join(os.getenv("CSV_DOWNLOAD", "downloads"), CURSOR_FILE)
+
+
+def _read_file(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            data = json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        print(f"Warning: ignoring unreadable message cursor {path}: {e}")
+        return {}
+
+    if not isinstance(data, dict):
+        return {}
+    # Single-group files store one cursor at the top level
+    if "timestamp" in data:
+        return {"": data}
+    return data
+
+
+def load_cursors(path=None):
+    """
+    Return {group name: key of the last processed message}.
+    A cursor saved before multi-group support is returned under "" and
+    applies to any group without its own entry (see cursor_for).
+    """
+    cursors = {}
+    for group, data in _read_file(path or cursor_path()).items():
+        try:
+            cursors[group] = (data["timestamp"], data["sender"], data["text_hash"])
+        except (KeyError, TypeError):
+            print(f"Warning: ignoring unreadable message cursor for group '{group}'")
+    return cursors
+
+
+def cursor_for(cursors, group):
+    """Cursor of `group`, falling back to the group-less cursor."""
+    if not cursors:
+        return None
+    return cursors.get(group or "", cursors.get(""))
+
+
+def load_cursor(path=None, group=None):
+    """Return the key of the last processed message of `group`, or None on the first run."""
+    return cursor_for(load_cursors(path), group)
+
+
+def save_cursors(messages, path=None):
+    """
+    Persist the newest message of every group in `messages` (oldest first per group).
+    Groups that are not in `messages` keep their saved cursor.
+    """
+    path = path or cursor_path()
+    data = _read_file(path)
+
+    newest = {}
+    for message in messages:
+        message = RawMessage.coerce(message)
+        newest[message.group or ""] = message
+    if not newest:
+        return
+
+    for group, message in newest.items():
+        timestamp, sender, text_hash = message_key(message)
+        data[group] = {"timestamp": timestamp, "sender": sender, "text_hash": text_hash}
+
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(data, f, ensure_ascii=False)
+    os.replace(tmp_path, path)
+
+
+def save_cursor(message, path=None):
+    """Persist `message` as the newest processed message of its group."""
+    save_cursors([message], path)
+
+
+def messages_after(messages, cursor):
+    """
+    Return the messages newer than `cursor` (messages are oldest first).
+    If the cursor is not in the window, everything is returned: either this is
+    the first run or more messages arrived than the window holds.
+    """
+    if cursor is None:
+        return messages
+
+    for i in range(len(messages) - 1, -1, -1):
+        if message_key(messages[i]) == cursor:
+            return messages[i + 1:]
+
+    print("Message cursor not found in the read window, processing all messages")
+    return messages
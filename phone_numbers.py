@@ -0,0 +1,34 @@
+from functools import lru_cache
+import re
+
+_NON_DIGITS = re.compile(r'\D')
+
+
+@lru_cache(maxsize=16384)
+def normalize_phone(phone):
+    """
+    Normalize a phone number to Israeli international format (972XXXXXXXXX).
+    Used for both the WhatsApp senders and the spreadsheet's phone column, so
+    the two sides of the join always agree. Memoized: the same senders and
+    sheet rows come back on every run.
+    """
+
+    # Remove all non-digit characters
+    cleaned = _NON_DIGITS.sub('', phone.strip())
+
+    # Handle different Israeli phone number formats
+    if cleaned.startswith('972'):
+        # Already in international format (972XXXXXXXXX)
+        return cleaned
+    elif cleaned.startswith('0'):
+        # Israeli domestic format (0XXXXXXXXX) - remove leading 0 and add 972
+        return '972' + cleaned[1:]
+    elif len(cleaned) == 9:
+        # 9-digit number without country code or leading 0 - add 972
+        return '972' + cleaned
+    elif len(cleaned) == 10:
+        # 10-digit number starting with area code - add 972
+        return '972' + cleaned
+    else:
+        # Return as-is if format is unclear
+        return cleaned
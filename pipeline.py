@@ -0,0 +1,166 @@
+import logging
+import os
+import queue
+import threading
+import time
+from dotenv import load_dotenv
+
+from render_message import MessageClassifier
+from sheets_update import update_sheets_for_groups
+from records import RawMessage
+from time_log import record_stage
+
+logger = logging.getLogger(__name__)
+
+# End of the scraped messages, or the error that ended them
+_DONE = object()
+
+
+class _ScrapeFailed:
+    def __init__(self, error):
+        self.error = error
+
+
+def write_stream(batches, write):
+    """
+    Write the message batches of a stream (see whatsapp_stream.stream_messages)
+    with `write(messages)`. The messages of a failed write are kept and written
+    again together with the next batch (or on the next empty tick), so nothing
+    is skipped. Yields the messages of every successful write, oldest first:
+    only those may advance the saved cursor.
+    """
+    pending = []
+    for batch in batches:
+        messages = pending + list(batch)
+        if not messages:
+            continue
+        try:
+            write(messages)
+        except Exception as e:
+            logger.error(f"Stream write failed, {len(messages)} messages kept for the next batch: {e}", exc_info=True)
+            pending = messages
+            continue
+        pending = []
+        yield messages
+
+
+class MessagePipeline:
+    """
+    Scrape -> classify -> Sheets, with the stages overlapping instead of
+    handing whole lists to each other.
+
+    The message source (e.g. whatsapp_scraper.iter_whatsapp) runs on a
+    producer thread and feeds a bounded queue of PIPELINE_QUEUE_SIZE messages;
+    a MessageClassifier reduces them as they arrive, so only the latest
+    message per sender is held. The resulting updates are written in one
+    pass once scraping is done: update_sheets_data reads each spreadsheet
+    once and plans every update against that read.
+    Per-stage counts, busy time and queue peaks go to the run summary.
+
+    `classify_mode` (CLASSIFY_MODE, default 'stream') set to 'batch' classifies
+    chunks of CLASSIFY_BATCH_SIZE messages at once with the columnar
+    BatchClassifier instead, for large history imports.
+    """
+
+    def __init__(self, queue_size=None, classify_mode=None):
+        load_dotenv()
+        self.queue_size = queue_size or int(os.getenv("PIPELINE_QUEUE_SIZE", "500"))
+        self.classify_mode = (classify_mode or os.getenv("CLASSIFY_MODE", "stream")).strip().lower()
+        if self.classify_mode not in ("stream", "batch"):
+            raise ValueError(f"Unknown CLASSIFY_MODE '{self.classify_mode}', expected stream or batch")
+        self.classify_chunk = int(os.getenv("CLASSIFY_BATCH_SIZE", "5000"))
+        # First and last message seen per group, for the message cursors
+        self.first_by_group = {}
+        self.last_by_group = {}
+
+    def _produce(self, messages, buffer, stop):
+        start = time.time()
+        count = 0
+        outcome = _DONE
+        try:
+            for message in messages:
+                while not stop.is_set():
+                    try:
+                        buffer.put(message, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+                count += 1
+        except BaseException as e:
+            outcome = _ScrapeFailed(e)
+        finally:
+            if stop.is_set() and hasattr(messages, "close"):
+                # Let the scraper run its cleanup (close its browser session)
+                messages.close()
+        record_stage("scrape", count, time.time() - start)
+        if not stop.is_set():
+            buffer.put(outcome)
+
+    def run(self, messages):
+        """
+        Push `messages` (any iterable, typically a scraping generator) through
+        the pipeline. Returns the number of messages processed; 0 means nothing
+        was written. Errors of the message source are raised here.
+        """
+        self.first_by_group = {}
+        self.last_by_group = {}
+
+        buffer = queue.Queue(self.queue_size)
+        stop = threading.Event()
+        producer = threading.Thread(target=self._produce, args=(messages, buffer, stop), daemon=True)
+        producer.start()
+
+        if self.classify_mode == "batch":
+            # pandas is only needed for batch classification
+            from batch_classify import BatchClassifier
+            classifier = BatchClassifier()
+        else:
+            classifier = MessageClassifier()
+        chunk = []
+        busy = 0.0
+        max_depth = 0
+        try:
+            while True:
+                max_depth = max(max_depth, buffer.qsize())
+                item = buffer.get()
+                if item is _DONE:
+                    break
+                if isinstance(item, _ScrapeFailed):
+                    raise item.error
+
+                start = time.perf_counter()
+                message = RawMessage.coerce(item)
+                if self.classify_mode == "batch":
+                    chunk.append(message)
+                    if len(chunk) >= self.classify_chunk:
+                        classifier.add_messages(chunk)
+                        chunk = []
+                else:
+                    classifier.add(message)
+                self.first_by_group.setdefault(message.group, message)
+                self.last_by_group[message.group] = message
+                busy += time.perf_counter() - start
+
+            start = time.perf_counter()
+            if chunk:
+                classifier.add_messages(chunk)
+            busy += time.perf_counter() - start
+        except BaseException:
+            stop.set()
+            raise
+
+        producer.join()
+        record_stage("classify", classifier.count, busy, max_depth)
+        if not classifier.count:
+            return 0
+
+        self._write(classifier.updates())
+        return classifier.count
+
+    def _write(self, updates):
+        start = time.time()
+        update_sheets_for_groups(updates)
+        written = len(updates['practice_updates']) + len(updates['message_updates'])
+        record_stage("update_sheets", written, time.time() - start)
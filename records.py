@@ -0,0 +1,51 @@
+from datetime import datetime
+from typing import NamedTuple, Optional
+
+
+class RawMessage(NamedTuple):
+    """One scraped WhatsApp message: its data-pre-plain-text parts, the text and the group it came from."""
+
+    sender: str
+    timestamp: str
+    text: str
+    group: Optional[str] = None
+
+    @classmethod
+    def coerce(cls, message):
+        """Accept a RawMessage or a {sender, timestamp, text[, group]} dict."""
+        if isinstance(message, cls):
+            return message
+        return cls(message["sender"], message["timestamp"], message.get("text") or "", message.get("group"))
+
+
+class SheetUpdate(NamedTuple):
+    """A sender's latest practice or sent message, formatted for the sheet."""
+
+    sender: str
+    date: str
+    datetime: str
+    group: Optional[str] = None
+    class_number: Optional[int] = None
+
+    @classmethod
+    def coerce(cls, update):
+        """Accept a SheetUpdate or a {sender, date, datetime[, group, class_number]} dict."""
+        if isinstance(update, cls):
+            return update
+        return cls(update["sender"], update["date"], update["datetime"], update.get("group"), update.get("class_number"))
+
+
+class ClassifiedMessage(NamedTuple):
+    """The latest matching message of a (group, normalized sender), kept by message_formatter per category."""
+
+    sender: str
+    group: Optional[str]
+    sent_at: datetime
+
+    def to_update(self):
+        return SheetUpdate(
+            self.sender,
+            self.sent_at.strftime("%d/%m/%y"),
+            self.sent_at.strftime("%H:%M, %d/%m/%y"),
+            self.group,
+        )
@@ -1,147 +1,135 @@
-from datetime import datetime
 from dotenv import load_dotenv
+from functools import lru_cache
+import json
+import logging
 import os
-import re
+
+from keyword_matcher import KeywordMatcher, FUZZY_MIN_LENGTH
+from hebrew_normalize import normalize_hebrew
+from phone_numbers import normalize_phone
+from timestamp_parser import TimestampParser
+from records import RawMessage, ClassifiedMessage
+
+logger = logging.getLogger(__name__)
+
+# Slots of the per-sender [practice, sent] pair in message_formatter
+PRACTICE, SENT = 0, 1
 
 def clean_phone_number(phone):
     """Clean phone number by removing spaces, dashes, and leading plus signs, then normalize to Israeli format."""
+    return normalize_phone(phone)
 
-    # Remove all non-digit characters
-    cleaned = re.sub(r'[^\d]', '', phone.strip())
-    
-    # Handle different Israeli phone number formats
-    if cleaned.startswith('972'):
-        # Already in international format (972XXXXXXXXX)
-        return cleaned
-    elif cleaned.startswith('0'):
-        # Israeli domestic format (0XXXXXXXXX) - remove leading 0 and add 972
-        return '972' + cleaned[1:]
-    elif len(cleaned) == 9:
-        # 9-digit number without country code or leading 0 - add 972
-        return '972' + cleaned
-    elif len(cleaned) == 10 and not cleaned.startswith('972'):
-        # 10-digit number starting with area code - add 972
-        return '972' + cleaned
-    else:
-        # Return as-is if format is unclear
-        return cleaned
+@lru_cache(maxsize=8)
+def _build_matcher(practice_terms, message_terms, max_distance=0, min_fuzzy_length=FUZZY_MIN_LENGTH):
+    """One matcher per distinct term configuration, reused across runs and batches."""
+    return KeywordMatcher(
+        {'practice': practice_terms, 'sent': message_terms},
+        normalize=normalize_hebrew,
+        max_distance=max_distance,
+        min_fuzzy_length=min_fuzzy_length,
+    )
 
-def message_formatter(message_data):
+class MessageClassifier:
     """
-    Process message data and return categorized messages for sheet updates.
-    Returns dict with 'practice_updates' (for column E) and 'message_updates' (for column H).
-    For each phone number, keeps the most recent message of each type (practice/sent).
+    Incremental form of message_formatter: add() messages one at a time as
+    they are scraped, then updates() returns the formatter's result.
+    Only the latest practice/sent message of each (group, phone) is kept, so
+    memory grows with the number of senders, not with the number of messages.
     """
 
-    # Load .env file
-    load_dotenv()
-    
-    # Get search terms from environment variables
-    practice_terms_env = os.getenv("PRACTICE_WORDS")
-    message_terms_env = os.getenv("MESSAGE_WORDS")
-    
-    # Parse the environment variables (assuming they're stored as JSON-like strings)
-    import json
-    try:
-        practice_terms = json.loads(practice_terms_env) if practice_terms_env else ["עלה תרגול", "העליתי תרגול", "העלתי תרגול"]
-        message_terms = json.loads(message_terms_env) if message_terms_env else ["שלחתי הודעה"]
-    except (json.JSONDecodeError, TypeError):
-        # Fallback to default values if parsing fails
-        print("Warning: Could not parse search terms from environment variables, using defaults")
-        practice_terms = ["עלה תרגול", "העליתי תרגול", "העלתי תרגול"]
-        message_terms = ["שלחתי הודעה"]
-    
-    print(f"Searching for practice terms: {practice_terms}")
-    print(f"Searching for message terms: {message_terms}")
-    
-    # Dictionary to store the latest message of each type for each phone number
-    # Structure: {phone_number: {'practice': message_data, 'sent': message_data}}
-    phone_messages = {}
-    
-    for message in message_data:
-        sender = clean_phone_number(message['sender'])
-        text = message['text']
-        timestamp = message['timestamp']
+    def __init__(self):
+        # Load .env file
+        load_dotenv()
+        
+        # Get search terms from environment variables
+        practice_terms_env = os.getenv("PRACTICE_WORDS")
+        message_terms_env = os.getenv("MESSAGE_WORDS")
+        
+        # Parse the environment variables (assuming they're stored as JSON-like strings)
+        try:
+            practice_terms = json.loads(practice_terms_env) if practice_terms_env else ["עלה תרגול", "העליתי תרגול", "העלתי תרגול"]
+            message_terms = json.loads(message_terms_env) if message_terms_env else ["שלחתי הודעה"]
+        except (json.JSONDecodeError, TypeError):
+            # Fallback to default values if parsing fails
+            print("Warning: Could not parse search terms from environment variables, using defaults")
+            practice_terms = ["עלה תרגול", "העליתי תרגול", "העלתי תרגול"]
+            message_terms = ["שלחתי הודעה"]
+        
+        print(f"Searching for practice terms: {practice_terms}")
+        print(f"Searching for message terms: {message_terms}")
+
+        # Typos: terms of FUZZY_MIN_LENGTH+ characters also match within FUZZY_MAX_DISTANCE edits
+        max_distance = int(os.getenv("FUZZY_MAX_DISTANCE", "1"))
+        min_fuzzy_length = int(os.getenv("FUZZY_MIN_LENGTH", str(FUZZY_MIN_LENGTH)))
+
+        # Both term lists are matched in a single pass over each (normalized) message
+        self.matcher = _build_matcher(tuple(practice_terms), tuple(message_terms), max_distance, min_fuzzy_length)
+
+        # One parser per run: the date order (TIMESTAMP_ORDER, or detected) is settled once
+        self.timestamp_parser = TimestampParser()
         
-        print(f"Processing phone: {message['sender']} -> normalized: {sender}")
+        # Latest message of each type for each phone number
+        # Structure: {(group, phone_number): [practice ClassifiedMessage or None, sent ClassifiedMessage or None]}
+        self.phone_messages = {}
+        self.count = 0
+
+    def add(self, message):
+        """Classify one message and keep it if it is the sender's latest of its type."""
+        message = RawMessage.coerce(message)
+        self.count += 1
+        sender = clean_phone_number(message.sender)
+        key = (message.group, sender)
+        
+        logger.debug("Processing phone: %s -> normalized: %s", message.sender, sender)
         
         # Check message type
-        is_practice_message = any(term in text for term in practice_terms)
-        is_sent_message = any(term in text for term in message_terms)
+        matched = self.matcher.match(message.text)
+        is_practice_message = 'practice' in matched
+        is_sent_message = 'sent' in matched
         
         if is_practice_message or is_sent_message:
-            # Convert timestamp to datetime if it's a string
-            if isinstance(timestamp, str):
-                try:
-                    timestamp_dt = datetime.strptime(timestamp, "%H:%M, %m/%d/%Y")
-                except ValueError:
-                    try:
-                        timestamp_dt = datetime.strptime(timestamp, "%H:%M, %d/%m/%Y")
-                    except ValueError:
-                        print(f"Could not parse timestamp: {timestamp}")
-                        continue
-                        
-                # Format date as dd/mm/yy and time as HH:MM
-                formatted_date = timestamp_dt.strftime("%d/%m/%y")
-                formatted_datetime = timestamp_dt.strftime("%H:%M, %d/%m/%y")
-                
-                message_info = {
-                    "sender": sender,
-                    "date": formatted_date,
-                    "datetime": formatted_datetime,
-                    "datetime_obj": timestamp_dt
-                }
-                
-                # Initialize phone entry if it doesn't exist
-                if sender not in phone_messages:
-                    phone_messages[sender] = {}
-                
-                # Process practice messages
-                if is_practice_message:
-                    if 'practice' not in phone_messages[sender]:
-                        phone_messages[sender]['practice'] = message_info
-                    else:
-                        # Keep the more recent practice message
-                        existing_dt = phone_messages[sender]['practice']['datetime_obj']
-                        if timestamp_dt > existing_dt:
-                            phone_messages[sender]['practice'] = message_info
-                
-                # Process sent messages
-                if is_sent_message:
-                    if 'sent' not in phone_messages[sender]:
-                        phone_messages[sender]['sent'] = message_info
-                    else:
-                        # Keep the more recent sent message
-                        existing_dt = phone_messages[sender]['sent']['datetime_obj']
-                        if timestamp_dt > existing_dt:
-                            phone_messages[sender]['sent'] = message_info
-    
-    practice_updates = []
-    message_updates = []
-    
-    for phone, messages in phone_messages.items():
-        if 'practice' in messages:
-            msg_data = messages['practice']
-            practice_updates.append({
-                'sender': msg_data['sender'],
-                'date': msg_data['date'],
-                'datetime': msg_data['datetime']
-            })
+            timestamp_dt = self.timestamp_parser.parse(message.timestamp)
+            if timestamp_dt is None:
+                logger.warning("Could not parse timestamp: %s", message.timestamp)
+                return
+
+            classified = ClassifiedMessage(sender, message.group, timestamp_dt)
+            latest = self.phone_messages.get(key)
+            if latest is None:
+                latest = self.phone_messages[key] = [None, None]
+
+            # Keep the more recent message of each type (the first one on a tie)
+            if is_practice_message and (latest[PRACTICE] is None or timestamp_dt > latest[PRACTICE].sent_at):
+                latest[PRACTICE] = classified
+            if is_sent_message and (latest[SENT] is None or timestamp_dt > latest[SENT].sent_at):
+                latest[SENT] = classified
+
+    def updates(self):
+        """The formatter result for everything added so far."""
+        # Dates are only formatted for the messages that were kept
+        practice_updates = [latest[PRACTICE].to_update() for latest in self.phone_messages.values() if latest[PRACTICE]]
+        message_updates = [latest[SENT].to_update() for latest in self.phone_messages.values() if latest[SENT]]
+        
+        logger.debug("Practice updates: %s", practice_updates)
+        logger.debug("Message updates: %s", message_updates)
+        print(f"\nFound {len(practice_updates)} unique phone numbers for practice updates")
+        print(f"Found {len(message_updates)} unique phone numbers for message updates")
         
-        if 'sent' in messages:
-            msg_data = messages['sent']
-            message_updates.append({
-                'sender': msg_data['sender'],
-                'date': msg_data['date'],
-                'datetime': msg_data['datetime']
-            })
-    
-    print(f"\nPractice updates: {practice_updates}")
-    print(f"Message updates: {message_updates}")
-    print(f"\nFound {len(practice_updates)} unique phone numbers for practice updates")
-    print(f"Found {len(message_updates)} unique phone numbers for message updates")
-    
-    return {
-        'practice_updates': practice_updates,
-        'message_updates': message_updates
-    }
\ No newline at end of file
+        return {
+            'practice_updates': practice_updates,
+            'message_updates': message_updates
+        }
+
+def message_formatter(message_data):
+    """
+    Process message data and return categorized messages for sheet updates.
+    Accepts RawMessage records (or the equivalent dicts) and returns a dict with
+    'practice_updates' (for column E) and 'message_updates' (for column H), lists of SheetUpdate.
+    For each phone number, keeps the most recent message of each type (practice/sent).
+    Messages tagged with a "group" are kept per (group, phone) and the group is
+    carried into the updates so the Sheets stage can route them.
+    """
+    classifier = MessageClassifier()
+    for message in message_data:
+        classifier.add(message)
+    return classifier.updates()
@@ -0,0 +1,117 @@
+import os
+import queue
+import threading
+from dotenv import load_dotenv
+
+from whatsapp_session import WhatsAppSession, RemoteGridFactory
+from whatsapp_scraper import scrape_group
+from whatsapp_dom import get_group_names
+from message_cursor import cursor_for
+
+
+class GridScrapePool:
+    """
+    Fans WhatsApp groups out across up to `workers` Selenium Grid sessions.
+
+    Every worker owns one WhatsAppSession with its own Chrome profile
+    (CHROME_PROFILE_DIR-<n>), because WhatsApp Web only lets one browser use a
+    linked-device login at a time: each profile has to be QR-linked once.
+    A worker that finds no more groups to take quits its browser, freeing its
+    grid slot for the workers still scraping; the last one stays open between
+    scrape() calls, so watch mode keeps one browser warm.
+    A group that fails is retried up to `retries` times, on a fresh browser.
+
+    Every worker holds a grid slot: selenium/standalone-chrome (the Dockerfile)
+    has one unless SE_NODE_MAX_SESSIONS is raised, hence GRID_WORKERS=1 by default.
+    """
+
+    def __init__(self, workers=None, retries=None, grid_url=None, profile_dir=None):
+        load_dotenv()
+        self.workers = max(1, workers or int(os.getenv("GRID_WORKERS", "1")))
+        self.retries = int(os.getenv("GROUP_RETRIES", "2")) if retries is None else retries
+        factory = RemoteGridFactory(grid_url)
+        self.grid_url = factory.grid_url
+        base_profile = profile_dir or os.getenv("CHROME_PROFILE_DIR", "whatsapp_session")
+        self.sessions = [
+            WhatsAppSession(factory, f"{base_profile}-{n}") for n in range(self.workers)
+        ]
+        self.failures = {}
+        self._running = 0
+
+    def _work(self, session, pending, results, cursors, lock):
+        while True:
+            try:
+                index, group_name, attempt = pending.get_nowait()
+            except queue.Empty:
+                with lock:
+                    self._running -= 1
+                    last = self._running == 0
+                if not last:
+                    # Free the grid slot; the next scrape() opens the browser again
+                    session.invalidate()
+                return
+
+            try:
+                messages = scrape_group(session, group_name, cursor_for(cursors, group_name))
+                with lock:
+                    results[index] = messages
+            except Exception as e:
+                # Start the next attempt on a new browser
+                session.invalidate()
+                if attempt < self.retries:
+                    print(f"Group '{group_name}' failed ({e}), retrying ({attempt + 1}/{self.retries})")
+                    pending.put((index, group_name, attempt + 1))
+                else:
+                    print(f"❌ Group '{group_name}' failed after {attempt + 1} attempts: {e}")
+                    with lock:
+                        self.failures[group_name] = e
+
+    def scrape(self, cursors=None, group_names=None):
+        """
+        Scrape every group and return the merged messages in GROUP_NAME order,
+        the same list-of-dicts shape open_whatsapp returns. Groups that still
+        fail after their retries are left out (see `failures`), so their
+        cursors are not advanced.
+        """
+        group_names = group_names if group_names is not None else get_group_names()
+        if not group_names:
+            raise ValueError("GROUP_NAME environment variable is not set.")
+
+        pending = queue.Queue()
+        for index, group_name in enumerate(group_names):
+            pending.put((index, group_name, 0))
+
+        results = {}
+        self.failures = {}
+        lock = threading.Lock()
+
+        active = self.sessions[:min(self.workers, len(group_names))]
+        self._running = len(active)
+        threads = [
+            threading.Thread(target=self._work, args=(session, pending, results, cursors, lock), daemon=True)
+            for session in active
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        message_data = [message for index in sorted(results) for message in results[index]]
+        print(f"\nScraped {len(results)}/{len(group_names)} groups on {len(active)} sessions, {len(message_data)} new messages")
+        return message_data
+
+    def close(self):
+        for session in self.sessions:
+            session.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+def scrape_groups_parallel(cursors=None, workers=None, retries=None, grid_url=None):
+    """One-shot parallel scrape: open a pool, scrape all groups, close the browsers."""
+    with GridScrapePool(workers, retries, grid_url) as pool:
+        return pool.scrape(cursors)
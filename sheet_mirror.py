@@ -0,0 +1,259 @@
+import json
+import os
+import sqlite3
+from dotenv import load_dotenv
+from gspread.exceptions import APIError
+from gspread.utils import a1_to_rowcol
+
+from phone_numbers import normalize_phone
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS stamps (
+    sheet_id TEXT PRIMARY KEY,
+    layout TEXT NOT NULL,
+    modified_time TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS sheet_rows (
+    sheet_id TEXT NOT NULL,
+    tab TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    cells TEXT NOT NULL,
+    PRIMARY KEY (sheet_id, tab, number)
+);
+CREATE TABLE IF NOT EXISTS index_stamps (
+    sheet_id TEXT PRIMARY KEY,
+    modified_time TEXT
+);
+CREATE TABLE IF NOT EXISTS phone_rows (
+    sheet_id TEXT NOT NULL,
+    tab TEXT NOT NULL,
+    number INTEGER NOT NULL,
+    phone TEXT NOT NULL,
+    PRIMARY KEY (sheet_id, tab, number)
+);
+CREATE INDEX IF NOT EXISTS phone_rows_by_phone ON phone_rows (sheet_id, tab, phone);
+"""
+
+
+load_dotenv()
+# SHEET_MIRROR: keep a local copy of the data and main tabs between runs (needs the Drive API)
+MIRROR_ENABLED = os.getenv("SHEET_MIRROR", "false").strip().lower() in ("1", "true", "yes")
+MIRROR_PATH = os.getenv("SHEET_MIRROR_PATH") or os.path.join(os.getenv("CSV_DOWNLOAD") or ".", "sheet_mirror.sqlite3")
+# PHONE_INDEX: find the rows of the updated phones in a phone -> row index (stored with the mirror)
+# and read only those rows, as long as there are at most PHONE_INDEX_MAX_ROWS of them
+INDEX_ENABLED = os.getenv("PHONE_INDEX", "false").strip().lower() in ("1", "true", "yes")
+INDEX_MAX_ROWS = int(os.getenv("PHONE_INDEX_MAX_ROWS", "200"))
+
+
+class _SheetStore:
+    """SQLite file shared by the sheet mirror and the phone index."""
+
+    def __init__(self, path=None):
+        self.path = path or MIRROR_PATH
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.db = sqlite3.connect(self.path)
+        self.db.executescript(SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+
+class SheetMirror(_SheetStore):
+    """
+    SQLite copy of the tabs update_sheets_data reads, per spreadsheet, stamped
+    with the spreadsheet's Drive modifiedTime.
+
+    load() returns the stored rows only while the stamp still matches the
+    spreadsheet (and the same columns were read), so any edit made in the
+    sheet sends the next run back to a full read. Our own writes are applied
+    to the copy as they are sent (apply()) and the copy is then restamped
+    with the new modifiedTime (restamp()), so they don't invalidate it.
+    An edit landing between our read and our write is missed until the next
+    external change, like the read-modify-write it mirrors.
+    """
+
+    def load(self, sheet_id, modified_time, layout):
+        """{tab: rows} as stored for `sheet_id`, or None if missing or stale."""
+        stamp = self.db.execute(
+            "SELECT layout, modified_time FROM stamps WHERE sheet_id = ?", (sheet_id,)
+        ).fetchone()
+        if stamp != (json.dumps(layout, sort_keys=True), modified_time):
+            return None
+
+        tabs = {tab: [] for tab in layout}
+        for tab, number, cells in self.db.execute(
+            "SELECT tab, number, cells FROM sheet_rows WHERE sheet_id = ? ORDER BY tab, number", (sheet_id,)
+        ):
+            rows = tabs.setdefault(tab, [])
+            rows.extend([] for _ in range(number - 1 - len(rows)))
+            rows.append(json.loads(cells))
+        return tabs
+
+    def save(self, sheet_id, modified_time, layout, tabs):
+        """Replace the copy of `sheet_id` with freshly read `tabs`."""
+        with self.db:
+            self.db.execute("DELETE FROM sheet_rows WHERE sheet_id = ?", (sheet_id,))
+            self.db.executemany(
+                "INSERT INTO sheet_rows (sheet_id, tab, number, cells) VALUES (?, ?, ?, ?)",
+                (
+                    (sheet_id, tab, number, json.dumps(row, ensure_ascii=False))
+                    for tab, rows in tabs.items()
+                    for number, row in enumerate(rows, start=1)
+                ),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO stamps (sheet_id, layout, modified_time) VALUES (?, ?, ?)",
+                (sheet_id, json.dumps(layout, sort_keys=True), modified_time),
+            )
+
+    def apply(self, sheet_id, tab, updates):
+        """Write batch_update-style [{'range': 'D5', 'values': [[...]]}, ...] through to the copy."""
+        with self.db:
+            for update in updates:
+                start = update['range'].split('!')[-1].split(':')[0]
+                first_row, first_col = a1_to_rowcol(start)
+                for number, values in enumerate(update['values'], start=first_row):
+                    stored = self.db.execute(
+                        "SELECT cells FROM sheet_rows WHERE sheet_id = ? AND tab = ? AND number = ?",
+                        (sheet_id, tab, number),
+                    ).fetchone()
+                    row = json.loads(stored[0]) if stored else []
+                    row.extend([''] * (first_col - 1 + len(values) - len(row)))
+                    # Stored as the sheet shows them: numbers come back as text
+                    row[first_col - 1:first_col - 1 + len(values)] = [str(value) for value in values]
+                    self.db.execute(
+                        "INSERT OR REPLACE INTO sheet_rows (sheet_id, tab, number, cells) VALUES (?, ?, ?, ?)",
+                        (sheet_id, tab, number, json.dumps(row, ensure_ascii=False)),
+                    )
+
+    def restamp(self, sheet_id, previous, modified_time):
+        """
+        After our own write: move the stamp from `previous` to `modified_time`,
+        if the copy was current. Our writes never move phone numbers, so the
+        phone index stamp moves along.
+        """
+        with self.db:
+            for table in ("stamps", "index_stamps"):
+                self.db.execute(
+                    f"UPDATE {table} SET modified_time = ? WHERE sheet_id = ? AND modified_time = ?",
+                    (modified_time, sheet_id, previous),
+                )
+
+    def forget(self, sheet_id):
+        """Drop the copy of `sheet_id`: the next run reads the sheet again."""
+        with self.db:
+            self.db.execute("DELETE FROM stamps WHERE sheet_id = ?", (sheet_id,))
+            self.db.execute("DELETE FROM sheet_rows WHERE sheet_id = ?", (sheet_id,))
+
+
+
+def phone_rows(rows, phone_column):
+    """{row number: normalized phone} of the rows read from a tab (header row excluded)."""
+    phones = {}
+    for number, row in enumerate(rows[1:], start=2):
+        phone = normalize_phone(row[phone_column - 1]) if len(row) >= phone_column else ''
+        if phone:
+            phones[number] = phone
+    return phones
+
+
+class PhoneIndex(_SheetStore):
+    """
+    Row numbers of the phone numbers of the data and main tabs, per
+    spreadsheet, so update_sheets_data can read just the rows it updates.
+
+    The index can go stale when rows are inserted, deleted or sorted in the
+    sheet: callers check every row they read against it and rebuild it when
+    one doesn't match. It is stamped with the spreadsheet's modifiedTime when
+    the mirror provides one, which tells that a phone missing from a current
+    index is not in the sheet at all.
+    """
+
+    def built(self, sheet_id):
+        return self.db.execute("SELECT 1 FROM index_stamps WHERE sheet_id = ?", (sheet_id,)).fetchone() is not None
+
+    def current(self, sheet_id, modified_time):
+        """Was the index built from the spreadsheet as it is at `modified_time`?"""
+        if modified_time is None:
+            return False
+        stamp = self.db.execute("SELECT modified_time FROM index_stamps WHERE sheet_id = ?", (sheet_id,)).fetchone()
+        return stamp is not None and stamp[0] == modified_time
+
+    def rebuild(self, sheet_id, tabs, modified_time=None):
+        """Replace the index of `sheet_id` with {tab: {row number: phone}}."""
+        with self.db:
+            self.db.execute("DELETE FROM phone_rows WHERE sheet_id = ?", (sheet_id,))
+            self.db.executemany(
+                "INSERT INTO phone_rows (sheet_id, tab, number, phone) VALUES (?, ?, ?, ?)",
+                ((sheet_id, tab, number, phone) for tab, phones in tabs.items() for number, phone in phones.items()),
+            )
+            self.db.execute(
+                "INSERT OR REPLACE INTO index_stamps (sheet_id, modified_time) VALUES (?, ?)",
+                (sheet_id, modified_time),
+            )
+
+    def rows(self, sheet_id, tab, phones):
+        """{row number: phone} for the rows of `tab` holding any of `phones`."""
+        found = {}
+        phones = list(phones)
+        # Stay under SQLite's bound parameter limit
+        for start in range(0, len(phones), 500):
+            chunk = phones[start:start + 500]
+            found.update(self.db.execute(
+                f"SELECT number, phone FROM phone_rows WHERE sheet_id = ? AND tab = ? AND phone IN ({', '.join('?' * len(chunk))})",
+                (sheet_id, tab, *chunk),
+            ))
+        return dict(sorted(found.items()))
+
+    def entries(self, sheet_id):
+        """The whole index of `sheet_id`: {tab: {row number: phone}}."""
+        tabs = {}
+        for tab, number, phone in self.db.execute(
+            "SELECT tab, number, phone FROM phone_rows WHERE sheet_id = ? ORDER BY tab, number", (sheet_id,)
+        ):
+            tabs.setdefault(tab, {})[number] = phone
+        return tabs
+
+    def forget(self, sheet_id):
+        with self.db:
+            self.db.execute("DELETE FROM index_stamps WHERE sheet_id = ?", (sheet_id,))
+            self.db.execute("DELETE FROM phone_rows WHERE sheet_id = ?", (sheet_id,))
+
+
+def mirror_stamp(session, sheet_id):
+    """
+    The modifiedTime to check the mirror of `sheet_id` against, or None when
+    the mirror is off or the Drive API can't be reached (then the sheet is read in full).
+    """
+    if not MIRROR_ENABLED:
+        return None
+    try:
+        return session.modified_time(sheet_id)
+    except APIError as e:
+        print(f"Warning: could not get the spreadsheet's modifiedTime, not using the sheet mirror ({e})")
+        return None
+
+
+def restamp_after_write(session, sheet_id, previous, updates=None):
+    """
+    Record our own write to `sheet_id` in the mirror: apply `updates`
+    ({tab: batch_update list}, None when the write touched no mirrored tab)
+    and move the stamp from `previous` to the new modifiedTime.
+    """
+    with SheetMirror() as mirror:
+        try:
+            modified_time = session.modified_time(sheet_id)
+        except APIError:
+            mirror.forget(sheet_id)
+            return
+        for tab, tab_updates in (updates or {}).items():
+            mirror.apply(sheet_id, tab, tab_updates)
+        mirror.restamp(sheet_id, previous, modified_time)
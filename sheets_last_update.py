@@ -1,15 +1,11 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import os
 from dotenv import load_dotenv
 from datetime import datetime
 
-def last_time_updated():
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-
-    creds = Credentials.from_service_account_file("sheets-api-cred.json", scopes=scopes)
-    client = gspread.authorize(creds)
+from sheets_session import get_sheets_session
+from sheet_mirror import mirror_stamp, restamp_after_write
 
+def last_time_updated():
     # Load .env file
     load_dotenv()
     sheet_id = os.getenv("SHEET_ID")
@@ -19,9 +15,13 @@ def last_time_updated():
 
     print(f"Loaded Sheet ID: {sheet_id}")
 
-    sheet = client.open_by_key(sheet_id)
-    worksheet = sheet.worksheet("dashboard")
+    session = get_sheets_session()
+    worksheet = session.worksheet(sheet_id, "dashboard")
+    # The dashboard isn't mirrored: don't let this write invalidate the sheet mirror
+    stamp = mirror_stamp(session, sheet_id)
 
     current_datetime = datetime.now().strftime("%d-%m %H:%M")
     worksheet.update_acell('C9', f"'{current_datetime}")
+    if stamp is not None:
+        restamp_after_write(session, sheet_id, stamp)
     print(f"Updated cell C9 with: {current_datetime}")
\ No newline at end of file
@@ -0,0 +1,90 @@
+import os
+import gspread
+from dotenv import load_dotenv
+from google.oauth2.service_account import Credentials
+
+from time_log import count_metric
+import sheet_mirror
+
+SCOPES = ["https://www.googleapis.com/auth/spreadsheets"]
+# Drive modifiedTime of the spreadsheet, for the sheet mirror
+DRIVE_METADATA_SCOPE = "https://www.googleapis.com/auth/drive.metadata.readonly"
+# Service account key of every Sheets stage: KEY_PATH, or sheets-api-cred.json in the working directory
+KEY_FILE = "sheets-api-cred.json"
+load_dotenv()
+KEY_PATH = os.getenv("KEY_PATH") or KEY_FILE
+
+
+class SheetsSession:
+    """
+    One authorized gspread client for every Sheets stage of the process.
+
+    The service account key is loaded and authorized once; gspread's
+    AuthorizedSession keeps the HTTP connections pooled and refreshes the
+    access token only when it expires. Spreadsheet and Worksheet handles are
+    cached per sheet id, so the stages of a run (and the runs of watch mode)
+    reuse the metadata fetched by the first one. Every reuse is counted in
+    the run summary as "sheets round trips saved".
+    """
+
+    def __init__(self, key_file=None, scopes=SCOPES):
+        self.key_file = key_file or KEY_PATH
+        self.scopes = scopes
+        self._client = None
+        self._spreadsheets = {}
+        self._worksheets = {}
+
+    def client(self):
+        """The gspread client, authorized on first use."""
+        if self._client is None:
+            creds = Credentials.from_service_account_file(self.key_file, scopes=self.scopes)
+            self._client = gspread.authorize(creds)
+        else:
+            # Key file load + token exchange
+            count_metric("sheets round trips saved")
+        return self._client
+
+    def spreadsheet(self, sheet_id):
+        """The Spreadsheet `sheet_id`, opened (one metadata fetch) on first use."""
+        spreadsheet = self._spreadsheets.get(sheet_id)
+        if spreadsheet is None:
+            spreadsheet = self._spreadsheets[sheet_id] = self.client().open_by_key(sheet_id)
+        else:
+            count_metric("sheets round trips saved")
+        return spreadsheet
+
+    def worksheet(self, sheet_id, title):
+        """A worksheet of `sheet_id` by title; Spreadsheet.worksheet() fetches the metadata on every call."""
+        worksheet = self._worksheets.get((sheet_id, title))
+        if worksheet is None:
+            worksheet = self._worksheets[(sheet_id, title)] = self.spreadsheet(sheet_id).worksheet(title)
+        else:
+            count_metric("sheets round trips saved")
+        return worksheet
+
+    def modified_time(self, sheet_id):
+        """The Drive modifiedTime of `sheet_id` (a small Drive API request, needs DRIVE_METADATA_SCOPE)."""
+        return self.spreadsheet(sheet_id).get_lastUpdateTime()
+
+    def invalidate(self):
+        """Drop the client and every cached handle, so the next call authorizes and opens again."""
+        self._client = None
+        self._spreadsheets.clear()
+        self._worksheets.clear()
+
+
+_session = None
+
+
+def get_sheets_session():
+    """The process-wide SheetsSession, created on first use."""
+    global _session
+    if _session is None:
+        _session = SheetsSession(scopes=SCOPES + [DRIVE_METADATA_SCOPE] if sheet_mirror.MIRROR_ENABLED else SCOPES)
+    return _session
+
+
+def reset_sheets_session():
+    """Forget the process-wide session (after an API error, or between tests)."""
+    global _session
+    _session = None
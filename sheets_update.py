@@ -1,15 +1,155 @@
-import gspread
-from google.oauth2.service_account import Credentials
 import os
 from dotenv import load_dotenv
+from gspread.utils import a1_to_rowcol, rowcol_to_a1, absolute_range_name
+import logging
 import re
+import json
+from datetime import datetime
 
-def update_sheets_data(message_data):
+from phone_numbers import normalize_phone
+from records import SheetUpdate
+from sheets_session import get_sheets_session
+from sheet_writes import write_planned
+from sheet_mirror import SheetMirror, PhoneIndex, phone_rows, mirror_stamp, restamp_after_write, INDEX_ENABLED, INDEX_MAX_ROWS
+from time_log import count_metric
+
+logger = logging.getLogger(__name__)
+
+load_dotenv()
+# Column of the phone numbers, on both the data and main tabs
+PHONE_COLUMN = os.getenv("PHONE_COLUMN", "A").strip().upper()
+
+# Columns update_sheets_data reads besides the phone column, as 1-based (first, last) spans
+DATA_COLUMNS = [(2, 6)]  # B-F: message datetime/date, practice datetime/date, message counter
+MAIN_COLUMNS = [(2, 2), (8, 25)]  # B: class, H-Y: שיעור 1-18 counters
+
+
+def _merge_spans(spans):
+    """Sort column spans and merge the overlapping and adjacent ones."""
+    merged = []
+    for first, last in sorted(spans):
+        if merged and first <= merged[-1][1] + 1:
+            merged[-1][1] = max(merged[-1][1], last)
+        else:
+            merged.append([first, last])
+    return merged
+
+
+def _column_letter(column):
+    return rowcol_to_a1(1, column)[:-1]
+
+
+def read_columns(spreadsheet, columns):
+    """
+    Read some columns of several tabs in a single values:batchGet request.
+    `columns` maps a tab title to 1-based (first, last) column spans. Returns
+    {title: rows} with the rows laid out like get_all_values() (header row
+    first, cells at their column index, '' in the columns that were not read).
+    """
+    requested = []
+    for title, spans in columns.items():
+        for first, last in _merge_spans(spans):
+            requested.append((title, first, absolute_range_name(title, f"{_column_letter(first)}:{_column_letter(last)}")))
+
+    response = spreadsheet.values_batch_get([name for _, _, name in requested])
+
+    tabs = {title: [] for title in columns}
+    for (title, first, _), value_range in zip(requested, response.get('valueRanges', [])):
+        rows = tabs[title]
+        for number, values in enumerate(value_range.get('values', [])):
+            if number == len(rows):
+                rows.append([])
+            # Spans are read left to right, so the row ends before this span starts
+            row = rows[number]
+            row.extend([''] * (first - 1 - len(row)))
+            row.extend(values)
+    return tabs
+
+
+def _check_phone_header(tabs, phone_column):
+    """Fail the run when PHONE_COLUMN of a tab read with its header row is not 'phone number'."""
+    for title, rows in tabs.items():
+        headers = rows[0] if rows else []
+        header = headers[phone_column - 1] if len(headers) >= phone_column else ''
+        if header != 'phone number':
+            # A wrong column would match no phone and report success
+            raise ValueError(f"Column {PHONE_COLUMN} of the {title} sheet is '{header}', expected 'phone number' (see PHONE_COLUMN)")
+
+
+def read_rows(spreadsheet, rows, columns):
+    """
+    Read a few whole rows of several tabs in a single values:batchGet, each
+    run of consecutive rows as one range. `rows` maps a tab title to row
+    numbers and `columns` to the column spans to cover. Returns
+    {title: {row number: row}}, rows laid out like read_columns().
+    """
+    requested = []
+    for title, numbers in rows.items():
+        first = min(span[0] for span in columns[title])
+        last = max(span[1] for span in columns[title])
+        for top, bottom in _merge_spans((number, number) for number in numbers):
+            name = absolute_range_name(title, f"{_column_letter(first)}{top}:{_column_letter(last)}{bottom}")
+            requested.append((title, top, bottom, first, name))
+
+    found = {title: {} for title in rows}
+    if not requested:
+        return found
+    response = spreadsheet.values_batch_get([request[-1] for request in requested])
+    for (title, top, bottom, first, _), value_range in zip(requested, response.get('valueRanges', [])):
+        values = value_range.get('values', [])
+        for number in range(top, bottom + 1):
+            cells = values[number - top] if number - top < len(values) else []
+            found[title][number] = [''] * (first - 1) + cells
+    return found
+
+
+def _indexed_rows(session, sheet_id, columns, phone_column, wanted, stamp, tabs=None):
+    """
+    The rows holding the `wanted` phones ({tab: phones}) found with the phone
+    index, as {tab: [(row number, row)]}: taken from `tabs` when the tabs were
+    already read (mirror), otherwise read with one targeted batchGet.
+    Returns None when the index can't serve this run (more than
+    PHONE_INDEX_MAX_ROWS rows, or a row that no longer holds its phone):
+    the tabs are then read in full.
+    """
+    with PhoneIndex() as index:
+        found = {tab: index.rows(sheet_id, tab, phones) for tab, phones in wanted.items()}
+        missing = any(set(phones) - set(found[tab].values()) for tab, phones in wanted.items())
+        if not index.built(sheet_id) or (missing and not index.current(sheet_id, stamp)):
+            # New phones may have been added: re-index from the phone columns only
+            source = tabs or read_columns(session.spreadsheet(sheet_id), {tab: [(phone_column, phone_column)] for tab in columns})
+            _check_phone_header(source, phone_column)
+            index.rebuild(sheet_id, {tab: phone_rows(source[tab], phone_column) for tab in columns}, stamp)
+            count_metric("phone index rebuilds")
+            found = {tab: index.rows(sheet_id, tab, phones) for tab, phones in wanted.items()}
+
+        total = sum(len(numbers) for numbers in found.values())
+        if total > INDEX_MAX_ROWS:
+            return None
+        if tabs is not None:
+            rows = {tab: {number: tabs[tab][number - 1] if number <= len(tabs[tab]) else [] for number in numbers}
+                    for tab, numbers in found.items()}
+        else:
+            rows = read_rows(session.spreadsheet(sheet_id), found, columns)
+
+        for tab, numbers in found.items():
+            for number, phone in numbers.items():
+                row = rows[tab][number]
+                if normalize_phone(row[phone_column - 1] if len(row) >= phone_column else '') != phone:
+                    print(f"Warning: row {number} of the {tab} sheet moved since the phone index was built, reading the sheet in full")
+                    index.forget(sheet_id)
+                    return None
+
+    count_metric("rows read through the phone index", total)
+    return {tab: [(number, rows[tab][number]) for number in numbers] for tab, numbers in found.items()}
+
+
+def update_sheets_data(message_data, sheet_id=None):
     """
     Update Google Sheets with message data.
     Expects message_data to be a dict with:
-    - 'practice_updates': list of dicts with 'sender', 'date', 'datetime', and 'class_number'
-    - 'message_updates': list of dicts with 'sender', 'date', and 'datetime'
+    - 'practice_updates': list of SheetUpdate (or dicts) with 'sender', 'date', 'datetime', and 'class_number'
+    - 'message_updates': list of SheetUpdate (or dicts) with 'sender', 'date', and 'datetime'
     Phone numbers should already be cleaned and dates formatted.
     
     Updates in 'data' sheet:
@@ -21,50 +161,79 @@ def update_sheets_data(message_data):
     
     Updates in 'main' sheet:
     - Columns H-Y: שיעור 1-18 counters (increments when practice update matches class in column B)
-    """
-    scopes = ["https://www.googleapis.com/auth/spreadsheets"]
-
-    creds = Credentials.from_service_account_file("sheets-api-cred.json", scopes=scopes)
-    client = gspread.authorize(creds)
 
+    Writes to the spreadsheet `sheet_id`, SHEET_ID from the environment by default.
+    A failed write is raised after it is reported.
+    """
     # Load .env file
     load_dotenv()
-    sheet_id = os.getenv("SHEET_ID")
+    sheet_id = sheet_id or os.getenv("SHEET_ID")
 
     if not sheet_id:
         raise ValueError("SHEET_ID not found in environment variables!")
 
     print(f"Loaded Sheet ID: {sheet_id}")
 
-    sheet = client.open_by_key(sheet_id)
-    datasheet = sheet.worksheet("data")
-    mainsheet = sheet.worksheet("main")
+    # Authorized client and worksheet handles are shared with the other Sheets stages.
+    # Reads and writes go through the spreadsheet; the handles fail early (WorksheetNotFound) on a missing tab
+    session = get_sheets_session()
+    session.worksheet(sheet_id, "data")
+    session.worksheet(sheet_id, "main")
     
-    # Fetch all data at once to avoid API rate limits
-    data_all = datasheet.get_all_values()
-    data_headers = data_all[0] if data_all else []
-    data_records = data_all[1:] if len(data_all) > 1 else []
-    
-    main_all = mainsheet.get_all_values()
-    main_headers = main_all[0] if main_all else []
-    main_records = main_all[1:] if len(main_all) > 1 else []
-
     # Create lookup dictionaries from the messages
+    # Lookups keyed by phone; the lookup dicts are what the row loops below read
     practice_lookup = {}
-    for message in message_data['practice_updates']:
-        practice_lookup[message['sender']] = {
-            'date': message['date'],
-            'datetime': message['datetime'],
-            'class_number': message.get('class_number')  # Store class number
+    for message in map(SheetUpdate.coerce, message_data['practice_updates']):
+        practice_lookup[normalize_phone(message.sender)] = {
+            'date': message.date,
+            'datetime': message.datetime,
+            'class_number': message.class_number  # Store class number
         }
     
     message_lookup = {}
-    for message in message_data['message_updates']:
-        message_lookup[message['sender']] = {
-            'date': message['date'],
-            'datetime': message['datetime']
+    for message in map(SheetUpdate.coerce, message_data['message_updates']):
+        message_lookup[normalize_phone(message.sender)] = {
+            'date': message.date,
+            'datetime': message.datetime
         }
     
+    # Fetch both tabs in one request, only the columns used below
+    phone_column = a1_to_rowcol(f"{PHONE_COLUMN}1")[1]
+    columns = {
+        "data": [(phone_column, phone_column)] + DATA_COLUMNS,
+        "main": [(phone_column, phone_column)] + MAIN_COLUMNS,
+    }
+    # ...unless the local mirror (SHEET_MIRROR) is still current
+    stamp = mirror_stamp(session, sheet_id)
+    tabs = None
+    if stamp is not None:
+        with SheetMirror() as mirror:
+            tabs = mirror.load(sheet_id, stamp, columns)
+    if tabs is not None:
+        count_metric("sheet reads from mirror")
+
+    # Rows to process as (row number, row): with PHONE_INDEX only the rows of the updated phones
+    data_rows = main_rows = None
+    if INDEX_ENABLED:
+        wanted = {"data": set(practice_lookup) | set(message_lookup), "main": set(practice_lookup)}
+        indexed = _indexed_rows(session, sheet_id, columns, phone_column, wanted, stamp, tabs)
+        if indexed is not None:
+            data_rows, main_rows = indexed["data"], indexed["main"]
+
+    if data_rows is None:
+        if tabs is None:
+            tabs = read_columns(session.spreadsheet(sheet_id), columns)
+            # The phone column is PHONE_COLUMN on both tabs (a mirror copy was checked when it was read)
+            _check_phone_header(tabs, phone_column)
+            if stamp is not None:
+                with SheetMirror() as mirror:
+                    mirror.save(sheet_id, stamp, columns, tabs)
+            if INDEX_ENABLED:
+                with PhoneIndex() as index:
+                    index.rebuild(sheet_id, {tab: phone_rows(tabs[tab], phone_column) for tab in columns}, stamp)
+        data_rows = list(enumerate(tabs["data"][1:], start=2))
+        main_rows = list(enumerate(tabs["main"][1:], start=2))
+
     print(f"\nProcessing {len(practice_lookup)} practice updates and {len(message_lookup)} message updates")
     
     # Track updates
@@ -74,27 +243,8 @@ def update_sheets_data(message_data):
     message_updated = 0
     class_counters_updated = 0
     
-    # Debug: Print what we're looking for
-    print("\n=== DEBUGGING INFO ===")
-    print("Practice lookup keys (cleaned phone numbers):")
-    for phone, data in practice_lookup.items():
-        class_num = data.get('class_number', 'N/A')
-        print(f"  '{phone}' - Class: {class_num}")
-    
-    print("\nMessage lookup keys (cleaned phone numbers):")
-    for phone in message_lookup.keys():
-        print(f"  '{phone}'")
-    
-    # Helper function to get column index from header name
-    def get_column_index(header_name, headers_list):
-        """Get column index (0-based) from header name"""
-        try:
-            return headers_list.index(header_name)
-        except ValueError:
-            return None
-    
     # Get column indices for data sheet
-    data_phone_col = get_column_index('phone number', data_headers)
+    data_phone_col = phone_column - 1
     message_datetime_col = 1  # Column B
     message_date_col = 2  # Column C
     practice_datetime_col = 3  # Column D
@@ -102,21 +252,28 @@ def update_sheets_data(message_data):
     message_counter_col = 5  # Column F
     
     # Get column indices for main sheet
-    main_phone_col = get_column_index('phone number', main_headers)
+    main_phone_col = phone_column - 1
     main_class_col = 1  # Column B
     
-    print(f"\nData sheet phone numbers:")
-    for i, row in enumerate(data_records, start=2):
-        sheet_phone = row[data_phone_col] if data_phone_col is not None and len(row) > data_phone_col else ''
-        if sheet_phone:
-            print(f"  Row {i}: '{sheet_phone}'")
-    
-    print(f"\nMain sheet phone numbers:")
-    for i, row in enumerate(main_records, start=2):
-        sheet_phone = row[main_phone_col] if main_phone_col is not None and len(row) > main_phone_col else ''
-        if sheet_phone:
-            print(f"  Row {i}: '{sheet_phone}'")
-    print("======================\n")
+    # Debug dump of the lookups and sheet phones: only built when DEBUG logging is on
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("Practice lookup keys (cleaned phone numbers):")
+        for phone, data in practice_lookup.items():
+            logger.debug("  '%s' - Class: %s", phone, data.get('class_number', 'N/A'))
+        logger.debug("Message lookup keys (cleaned phone numbers):")
+        for phone in message_lookup:
+            logger.debug("  '%s'", phone)
+
+        logger.debug("Data sheet phone numbers:")
+        for i, row in data_rows:
+            sheet_phone = row[data_phone_col] if data_phone_col is not None and len(row) > data_phone_col else ''
+            if sheet_phone:
+                logger.debug("  Row %d: '%s'", i, sheet_phone)
+        logger.debug("Main sheet phone numbers:")
+        for i, row in main_rows:
+            sheet_phone = row[main_phone_col] if main_phone_col is not None and len(row) > main_phone_col else ''
+            if sheet_phone:
+                logger.debug("  Row %d: '%s'", i, sheet_phone)
     
     def get_class_column_from_number(class_number):
         """
@@ -147,15 +304,15 @@ def update_sheets_data(message_data):
     phones_with_practice_updates = {}
     
     # Process each row in the DATA spreadsheet
-    print("=== Processing DATA sheet ===")
-    for i, row in enumerate(data_records, start=2):  # start=2 because row 1 is headers
+    logger.debug("=== Processing DATA sheet ===")
+    for i, row in data_rows:  # row numbers start at 2, row 1 is headers
         sheet_phone = row[data_phone_col] if data_phone_col is not None and len(row) > data_phone_col else ''
         
         if sheet_phone:  # Only process rows with phone numbers
-            # Clean the sheet phone number to match our lookup format
-            cleaned_sheet_phone = sheet_phone.replace(' ', '').replace('-', '').lstrip('+')
+            # Normalize the sheet phone number exactly like the message senders
+            cleaned_sheet_phone = normalize_phone(sheet_phone)
             
-            print(f"Row {i}:")
+            logger.debug("Row %d:", i)
             
             # Check for practice updates (column D for datetime, column E for date)
             if cleaned_sheet_phone in practice_lookup:
@@ -166,9 +323,9 @@ def update_sheets_data(message_data):
                 # Get current practice datetime from column D (index 3)
                 current_practice_datetime = row[practice_datetime_col] if len(row) > practice_datetime_col else ''
                 
-                print(f"  Found practice match! Current practice datetime: '{current_practice_datetime}' -> New: '{new_datetime}'")
+                logger.debug("  Found practice match! Current practice datetime: '%s' -> New: '%s'", current_practice_datetime, new_datetime)
                 if practice_class_number:
-                    print(f"  Practice is for class: {practice_class_number}")
+                    logger.debug("  Practice is for class: %s", practice_class_number)
                 
                 # Update datetime in column D if different
                 if current_practice_datetime != new_datetime:
@@ -188,11 +345,11 @@ def update_sheets_data(message_data):
                     if practice_class_number:
                         phones_with_practice_updates[cleaned_sheet_phone] = practice_class_number
                     
-                    print(f"  ✅ UPDATING practice datetime for {cleaned_sheet_phone} from '{current_practice_datetime}' to '{new_datetime}' (Column D)")
-                    print(f"  ✅ UPDATING last practice date for {cleaned_sheet_phone} to '{new_date}' (Column E)")
+                    logger.debug("  ✅ UPDATING practice datetime for %s from '%s' to '%s' (Column D)", cleaned_sheet_phone, current_practice_datetime, new_datetime)
+                    logger.debug("  ✅ UPDATING last practice date for %s to '%s' (Column E)", cleaned_sheet_phone, new_date)
                     practice_updated += 1
                 else:
-                    print(f"  ➖ {cleaned_sheet_phone} already has current practice datetime '{current_practice_datetime}' (Column D)")
+                    logger.debug("  ➖ %s already has current practice datetime '%s' (Column D)", cleaned_sheet_phone, current_practice_datetime)
             
             # Check for message updates (column B for datetime, column C for date, column F for counter)
             if cleaned_sheet_phone in message_lookup:
@@ -202,7 +359,7 @@ def update_sheets_data(message_data):
                 # Get current message datetime from column B (index 1)
                 current_message_datetime = row[message_datetime_col] if len(row) > message_datetime_col else ''
                 
-                print(f"  Found message match! Current message datetime: '{current_message_datetime}' -> New: '{new_datetime}'")
+                logger.debug("  Found message match! Current message datetime: '%s' -> New: '%s'", current_message_datetime, new_datetime)
                 
                 # Update datetime in column B if different
                 if current_message_datetime != new_datetime:
@@ -233,31 +390,31 @@ def update_sheets_data(message_data):
                         'values': [[new_message_counter]]
                     })
                     
-                    print(f"  ✅ UPDATING message datetime for {cleaned_sheet_phone} from '{current_message_datetime}' to '{new_datetime}' (Column B)")
-                    print(f"  ✅ UPDATING message date for {cleaned_sheet_phone} to '{new_date}' (Column C)")
-                    print(f"  ✅ INCREMENTING message counter for {cleaned_sheet_phone} from {current_message_counter} to {new_message_counter} (Column F)")
+                    logger.debug("  ✅ UPDATING message datetime for %s from '%s' to '%s' (Column B)", cleaned_sheet_phone, current_message_datetime, new_datetime)
+                    logger.debug("  ✅ UPDATING message date for %s to '%s' (Column C)", cleaned_sheet_phone, new_date)
+                    logger.debug("  ✅ INCREMENTING message counter for %s from %s to %s (Column F)", cleaned_sheet_phone, current_message_counter, new_message_counter)
                     message_updated += 1
                 else:
-                    print(f"  ➖ {cleaned_sheet_phone} already has current message datetime '{current_message_datetime}' (Column B)")
+                    logger.debug("  ➖ %s already has current message datetime '%s' (Column B)", cleaned_sheet_phone, current_message_datetime)
             
             if cleaned_sheet_phone not in practice_lookup and cleaned_sheet_phone not in message_lookup:
-                print(f"  ❌ No match found for {cleaned_sheet_phone}")
+                logger.debug("  ❌ No match found for %s", cleaned_sheet_phone)
     
     # Process each row in the MAIN spreadsheet for class counters
-    print("\n=== Processing MAIN sheet (Class Counters) ===")
-    for i, row in enumerate(main_records, start=2):
+    logger.debug("=== Processing MAIN sheet (Class Counters) ===")
+    for i, row in main_rows:
         sheet_phone = row[main_phone_col] if main_phone_col is not None and len(row) > main_phone_col else ''
         
         if sheet_phone:
-            # Clean the sheet phone number to match our lookup format
-            cleaned_sheet_phone = sheet_phone.replace(' ', '').replace('-', '').lstrip('+')
+            # Normalize the sheet phone number exactly like the message senders
+            cleaned_sheet_phone = normalize_phone(sheet_phone)
             
             # Get class information from column B (index 1)
             class_text = row[main_class_col] if len(row) > main_class_col else ''
             class_number = extract_class_number(class_text)
             
             if class_number:
-                print(f"Row {i}: Class info: '{class_text}' -> Class number: {class_number}")
+                logger.debug("Row %d: Class info: '%s' -> Class number: %s", i, class_text, class_number)
             
             # Check if this phone has a practice update AND the class numbers match
             if cleaned_sheet_phone in phones_with_practice_updates and class_number:
@@ -289,33 +446,164 @@ def update_sheets_data(message_data):
                             'values': [[new_class_counter]]
                         })
                         
-                        print(f"  ✅ INCREMENTING class {class_number} counter for {cleaned_sheet_phone} from {current_class_counter} to {new_class_counter} (Column {class_column})")
+                        logger.debug("  ✅ INCREMENTING class %s counter for %s from %s to %s (Column %s)", class_number, cleaned_sheet_phone, current_class_counter, new_class_counter, class_column)
                         class_counters_updated += 1
                 else:
-                    print(f"  ➖ Row {i}: Skipping class {class_number} counter - practice was for class {practice_class_number}, not {class_number}")
+                    logger.debug("  ➖ Row %d: Skipping class %s counter - practice was for class %s, not %s", i, class_number, practice_class_number, class_number)
     
-    # Perform batch updates if there are changes
-    if data_updates:
+    # Both tabs in one values:batchUpdate, adjacent cells merged into ranges
+    if data_updates or main_updates:
         try:
-            datasheet.batch_update(data_updates, value_input_option='USER_ENTERED')
-            print(f"\n✅ Successfully updated DATA sheet!")
-            print(f"   - Practice updates (Column D + E): {practice_updated}")
-            print(f"   - Message updates (Column B + C + Counter F): {message_updated}")
-            print(f"   - Total batch operations: {len(data_updates)}")
+            sent = write_planned(session.spreadsheet(sheet_id), {"data": data_updates, "main": main_updates})
+            print(f"\n✅ Sent {len(data_updates) + len(main_updates)} cell updates as {sent} ranges")
         except Exception as e:
-            print(f"❌ Error updating data sheet: {e}")
+            print(f"❌ Error updating the data and main sheets: {e}")
+            if stamp is not None:
+                # The write may have landed partly: read the sheet again next run
+                with SheetMirror() as mirror:
+                    mirror.forget(sheet_id)
+            # The caller must not advance the message cursors past these updates
+            raise
+
+    if data_updates:
+        print(f"\n✅ Successfully updated DATA sheet!")
+        print(f"   - Practice updates (Column D + E): {practice_updated}")
+        print(f"   - Message updates (Column B + C + Counter F): {message_updated}")
+        print(f"   - Total batch operations: {len(data_updates)}")
     else:
         print("\n📋 No updates needed for DATA sheet - all dates are already current")
     
     if main_updates:
-        try:
-            mainsheet.batch_update(main_updates, value_input_option='USER_ENTERED')
-            print(f"\n✅ Successfully updated MAIN sheet!")
-            print(f"   - Class counters updated: {class_counters_updated}")
-            print(f"   - Total batch operations: {len(main_updates)}")
-        except Exception as e:
-            print(f"❌ Error updating main sheet: {e}")
+        print(f"\n✅ Successfully updated MAIN sheet!")
+        print(f"   - Class counters updated: {class_counters_updated}")
+        print(f"   - Total batch operations: {len(main_updates)}")
     else:
         print("\n📋 No updates needed for MAIN sheet - no class counters to update")
     
-    return practice_updated, message_updated, class_counters_updated
\ No newline at end of file
+    # Keep the mirror current with what we just wrote
+    if stamp is not None and (data_updates or main_updates):
+        restamp_after_write(session, sheet_id, stamp, {"data": data_updates, "main": main_updates})
+    
+    return practice_updated, message_updated, class_counters_updated
+
+
+def _group_sheets():
+    """GROUP_SHEETS as a {group name: sheet id} dict."""
+    load_dotenv()
+    group_sheets_env = os.getenv("GROUP_SHEETS")
+    try:
+        return json.loads(group_sheets_env) if group_sheets_env else {}
+    except (json.JSONDecodeError, TypeError):
+        print("Warning: Could not parse GROUP_SHEETS, sending all groups to SHEET_ID")
+        return {}
+
+
+def destination_sheet_ids():
+    """SHEET_ID and every spreadsheet of GROUP_SHEETS, without duplicates."""
+    load_dotenv()
+    sheet_ids = [os.getenv("SHEET_ID")] + list(_group_sheets().values())
+    return list(dict.fromkeys(sheet_id for sheet_id in sheet_ids if sheet_id))
+
+
+def _sent_at(update):
+    """When a SheetUpdate's message was sent (its "HH:MM, dd/mm/yy" datetime), None if it has another format."""
+    try:
+        return datetime.strptime(update.datetime, "%H:%M, %d/%m/%y")
+    except ValueError:
+        return None
+
+
+def route_updates(message_data):
+    """
+    Split formatter output by destination spreadsheet.
+    GROUP_SHEETS maps WhatsApp group names to spreadsheet IDs as JSON,
+    e.g. {"Course A": "sheet-id-a"}; unmapped groups go to SHEET_ID (key None).
+    The formatter keeps the latest message per (group, phone): a student
+    posting in several groups of one spreadsheet keeps only the latest of them.
+    Returns {sheet_id or None: {'practice_updates': [...], 'message_updates': [...]}}.
+    """
+    group_sheets = _group_sheets()
+
+    latest = {}
+    for kind in ('practice_updates', 'message_updates'):
+        for update in message_data[kind]:
+            record = SheetUpdate.coerce(update)
+            key = (group_sheets.get(record.group), kind, normalize_phone(record.sender))
+            kept = latest.get(key)
+            if kept is not None:
+                kept_at, sent_at = _sent_at(SheetUpdate.coerce(kept)), _sent_at(record)
+                # Unparseable datetimes: the later update in the list wins, as before
+                if kept_at is not None and sent_at is not None and sent_at < kept_at:
+                    continue
+            latest[key] = update
+
+    routed = {}
+    for (sheet_id, kind, _), update in latest.items():
+        target = routed.setdefault(sheet_id, {'practice_updates': [], 'message_updates': []})
+        target[kind].append(update)
+
+    return routed
+
+
+def update_sheets_for_groups(message_data):
+    """
+    Run update_sheets_data once per destination spreadsheet (see route_updates).
+    A failed write doesn't stop the other spreadsheets, but its error is raised
+    once they are done, so the message cursors are only saved when every
+    spreadsheet was written.
+    """
+    routed = route_updates(message_data)
+    if not routed:
+        # Nothing matched: keep the single-sheet behaviour of reporting on SHEET_ID
+        routed = {None: message_data}
+
+    results = {}
+    error = None
+    for sheet_id, updates in routed.items():
+        try:
+            results[sheet_id] = update_sheets_data(updates, sheet_id)
+        except Exception as e:
+            error = error or e
+    if error is not None:
+        raise error
+    return results
+
+
+def _sheet_phone_rows(sheet_id):
+    """{tab: {row number: phone}} of the data and main tabs, read from their phone columns."""
+    phone_column = a1_to_rowcol(f"{PHONE_COLUMN}1")[1]
+    tabs = read_columns(get_sheets_session().spreadsheet(sheet_id), {
+        "data": [(phone_column, phone_column)],
+        "main": [(phone_column, phone_column)],
+    })
+    _check_phone_header(tabs, phone_column)
+    return {tab: phone_rows(rows, phone_column) for tab, rows in tabs.items()}
+
+
+def rebuild_phone_index(sheet_id):
+    """Rebuild the phone index (see PhoneIndex) of `sheet_id` from the sheet. Returns the number of indexed rows."""
+    # Stamp first: a change made while reading leaves the index stamped as older, not newer
+    stamp = mirror_stamp(get_sheets_session(), sheet_id)
+    phones = _sheet_phone_rows(sheet_id)
+    with PhoneIndex() as index:
+        index.rebuild(sheet_id, phones, stamp)
+    return sum(len(rows) for rows in phones.values())
+
+
+def check_phone_index(sheet_id):
+    """Compare the phone index of `sheet_id` with the sheet. Returns the differences, one line each (none if consistent)."""
+    sheet = _sheet_phone_rows(sheet_id)
+    with PhoneIndex() as index:
+        if not index.built(sheet_id):
+            return [f"No phone index for {sheet_id} (run python main.py --rebuild-index)"]
+        indexed = index.entries(sheet_id)
+
+    problems = []
+    for tab, phones in sheet.items():
+        stored = indexed.get(tab, {})
+        for number in sorted(set(phones) | set(stored)):
+            if phones.get(number) != stored.get(number):
+                problems.append(
+                    f"{tab} row {number}: sheet has {phones.get(number) or 'no phone'}, index has {stored.get(number) or 'no phone'}"
+                )
+    return problems
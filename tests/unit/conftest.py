@@ -0,0 +1,16 @@
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from sheets_session import reset_sheets_session
+
+
+@pytest.fixture(autouse=True)
+def fresh_sheets_session():
+    """Each test authorizes and opens its (mocked) spreadsheet again."""
+    reset_sheets_session()
+    yield
+    reset_sheets_session()
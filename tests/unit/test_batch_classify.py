@@ -0,0 +1,112 @@
+"""
+Tests for columnar batch classification
+"""
+
+import json
+import random
+from unittest.mock import patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from batch_classify import BatchClassifier, classify_batch
+from render_message import message_formatter
+from records import RawMessage, SheetUpdate
+
+TEXTS = [
+    "עלה תרגול", "עָלָה  תִּרְגּוּל", "עלה תרגןל", "שלחתי הודעה", "העליתי תרגול ושלחתי הודעה",
+    "בוקר טוב", "", "תודה רבה",
+]
+SENDERS = ["050-000-0001", "+972 50-000-0001", "050-000-0002", "+972 52-000-0003"]
+
+
+@pytest.fixture(autouse=True)
+def env():
+    terms = {
+        'PRACTICE_WORDS': json.dumps(["עלה תרגול", "העליתי תרגול"]),
+        'MESSAGE_WORDS': json.dumps(["שלחתי הודעה"]),
+    }
+    with patch('render_message.load_dotenv'), patch('timestamp_parser.load_dotenv'), patch.dict(os.environ, terms):
+        os.environ.pop('TIMESTAMP_ORDER', None)
+        yield
+
+
+def random_messages(rng, count, days=14):
+    messages = []
+    for _ in range(count):
+        timestamp = f"{rng.randint(0, 24)}:{rng.randint(0, 2):02d}, {rng.randint(1, days):02d}/{rng.randint(1, days):02d}/2025"
+        if rng.random() < 0.05:
+            timestamp = "?"
+        messages.append(RawMessage(rng.choice(SENDERS), timestamp, rng.choice(TEXTS), rng.choice([None, "A", "B"])))
+    return messages
+
+
+def batch(messages, chunk_sizes=None):
+    classifier = BatchClassifier()
+    if chunk_sizes is None:
+        classifier.add_messages(messages)
+    else:
+        start = 0
+        while start < len(messages):
+            size = next(chunk_sizes)
+            classifier.add_messages(messages[start:start + size])
+            start += size
+    return classifier.updates()
+
+
+class TestBatchClassifier:
+
+    def test_columns(self):
+        result = classify_batch(
+            ["0501234567", "0501234567", "0521234567"],
+            ["20:15, 25/08/2025", "21:00, 25/08/2025", "09:05, 26/08/2025"],
+            ["עלה תרגול", "עלה תרגול", "שלחתי הודעה"],
+            ["G", "G", None],
+        )
+
+        assert result == {
+            'practice_updates': [SheetUpdate('972501234567', '25/08/25', '21:00, 25/08/25', 'G')],
+            'message_updates': [SheetUpdate('972521234567', '26/08/25', '09:05, 26/08/25', None)],
+        }
+
+    def test_no_matches(self):
+        assert classify_batch(["050"], ["20:15, 25/08/2025"], ["בוקר טוב"]) == {
+            'practice_updates': [], 'message_updates': []
+        }
+
+    def test_empty(self):
+        assert classify_batch([], [], []) == {'practice_updates': [], 'message_updates': []}
+
+    @pytest.mark.parametrize("order", ["auto", "DMY", "MDY"])
+    def test_same_output_as_the_formatter(self, order):
+        rng = random.Random(order)
+        with patch.dict(os.environ, {'TIMESTAMP_ORDER': order}):
+            for _ in range(200):
+                messages = random_messages(rng, rng.randint(0, 40))
+                assert batch(messages) == message_formatter(messages)
+
+    def test_same_output_across_chunks(self):
+        rng = random.Random(9)
+        for _ in range(200):
+            messages = random_messages(rng, rng.randint(0, 60))
+            chunk_sizes = iter(lambda: rng.randint(1, 10), None)
+            assert batch(messages, chunk_sizes) == message_formatter(messages)
+
+    def test_ties_keep_the_first_message(self):
+        messages = [
+            RawMessage("0501234567", "20:15, 25/08/2025", "עלה תרגול", "A"),
+            RawMessage("+972501234567", "20:15, 25/08/2025", "עלה תרגול", "B"),
+            RawMessage("+972 50-123-4567", "20:15, 25/08/2025", "שלחתי הודעה", "A"),
+        ]
+
+        assert batch(messages) == message_formatter(messages)
+
+    def test_day_first_detection_carries_over_chunks(self):
+        classifier = BatchClassifier()
+        classifier.add_messages([RawMessage("0501", "20:15, 25/08/2025", "עלה תרגול")])
+        classifier.add_messages([RawMessage("0502", "20:15, 05/08/2025", "עלה תרגול")])
+
+        assert [u.date for u in classifier.updates()['practice_updates']] == ['25/08/25', '05/08/25']
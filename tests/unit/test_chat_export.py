@@ -0,0 +1,106 @@
+"""
+Tests for the WhatsApp chat export parser
+"""
+
+import json
+from unittest.mock import patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from chat_export import parse_chat_export, iter_chat_export, export_group_name
+from render_message import message_formatter
+from records import RawMessage, SheetUpdate
+
+
+ANDROID = """25/08/2025, 20:10 - Messages and calls are end-to-end encrypted. No one outside of this chat can read them.
+25/08/2025, 20:15 - \u202a+972 50-123-4567\u202c: עלה תרגול
+25/08/2025, 20:16 - Dana: first line
+second line
+
+third line
+26/08/2025, 09:05 - Dana left
+26/08/2025, 09:06 - +972 52-000-0000: שלחתי הודעה
+"""
+
+IOS = """[25/08/2025, 20:15:32] +972 50-123-4567: עלה תרגול
+\u200e[25/08/2025, 20:16:01] Dana: \u200eimage omitted
+[8/26/25, 9:05:00 PM] Dana: late: note
+"""
+
+
+class TestParseChatExport:
+
+    def test_android_export(self):
+        messages = list(parse_chat_export(ANDROID.splitlines(keepends=True), "Course A"))
+
+        assert messages == [
+            RawMessage("+972 50-123-4567", "20:15, 25/08/2025", "עלה תרגול", "Course A"),
+            RawMessage("Dana", "20:16, 25/08/2025", "first line\nsecond line\n\nthird line", "Course A"),
+            RawMessage("+972 52-000-0000", "09:06, 26/08/2025", "שלחתי הודעה", "Course A"),
+        ]
+
+    def test_ios_export(self):
+        messages = list(parse_chat_export(IOS.splitlines()))
+
+        assert messages == [
+            RawMessage("+972 50-123-4567", "20:15, 25/08/2025", "עלה תרגול"),
+            RawMessage("Dana", "20:16, 25/08/2025", "image omitted"),
+            RawMessage("Dana", "21:05, 8/26/2025", "late: note"),
+        ]
+
+    @pytest.mark.parametrize("line, timestamp", [
+        ("8/25/25, 8:15 PM - Dana: hi", "20:15, 8/25/2025"),
+        ("8/25/25, 12:05 am - Dana: hi", "00:05, 8/25/2025"),
+        ("8/25/25, 12:05 p.m. - Dana: hi", "12:05, 8/25/2025"),
+        ("25.08.25, 20:15 - Dana: hi", "20:15, 25/08/2025"),
+    ])
+    def test_header_variants(self, line, timestamp):
+        [message] = parse_chat_export([line])
+        assert message.timestamp == timestamp
+
+    def test_text_before_the_first_message_is_ignored(self):
+        assert list(parse_chat_export(["stray line", "more"])) == []
+
+    def test_is_lazy(self):
+        lines = iter(ANDROID.splitlines())
+        messages = parse_chat_export(lines)
+
+        next(messages)
+        # Only read up to the header of the next message
+        assert next(lines).startswith("second line")
+
+
+class TestExportFile:
+
+    @pytest.mark.parametrize("name, group", [
+        ("WhatsApp Chat with Course A.txt", "Course A"),
+        ("WhatsApp Chat - Course B.txt", "Course B"),
+        ("_chat.txt", None),
+    ])
+    def test_export_group_name(self, name, group):
+        assert export_group_name(os.path.join("exports", name)) == group
+
+    def test_iter_chat_export_reads_the_file(self, tmp_path):
+        path = tmp_path / "WhatsApp Chat with Course A.txt"
+        path.write_text(ANDROID, encoding="utf-8-sig")
+
+        messages = list(iter_chat_export(str(path)))
+
+        assert len(messages) == 3
+        assert {message.group for message in messages} == {"Course A"}
+        assert list(iter_chat_export(str(path), group="Other"))[0].group == "Other"
+
+    def test_feeds_message_formatter(self, tmp_path):
+        path = tmp_path / "_chat.txt"
+        path.write_text(ANDROID, encoding="utf-8")
+        env = {'PRACTICE_WORDS': json.dumps(["עלה תרגול"]), 'MESSAGE_WORDS': json.dumps(["שלחתי הודעה"])}
+
+        with patch('render_message.load_dotenv'), patch.dict(os.environ, env):
+            result = message_formatter(iter_chat_export(str(path)))
+
+        assert result['practice_updates'] == [SheetUpdate("972501234567", "25/08/25", "20:15, 25/08/25")]
+        assert result['message_updates'] == [SheetUpdate("972520000000", "26/08/25", "09:06, 26/08/25")]
@@ -0,0 +1,27 @@
+"""
+Tests for Hebrew text normalization
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from hebrew_normalize import normalize_hebrew
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ("עָלָה תִּרְגּוּל", "עלה תרגול"),                   # niqqud
+    ("בְּרֵאשִׁ֖ית", "בראשית"),                            # cantillation
+    ("שלום", "שלומ"),                                  # final letters
+    ("ךםןףץ", "כמנפצ"),
+    ("  עלה \n\t תרגול  ", "עלה תרגול"),                # whitespace
+    ("\u200fשלחתי\u200e הודעה\u2069", "שלחתי הודעה"),  # direction marks
+    ("בית־ספר", "בית־ספר"),                            # maqaf is punctuation, kept
+    ("Hello  World", "Hello World"),
+    ("", ""),
+])
+def test_normalize_hebrew(raw, expected):
+    assert normalize_hebrew(raw) == expected
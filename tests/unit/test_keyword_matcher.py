@@ -0,0 +1,139 @@
+"""
+Tests for the multi-pattern keyword matcher
+"""
+
+import random
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from keyword_matcher import KeywordMatcher, within_distance
+from hebrew_normalize import normalize_hebrew
+
+PRACTICE = ["עלה תרגול", "העליתי תרגול", "העלתי תרגול", "תרגול עלה לתיקייה", "עלה תרגןל"]
+SENT = ["שלחתי הודעה", "כתבתי הודעה", "שלחתי שאלה"]
+
+
+@pytest.fixture(params=[40, 0], ids=["scan", "automaton"])
+def small_term_set(request):
+    return request.param
+
+
+class TestKeywordMatcher:
+
+    def test_classifies_both_categories_in_one_call(self, small_term_set):
+        matcher = KeywordMatcher({'practice': PRACTICE, 'sent': SENT}, small_term_set)
+
+        assert matcher.match("היי, עלה תרגול חדש") == {'practice'}
+        assert matcher.match("שלחתי הודעה למורה") == {'sent'}
+        assert matcher.match("העליתי תרגול ושלחתי הודעה") == {'practice', 'sent'}
+        assert matcher.match("בוקר טוב") == frozenset()
+        assert matcher.match("") == frozenset()
+
+    def test_overlapping_and_nested_terms(self, small_term_set):
+        matcher = KeywordMatcher({'a': ["he", "she", "hers"], 'b': ["his"], 'c': ["e"]}, small_term_set)
+
+        assert matcher.match("ushers") == {'a', 'c'}
+        assert matcher.match("this") == {'b'}
+        assert matcher.match("sh") == frozenset()
+
+    def test_term_found_through_fail_link(self, small_term_set):
+        # 'abcx' fails inside 'abcd', the match of 'bcx' must still be found
+        matcher = KeywordMatcher({'long': ["abcd"], 'short': ["bcx"]}, small_term_set)
+
+        assert matcher.match("zabcx") == {'short'}
+
+    def test_empty_term_matches_everything_like_substring_search(self, small_term_set):
+        matcher = KeywordMatcher({'all': [""], 'x': ["x"]}, small_term_set)
+
+        assert matcher.match("abc") == {'all'}
+
+    def test_matches_naive_substring_search(self, small_term_set):
+        rng = random.Random(7)
+        alphabet = "אבגד הו"
+        categories = {
+            name: ["".join(rng.choice(alphabet) for _ in range(rng.randint(1, 4))) for _ in range(15)]
+            for name in ('practice', 'sent', 'other')
+        }
+        matcher = KeywordMatcher(categories, small_term_set)
+
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            expected = {name for name, terms in categories.items() if any(t in text for t in terms)}
+            assert matcher.match(text) == expected
+
+
+class TestFuzzyMatching:
+
+    def test_within_distance(self):
+        assert within_distance("abcde", "xxabcdexx", 1)
+        assert within_distance("abcde", "xxabXdexx", 1)   # substitution
+        assert within_distance("abcde", "xxabdexx", 1)    # deletion
+        assert within_distance("abcde", "xxabcXdexx", 1)  # insertion
+        assert not within_distance("abcde", "xxabXXexx", 1)
+        assert within_distance("abcde", "xxabXXexx", 2)
+        assert not within_distance("abcde", "", 1)
+
+    def test_within_distance_matches_the_edit_distance_table(self):
+        def table(term, text, k):
+            column = list(range(len(term) + 1))
+            best = column[-1]
+            for ch in text:
+                row = [0]
+                for i in range(1, len(term) + 1):
+                    row.append(min(column[i - 1] + (term[i - 1] != ch), column[i] + 1, row[i - 1] + 1))
+                column = row
+                best = min(best, column[-1])
+            return best <= k
+
+        rng = random.Random(3)
+        for _ in range(2000):
+            term = "".join(rng.choice("abc") for _ in range(rng.randint(1, 9)))
+            text = "".join(rng.choice("abc") for _ in range(rng.randint(0, 15)))
+            k = rng.randint(0, 3)
+            assert within_distance(term, text, k) == table(term, text, k), (term, text, k)
+
+    def test_typos_in_long_terms_match(self):
+        matcher = KeywordMatcher({'practice': ["עלה תרגול"], 'sent': ["שלחתי הודעה"]}, max_distance=1)
+
+        assert matcher.match("עלה תרגןל") == {'practice'}
+        assert matcher.match("היום שלחתי הודעת תודה") == {'sent'}
+        assert matcher.match("עלה תררגול") == {'practice'}
+        assert matcher.match("עלה תרגזזל") == frozenset()
+
+    def test_short_terms_stay_exact(self):
+        matcher = KeywordMatcher({'short': ["שלום"], 'long': ["שלחתי הודעה"]}, max_distance=1)
+
+        assert matcher.match("שלוש") == frozenset()
+        assert matcher.match("שלום") == {'short'}
+
+    def test_exact_only_without_max_distance(self):
+        matcher = KeywordMatcher({'practice': ["עלה תרגול"]})
+
+        assert matcher.match("עלה תרגןל") == frozenset()
+
+    def test_normalizes_terms_and_text(self):
+        matcher = KeywordMatcher({'practice': ["עלה  תרגול"], 'done': ["סיימתי"]}, normalize=normalize_hebrew)
+
+        assert matcher.match("עָלָה תִּרְגּוּל") == {'practice'}
+        assert matcher.match("\u200fסיימתי") == {'done'}
+
+    def test_index_agrees_with_scanning_every_term(self, small_term_set):
+        rng = random.Random(11)
+        alphabet = "אבגדהו "
+        categories = {
+            name: ["".join(rng.choice(alphabet) for _ in range(rng.randint(3, 8))) for _ in range(10)]
+            for name in ('practice', 'sent')
+        }
+        matcher = KeywordMatcher(categories, small_term_set, max_distance=1, min_fuzzy_length=5)
+
+        for _ in range(500):
+            text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 30)))
+            expected = {
+                name for name, terms in categories.items()
+                if any(t in text or (len(t) >= 5 and within_distance(t, text, 1)) for t in terms)
+            }
+            assert matcher.match(text) == expected
@@ -0,0 +1,81 @@
+"""
+Tests for the incremental message cursor
+"""
+
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from message_cursor import message_key, load_cursor, save_cursor, messages_after, load_cursors, save_cursors, cursor_for
+
+
+def _msg(timestamp, sender, text):
+    return {"timestamp": timestamp, "sender": sender, "text": text}
+
+
+MESSAGES = [
+    _msg("20:15, 25/08/2025", "+972 50-123-4567 ", "עלה תרגול"),
+    _msg("20:16, 25/08/2025", "+972 52-000-0000 ", "שלחתי הודעה"),
+    _msg("20:17, 25/08/2025", "+972 50-123-4567 ", "תודה"),
+]
+
+
+class TestMessagesAfter:
+
+    def test_no_cursor_returns_everything(self):
+        assert messages_after(MESSAGES, None) == MESSAGES
+
+    def test_returns_only_messages_after_cursor(self):
+        assert messages_after(MESSAGES, message_key(MESSAGES[0])) == MESSAGES[1:]
+
+    def test_cursor_at_newest_message_returns_nothing(self):
+        assert messages_after(MESSAGES, message_key(MESSAGES[-1])) == []
+
+    def test_cursor_outside_window_returns_everything(self):
+        cursor = message_key(_msg("08:00, 01/01/2025", "x", "old"))
+        assert messages_after(MESSAGES, cursor) == MESSAGES
+
+    def test_same_text_different_time_is_a_different_message(self):
+        repeated = MESSAGES + [_msg("20:18, 25/08/2025", "+972 50-123-4567 ", "תודה")]
+        assert messages_after(repeated, message_key(MESSAGES[-1])) == repeated[-1:]
+
+
+class TestCursorPersistence:
+
+    def test_round_trip(self, tmp_path):
+        path = str(tmp_path / "logs" / "message_cursor.json")
+        save_cursor(MESSAGES[1], path)
+
+        assert load_cursor(path) == message_key(MESSAGES[1])
+
+    def test_missing_file(self, tmp_path):
+        assert load_cursor(str(tmp_path / "nope.json")) is None
+
+    def test_corrupt_file_is_ignored(self, tmp_path):
+        path = tmp_path / "message_cursor.json"
+        path.write_text("{not json", encoding="utf-8")
+
+        assert load_cursor(str(path)) is None
+
+    def test_cursors_are_kept_per_group(self, tmp_path):
+        path = str(tmp_path / "message_cursor.json")
+        a = dict(MESSAGES[0], group="Course A")
+        b_old = dict(MESSAGES[1], group="Course B")
+        b_new = dict(MESSAGES[2], group="Course B")
+
+        save_cursors([a, b_old, b_new], path)
+        save_cursors([dict(MESSAGES[1], group="Course A")], path)
+
+        cursors = load_cursors(path)
+        assert cursor_for(cursors, "Course A") == message_key(MESSAGES[1])
+        assert cursor_for(cursors, "Course B") == message_key(b_new)
+        assert cursor_for(cursors, "Course C") is None
+
+    def test_single_group_cursor_applies_to_any_group(self, tmp_path):
+        path = tmp_path / "message_cursor.json"
+        path.write_text(
+            '{"timestamp": "20:15, 25/08/2025", "sender": "x", "text_hash": "abc"}', encoding="utf-8"
+        )
+
+        assert load_cursor(str(path), group="Course A") == ("20:15, 25/08/2025", "x", "abc")
@@ -0,0 +1,42 @@
+"""
+Tests for the shared phone number normalization
+"""
+
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from phone_numbers import normalize_phone
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ('+972 50-123-4567', '972501234567'),
+    ('+972-50-123-4567', '972501234567'),
+    ('972501234567', '972501234567'),
+    ('050-123-4567', '972501234567'),
+    (' 050 123 4567 ', '972501234567'),
+    ('501234567', '972501234567'),
+    ('5012345678', '9725012345678'),
+    ('12345', '12345'),
+    ('', ''),
+])
+def test_normalize_phone(raw, expected):
+    assert normalize_phone(raw) == expected
+
+
+def test_normalized_numbers_are_stable():
+    for raw in ('050-123-4567', '501234567', '5012345678', '12345'):
+        once = normalize_phone(raw)
+        assert normalize_phone(once) == once
+
+
+def test_repeat_numbers_hit_the_cache():
+    normalize_phone.cache_clear()
+    for _ in range(3):
+        normalize_phone('+972 50-123-4567')
+
+    info = normalize_phone.cache_info()
+    assert (info.hits, info.misses) == (2, 1)
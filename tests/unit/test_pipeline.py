@@ -0,0 +1,151 @@
+"""
+Tests for the streaming scrape -> classify -> sheets pipeline
+"""
+
+import json
+import threading
+from unittest.mock import patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time_log
+from pipeline import MessagePipeline, write_stream
+from records import RawMessage
+
+
+@pytest.fixture(autouse=True)
+def env():
+    terms = {'PRACTICE_WORDS': json.dumps(["עלה תרגול"]), 'MESSAGE_WORDS': json.dumps(["שלחתי הודעה"])}
+    with patch('render_message.load_dotenv'), patch('pipeline.load_dotenv'), patch.dict(os.environ, terms):
+        time_log.stage_stats.clear()
+        yield
+        time_log.stage_stats.clear()
+
+
+@pytest.fixture
+def sheets():
+    with patch('pipeline.update_sheets_for_groups') as update:
+        yield update
+
+
+def _msg(phone, minute, text="עלה תרגול", group="G"):
+    return RawMessage(phone, f"10:{minute:02d}, 25/08/2025", text, group)
+
+
+class TestMessagePipeline:
+
+    def test_classifies_while_scraping_and_writes_once(self, sheets):
+        def scraper():
+            for i in range(5):
+                yield _msg(f"05000000{i:02d}", i, group="A")
+            yield _msg("0500000000", 30, text="שלחתי הודעה", group="B")
+
+        pipeline = MessagePipeline(queue_size=2)
+        count = pipeline.run(scraper())
+
+        assert count == 6
+        # One write: each spreadsheet is read once for all the updates
+        sheets.assert_called_once()
+        assert len(sheets.call_args.args[0]['practice_updates']) == 5
+        assert len(sheets.call_args.args[0]['message_updates']) == 1
+        assert pipeline.first_by_group["A"].timestamp == "10:00, 25/08/2025"
+        assert pipeline.last_by_group["A"].timestamp == "10:04, 25/08/2025"
+        assert pipeline.last_by_group["B"].timestamp == "10:30, 25/08/2025"
+
+    def test_result_matches_the_formatter(self, sheets):
+        from render_message import message_formatter
+        messages = [_msg(f"05000000{i % 3:02d}", i, group="AB"[i % 2]) for i in range(12)]
+
+        MessagePipeline().run(iter(messages))
+
+        assert sheets.call_args.args[0] == message_formatter(messages)
+
+    def test_batch_mode_writes_the_same_updates(self, sheets):
+        messages = [_msg(f"05000000{i % 4:02d}", i % 7, group="AB"[i % 2]) for i in range(30)]
+
+        MessagePipeline(classify_mode="stream").run(iter(messages))
+        with patch.dict(os.environ, {'CLASSIFY_BATCH_SIZE': '7'}):
+            MessagePipeline(classify_mode="batch").run(iter(messages))
+
+        stream_call, batch_call = sheets.call_args_list
+        assert batch_call == stream_call
+
+    def test_unknown_classify_mode(self):
+        with pytest.raises(ValueError, match="CLASSIFY_MODE"):
+            MessagePipeline(classify_mode="gpu")
+
+    def test_no_messages_writes_nothing(self, sheets):
+        assert MessagePipeline().run(iter([])) == 0
+        sheets.assert_not_called()
+
+    def test_scraper_error_is_raised(self, sheets):
+        def scraper():
+            yield _msg("0500000001", 1)
+            raise RuntimeError("browser died")
+
+        with pytest.raises(RuntimeError, match="browser died"):
+            MessagePipeline().run(scraper())
+        sheets.assert_not_called()
+
+    def test_classifier_error_stops_and_closes_the_scraper(self, sheets):
+        closed = threading.Event()
+
+        def scraper():
+            try:
+                while True:
+                    yield _msg("0500000001", 1)
+            finally:
+                closed.set()
+
+        with patch('pipeline.MessageClassifier.add', side_effect=ValueError("bad")):
+            with pytest.raises(ValueError):
+                MessagePipeline(queue_size=1).run(scraper())
+
+        assert closed.wait(5)
+
+    def test_stage_stats(self, sheets):
+        MessagePipeline(queue_size=3).run(iter([_msg("0500000001", 1), _msg("0500000002", 2)]))
+
+        stats = time_log.stage_stats
+        assert stats["scrape"]["items"] == 2
+        assert stats["classify"]["items"] == 2
+        assert stats["classify"]["max_queue"] <= 3
+        assert stats["update_sheets"]["items"] == 2
+
+
+class TestWriteStream:
+
+    def test_failed_batch_is_written_again_with_the_next_one(self):
+        batches = [[_msg("0500000001", 1)], [_msg("0500000002", 2)], [], [_msg("0500000003", 3)]]
+        calls = []
+
+        def write(messages):
+            calls.append(list(messages))
+            if len(calls) == 1:
+                raise RuntimeError("503 Service Unavailable")
+
+        written = list(write_stream(iter(batches), write))
+
+        assert calls[1] == batches[0] + batches[1]
+        # The cursor is saved from each yielded list: nothing after a failed batch gets past it unwritten
+        assert written == [batches[0] + batches[1], batches[3]]
+
+    def test_pending_messages_are_retried_on_an_empty_tick(self):
+        batches = [[_msg("0500000001", 1)], []]
+        outcomes = [RuntimeError("quota exceeded"), None]
+
+        def write(messages):
+            outcome = outcomes.pop(0)
+            if outcome:
+                raise outcome
+
+        assert list(write_stream(iter(batches), write)) == [batches[0]]
+
+    def test_empty_ticks_write_nothing(self):
+        write = []
+        assert list(write_stream(iter([[], []]), write.append)) == []
+        assert write == []
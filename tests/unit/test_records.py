@@ -0,0 +1,53 @@
+"""
+Tests for the pipeline record types
+"""
+
+from datetime import datetime
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from records import RawMessage, ClassifiedMessage, SheetUpdate
+
+
+class TestRawMessage:
+
+    def test_coerce_dict(self):
+        message = RawMessage.coerce({"sender": "+972 50", "timestamp": "20:15, 25/08/2025", "text": "hi"})
+
+        assert message == RawMessage("+972 50", "20:15, 25/08/2025", "hi", None)
+
+    def test_coerce_dict_with_group_and_missing_text(self):
+        message = RawMessage.coerce({"sender": "s", "timestamp": "t", "text": None, "group": "G"})
+
+        assert (message.text, message.group) == ("", "G")
+
+    def test_coerce_record_is_identity(self):
+        message = RawMessage("s", "t", "x", "G")
+
+        assert RawMessage.coerce(message) is message
+
+    def test_is_slotted(self):
+        assert not hasattr(RawMessage("s", "t", "x"), "__dict__")
+
+
+class TestSheetUpdate:
+
+    def test_coerce_dict(self):
+        update = SheetUpdate.coerce({"sender": "972", "date": "25/08/25", "datetime": "20:15, 25/08/25", "class_number": 3})
+
+        assert update == SheetUpdate("972", "25/08/25", "20:15, 25/08/25", None, 3)
+
+    def test_as_dict(self):
+        update = SheetUpdate("972", "25/08/25", "20:15, 25/08/25", "G")
+
+        assert update._asdict() == {
+            "sender": "972", "date": "25/08/25", "datetime": "20:15, 25/08/25", "group": "G", "class_number": None
+        }
+
+
+def test_classified_message_to_update():
+    classified = ClassifiedMessage("972501234567", "G", datetime(2025, 8, 25, 20, 15))
+
+    assert classified.to_update() == SheetUpdate("972501234567", "25/08/25", "20:15, 25/08/25", "G")
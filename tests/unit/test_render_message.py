@@ -0,0 +1,141 @@
+"""
+Tests for message classification and formatting
+"""
+
+import json
+import logging
+from unittest.mock import patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from render_message import message_formatter, clean_phone_number
+from records import RawMessage, SheetUpdate
+
+PRACTICE = ["עלה תרגול", "העליתי תרגול", "העלתי תרגול"]
+SENT = ["שלחתי הודעה"]
+
+
+@pytest.fixture(autouse=True)
+def terms_env():
+    env = {'PRACTICE_WORDS': json.dumps(PRACTICE), 'MESSAGE_WORDS': json.dumps(SENT)}
+    with patch('render_message.load_dotenv'), patch.dict(os.environ, env):
+        yield
+
+
+def _msg(sender, timestamp, text, group=None):
+    message = {"sender": sender, "timestamp": timestamp, "text": text}
+    if group is not None:
+        message["group"] = group
+    return message
+
+
+class TestMessageFormatter:
+
+    def test_classifies_and_formats(self):
+        result = message_formatter([
+            _msg("+972 50-123-4567", "20:15, 25/08/2025", "עלה תרגול"),
+            _msg("+972 52-000-0000", "09:05, 26/08/2025", "שלחתי הודעה"),
+            _msg("+972 53-000-0000", "09:06, 26/08/2025", "בוקר טוב"),
+        ])
+
+        assert result == {
+            'practice_updates': [SheetUpdate('972501234567', '25/08/25', '20:15, 25/08/25')],
+            'message_updates': [SheetUpdate('972520000000', '26/08/25', '09:05, 26/08/25')],
+        }
+
+    def test_keeps_latest_message_per_sender(self):
+        result = message_formatter([
+            _msg("+972 50-123-4567", "20:15, 25/08/2025", "עלה תרגול"),
+            _msg("+972 50-123-4567", "08:00, 27/08/2025", "העליתי תרגול"),
+            _msg("+972 50-123-4567", "10:00, 26/08/2025", "העלתי תרגול"),
+        ])
+
+        assert [u.datetime for u in result['practice_updates']] == ['08:00, 27/08/25']
+
+    def test_one_message_can_be_both_types(self):
+        result = message_formatter([_msg("0501234567", "20:15, 25/08/2025", "עלה תרגול, שלחתי הודעה")])
+
+        assert len(result['practice_updates']) == 1
+        assert len(result['message_updates']) == 1
+
+    def test_month_first_timestamps_are_tried_first(self):
+        result = message_formatter([_msg("0501234567", "20:15, 08/09/2025", "עלה תרגול")])
+
+        assert result['practice_updates'][0].date == '09/08/25'
+
+    def test_day_first_date_settles_the_order_for_the_run(self):
+        result = message_formatter([
+            _msg("0501234567", "20:15, 25/08/2025", "עלה תרגול"),
+            _msg("0521234567", "20:15, 08/09/2025", "עלה תרגול"),
+        ])
+
+        assert [u.date for u in result['practice_updates']] == ['25/08/25', '08/09/25']
+
+    def test_unparseable_timestamp_is_skipped(self):
+        result = message_formatter([_msg("0501234567", "?", "עלה תרגול")])
+
+        assert result == {'practice_updates': [], 'message_updates': []}
+
+    def test_groups_are_kept_apart(self):
+        result = message_formatter([
+            _msg("0501234567", "20:15, 25/08/2025", "עלה תרגול", "A"),
+            _msg("0501234567", "20:16, 25/08/2025", "עלה תרגול", "B"),
+        ])
+
+        assert [(u.group, u.datetime) for u in result['practice_updates']] == [
+            ('A', '20:15, 25/08/25'), ('B', '20:16, 25/08/25')
+        ]
+
+    def test_accepts_records(self):
+        result = message_formatter([RawMessage("0501234567", "20:15, 25/08/2025", "עלה תרגול", "A")])
+
+        assert result['practice_updates'] == [SheetUpdate('972501234567', '25/08/25', '20:15, 25/08/25', 'A')]
+
+    def test_accepts_a_generator(self):
+        messages = (_msg("0501234567", "20:15, 25/08/2025", "עלה תרגול") for _ in range(3))
+
+        assert len(message_formatter(messages)['practice_updates']) == 1
+
+    def test_per_message_trace_is_debug_logging(self, capsys, caplog):
+        messages = [_msg("0501234567", "20:15, 25/08/2025", "עלה תרגול")] * 3
+
+        with caplog.at_level(logging.INFO, logger="render_message"):
+            message_formatter(messages)
+        assert "Processing phone" not in capsys.readouterr().out
+        assert not caplog.records
+
+        with caplog.at_level(logging.DEBUG, logger="render_message"):
+            message_formatter(messages)
+        assert [record.getMessage() for record in caplog.records].count(
+            "Processing phone: 0501234567 -> normalized: 972501234567") == 3
+
+
+@pytest.mark.parametrize("raw,expected", [
+    ('+972 50-123-4567', '972501234567'),
+    ('050-123-4567', '972501234567'),
+    ('501234567', '972501234567'),
+    ('12345', '12345'),
+])
+def test_clean_phone_number(raw, expected):
+    assert clean_phone_number(raw) == expected
+
+
+class TestNormalizedMatching:
+
+    def test_typo_and_niqqud_variants_match(self):
+        result = message_formatter([
+            _msg("0501234567", "20:15, 25/08/2025", "עלה תרגןל"),
+            _msg("0521234567", "20:15, 25/08/2025", "עָלָה תִּרְגּוּל"),
+        ])
+
+        assert len(result['practice_updates']) == 2
+
+    def test_fuzzy_matching_can_be_disabled(self):
+        with patch.dict(os.environ, {'FUZZY_MAX_DISTANCE': '0'}):
+            result = message_formatter([_msg("0501234567", "20:15, 25/08/2025", "עלה תרגןל")])
+
+        assert result['practice_updates'] == []
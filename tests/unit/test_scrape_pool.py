@@ -0,0 +1,215 @@
+"""
+Tests for parallel group scraping, run against a local stand-in WebDriver server
+"""
+
+import json
+import re
+import threading
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from unittest.mock import patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from scrape_pool import GridScrapePool
+from records import RawMessage
+
+ELEMENT_KEY = "element-6066-11e4-a52e-4f735466cecf"
+
+
+class StandInWebDriver(ThreadingHTTPServer):
+    """
+    Just enough of the W3C WebDriver protocol for the scraper: sessions,
+    navigation, element lookup, clicks, typing and execute_script.
+    The group typed into the sidebar search decides which chat is "open".
+    """
+
+    daemon_threads = True
+
+    def __init__(self, fail_group_times=None):
+        super().__init__(("127.0.0.1", 0), StandInHandler)
+        self.sessions = {}
+        self.created = 0
+        self.max_concurrent = 0
+        self.fail_group_times = dict(fail_group_times or {})
+        self.lock = threading.Lock()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+
+    def log_message(self, *args):
+        pass
+
+    def _reply(self, value, status=200):
+        body = json.dumps({"value": value}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _error(self, message):
+        self._reply({"error": "unknown error", "message": message, "stacktrace": ""}, status=500)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_POST(self):
+        server = self.server
+        body = self._body()
+
+        if self.path == "/session":
+            session_id = uuid.uuid4().hex
+            with server.lock:
+                server.sessions[session_id] = {"group": None}
+                server.created += 1
+                server.max_concurrent = max(server.max_concurrent, len(server.sessions))
+            return self._reply({"sessionId": session_id, "capabilities": {"browserName": "chrome"}})
+
+        match = re.match(r"/session/(\w+)/(.*)", self.path)
+        state = server.sessions[match.group(1)]
+        command = match.group(2)
+
+        if command == "url":
+            return self._reply(None)
+        if command == "element":
+            return self._reply({ELEMENT_KEY: "el-1"})
+        if command == "elements":
+            return self._reply([{ELEMENT_KEY: "result-1"}])
+        if command.endswith("/click"):
+            return self._reply(None)
+        if command.endswith("/value"):
+            text = body.get("text", "")
+            if text and text.isprintable():
+                state["group"] = text
+            return self._reply(None)
+        if command == "execute/sync":
+            return self._execute(state, body.get("script", ""))
+        return self._error(f"unsupported command {command}")
+
+    def _execute(self, state, script):
+        group = state["group"]
+        if "span.selectable-text span" in script:
+            with self.server.lock:
+                remaining = self.server.fail_group_times.get(group, 0)
+                if remaining:
+                    self.server.fail_group_times[group] = remaining - 1
+            if remaining:
+                return self._error(f"renderer crashed in {group}")
+            return self._reply([
+                [f"[10:0{i}, 25/08/2025] +972 50-000-000{i}: ", f"{group} message {i}"] for i in range(3)
+            ])
+        if "#main header" in script:
+            return self._reply([f"{group} Dana, Noa, You", 3, "stable"])
+        if "nodes.length ?" in script:
+            return self._reply([3, "stable"])
+        # isDisplayed atom, scrollIntoView, click
+        return self._reply(True)
+
+    def do_GET(self):
+        if self.path.endswith("/window/handles"):
+            return self._reply(["window-1"])
+        if self.path.endswith("/url"):
+            return self._reply("https://web.whatsapp.com/")
+        if self.path.endswith("/enabled"):
+            return self._reply(True)
+        return self._error(f"unsupported GET {self.path}")
+
+    def do_DELETE(self):
+        session_id = self.path.rsplit("/", 1)[-1]
+        with self.server.lock:
+            self.server.sessions.pop(session_id, None)
+        return self._reply(None)
+
+
+@pytest.fixture
+def grid():
+    servers = []
+
+    def start(fail_group_times=None):
+        server = StandInWebDriver(fail_group_times)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers.append(server)
+        return server
+
+    # Keep the message-list settle wait short
+    with patch.dict(os.environ, {"CHAT_SETTLE_SECONDS": "0", "HISTORY_WINDOW": "20"}):
+        yield start
+
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+GROUPS = ["Course A", "Course B", "Course C", "Course D"]
+
+
+class TestGridScrapePool:
+
+    def test_groups_are_merged_in_order(self, grid, tmp_path):
+        server = grid()
+
+        with GridScrapePool(workers=2, retries=0, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+            messages = pool.scrape(group_names=GROUPS)
+
+        assert [m.group for m in messages] == [g for g in GROUPS for _ in range(3)]
+        assert messages[0] == RawMessage("+972 50-000-0000 ", "10:00, 25/08/2025", "Course A message 0", "Course A")
+        assert server.sessions == {}
+
+    def test_concurrency_is_capped(self, grid, tmp_path):
+        server = grid()
+
+        with GridScrapePool(workers=3, retries=0, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+            pool.scrape(group_names=GROUPS)
+
+        assert server.created == 3
+        assert server.max_concurrent <= 3
+
+    def test_idle_workers_release_their_grid_slot(self, grid, tmp_path):
+        server = grid()
+
+        with GridScrapePool(workers=3, retries=0, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+            pool.scrape(group_names=GROUPS)
+
+            # Only the last worker keeps its browser for the next scrape()
+            assert len(server.sessions) == 1
+
+    def test_one_worker_by_default(self, grid, tmp_path):
+        server = grid()
+
+        with patch.dict(os.environ, {}, clear=False), patch('scrape_pool.load_dotenv'):
+            os.environ.pop("GRID_WORKERS", None)
+            with GridScrapePool(retries=0, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+                messages = pool.scrape(group_names=GROUPS)
+
+        assert len(messages) == 12
+        assert server.max_concurrent == 1
+
+    def test_failed_group_is_retried_on_a_new_session(self, grid, tmp_path):
+        server = grid(fail_group_times={"Course B": 1})
+
+        with GridScrapePool(workers=2, retries=1, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+            messages = pool.scrape(group_names=GROUPS)
+
+        assert [m.group for m in messages].count("Course B") == 3
+        assert pool.failures == {}
+        assert server.created == 3
+
+    def test_group_failing_all_retries_is_left_out(self, grid, tmp_path):
+        server = grid(fail_group_times={"Course C": 5})
+
+        with GridScrapePool(workers=2, retries=1, grid_url=server.url, profile_dir=str(tmp_path / "p")) as pool:
+            messages = pool.scrape(group_names=GROUPS)
+
+        assert "Course C" not in {m.group for m in messages}
+        assert list(pool.failures) == ["Course C"]
+        assert len(messages) == 9
@@ -0,0 +1,227 @@
+"""
+Tests for the local sheet mirror
+"""
+
+from unittest.mock import Mock, patch
+import sys
+import os
+
+import pytest
+from gspread.utils import a1_range_to_grid_range
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from sheet_mirror import SheetMirror, PhoneIndex, phone_rows
+from sheets_update import update_sheets_data, check_phone_index
+
+LAYOUT = {'data': [[1, 1], [2, 6]], 'main': [[1, 2], [8, 25]]}
+TABS = {
+    'data': [['phone number', 'message_updates_datetime'], ['972501234567', '', '', '', '', '5']],
+    'main': [['phone number', 'class'], [], ['972501234567', 'שיעור 1']],
+}
+
+
+@pytest.fixture
+def mirror(tmp_path):
+    with SheetMirror(str(tmp_path / "mirror.sqlite3")) as mirror:
+        yield mirror
+
+
+class TestSheetMirror:
+
+    def test_load_what_was_saved(self, mirror):
+        mirror.save('sheet-1', 't1', LAYOUT, TABS)
+
+        assert mirror.load('sheet-1', 't1', LAYOUT) == TABS
+
+    def test_stale_or_missing_copy(self, mirror):
+        mirror.save('sheet-1', 't1', LAYOUT, TABS)
+
+        assert mirror.load('sheet-1', 't2', LAYOUT) is None
+        assert mirror.load('sheet-1', 't1', {'data': [[1, 6]]}) is None
+        assert mirror.load('sheet-2', 't1', LAYOUT) is None
+
+    def test_apply_writes_through(self, mirror):
+        mirror.save('sheet-1', 't1', LAYOUT, TABS)
+
+        mirror.apply('sheet-1', 'data', [
+            {'range': 'D2', 'values': [['10:30, 15/01/24']]},
+            {'range': "'data'!F2", 'values': [[6]]},
+            {'range': 'B4:C4', 'values': [['x', 'y']]},
+        ])
+
+        rows = mirror.load('sheet-1', 't1', LAYOUT)['data']
+        assert rows[1] == ['972501234567', '', '', '10:30, 15/01/24', '', '6']
+        assert rows[2] == []
+        assert rows[3] == ['', 'x', 'y']
+
+    def test_restamp_only_moves_a_current_stamp(self, mirror):
+        mirror.save('sheet-1', 't1', LAYOUT, TABS)
+
+        mirror.restamp('sheet-1', 't0', 't9')
+        assert mirror.load('sheet-1', 't1', LAYOUT) is not None
+
+        mirror.restamp('sheet-1', 't1', 't2')
+        assert mirror.load('sheet-1', 't2', LAYOUT) == TABS
+
+    def test_forget(self, mirror):
+        mirror.save('sheet-1', 't1', LAYOUT, TABS)
+
+        mirror.forget('sheet-1')
+
+        assert mirror.load('sheet-1', 't1', LAYOUT) is None
+
+
+class TestPhoneIndex:
+
+    @pytest.fixture
+    def index(self, tmp_path):
+        with PhoneIndex(str(tmp_path / "mirror.sqlite3")) as index:
+            yield index
+
+    def test_phone_rows(self):
+        rows = [['phone number'], ['050-123-4567'], [], [''], ['+972 52-000-0000', 'x']]
+
+        assert phone_rows(rows, 1) == {2: '972501234567', 5: '972520000000'}
+
+    def test_rows_of_phones(self, index):
+        index.rebuild('sheet-1', {'data': {2: '972501234567', 3: '972520000000'}, 'main': {4: '972501234567'}}, 't1')
+
+        assert index.built('sheet-1') and not index.built('sheet-2')
+        assert index.rows('sheet-1', 'data', ['972520000000', '972539999999']) == {3: '972520000000'}
+        assert index.rows('sheet-1', 'main', ['972501234567']) == {4: '972501234567'}
+
+    def test_current(self, index):
+        index.rebuild('sheet-1', {'data': {}}, 't1')
+        index.rebuild('sheet-2', {'data': {}})
+
+        assert index.current('sheet-1', 't1')
+        assert not index.current('sheet-1', 't2')
+        assert not index.current('sheet-2', None)
+
+    def test_restamped_with_the_mirror(self, index):
+        index.rebuild('sheet-1', {'data': {2: '972501234567'}}, 't1')
+
+        with SheetMirror(index.path) as mirror:
+            mirror.restamp('sheet-1', 't1', 't2')
+
+        assert index.current('sheet-1', 't2')
+
+    def test_forget(self, index):
+        index.rebuild('sheet-1', {'data': {2: '972501234567'}}, 't1')
+
+        index.forget('sheet-1')
+
+        assert not index.built('sheet-1')
+        assert index.entries('sheet-1') == {}
+
+
+def _fake_spreadsheet(grid):
+    """Spreadsheet mock answering values_batch_get from {tab: rows}."""
+    spreadsheet = Mock()
+    spreadsheet.worksheet.side_effect = lambda name: Mock(title=name)
+
+    def batch_get(ranges):
+        value_ranges = []
+        for name in ranges:
+            tab, a1 = name.split('!')
+            bounds = a1_range_to_grid_range(a1)
+            rows = grid[tab.strip("'")][bounds.get('startRowIndex', 0):bounds.get('endRowIndex')]
+            values = [row[bounds['startColumnIndex']:bounds['endColumnIndex']] for row in rows]
+            value_ranges.append({'values': values} if values else {})
+        return {'valueRanges': value_ranges}
+
+    spreadsheet.values_batch_get.side_effect = batch_get
+    return spreadsheet
+
+
+def test_update_sheets_data_reads_only_the_indexed_rows(tmp_path):
+    grid = {
+        'data': [['phone number', 'b', 'c', 'd', 'e', 'f'], ['050-123-4567', '', '', '', '', '0'], ['052-000-0000']],
+        'main': [['phone number', 'class'], ['050-123-4567', 'שיעור 1'], ['052-000-0000', 'שיעור 2']],
+    }
+    spreadsheet = _fake_spreadsheet(grid)
+    updates = {'practice_updates': [{'sender': '972520000000', 'date': '15/01/24', 'datetime': '10:30, 15/01/24'}],
+               'message_updates': []}
+
+    def ranges():
+        return [call.args[0] for call in spreadsheet.values_batch_get.call_args_list]
+
+    with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'SHEET_ID': 'sheet-1'}), \
+            patch('sheets_session.Credentials.from_service_account_file'), \
+            patch('sheets_session.gspread.authorize') as mock_authorize, \
+            patch('sheets_update.INDEX_ENABLED', True), \
+            patch('sheet_mirror.MIRROR_PATH', str(tmp_path / "mirror.sqlite3")):
+        mock_authorize.return_value.open_by_key.return_value = spreadsheet
+
+        # First run builds the index from the phone columns
+        assert update_sheets_data(updates) == (1, 0, 0)
+        assert ranges() == [["'data'!A:A", "'main'!A:A"], ["'data'!A3:F3", "'main'!A3:Y3"]]
+
+        spreadsheet.values_batch_get.reset_mock()
+        assert update_sheets_data(updates) == (1, 0, 0)
+        assert ranges() == [["'data'!A3:F3", "'main'!A3:Y3"]]
+        assert check_phone_index('sheet-1') == []
+
+        # Rows sorted in the sheet: the row read doesn't hold its phone any more
+        grid['data'][1:] = [grid['data'][2], grid['data'][1]]
+        assert check_phone_index('sheet-1') == [
+            "data row 2: sheet has 972520000000, index has 972501234567",
+            "data row 3: sheet has 972501234567, index has 972520000000",
+        ]
+        spreadsheet.values_batch_get.reset_mock()
+        assert update_sheets_data(updates) == (1, 0, 0)
+        assert ranges() == [["'data'!A3:F3", "'main'!A3:Y3"], ["'data'!A:F", "'main'!A:B", "'main'!H:Y"]]
+        assert check_phone_index('sheet-1') == []
+
+
+def test_index_rebuild_checks_the_phone_header(tmp_path):
+    spreadsheet = _fake_spreadsheet({'data': [['name'], ['050-123-4567']], 'main': [['phone number']]})
+    updates = {'practice_updates': [{'sender': '972501234567', 'date': '15/01/24', 'datetime': '10:30, 15/01/24'}],
+               'message_updates': []}
+
+    with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'SHEET_ID': 'sheet-1'}), \
+            patch('sheets_session.Credentials.from_service_account_file'), \
+            patch('sheets_session.gspread.authorize') as mock_authorize, \
+            patch('sheets_update.INDEX_ENABLED', True), \
+            patch('sheet_mirror.MIRROR_PATH', str(tmp_path / "mirror.sqlite3")):
+        mock_authorize.return_value.open_by_key.return_value = spreadsheet
+
+        with pytest.raises(ValueError, match="expected 'phone number'"):
+            update_sheets_data(updates)
+        with pytest.raises(ValueError, match="expected 'phone number'"):
+            check_phone_index('sheet-1')
+
+    with PhoneIndex(str(tmp_path / "mirror.sqlite3")) as index:
+        assert not index.built('sheet-1')
+
+
+def test_update_sheets_data_reads_the_mirror_until_the_sheet_changes(tmp_path):
+    """Second run with the same modifiedTime: no batchGet, and our own write is already in the copy"""
+    datasheet, mainsheet = Mock(), Mock()
+    spreadsheet = Mock()
+    spreadsheet.worksheet.side_effect = lambda name: datasheet if name == 'data' else mainsheet
+    spreadsheet.values_batch_get.return_value = {'valueRanges': [
+        {'values': [['phone number', 'b', 'c', 'd', 'e', 'f'], ['050-123-4567', '', '', '', '', '0']]},
+        {'values': [['phone number', 'class']]},
+        {},
+    ]}
+    # Run 1 before and after its write, run 2, run 3 (edited in the sheet) before and after its write
+    spreadsheet.get_lastUpdateTime.side_effect = ['t1', 't2', 't2', 't3', 't4']
+    updates = {'practice_updates': [{'sender': '972501234567', 'date': '15/01/24', 'datetime': '10:30, 15/01/24'}],
+               'message_updates': []}
+
+    with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'SHEET_ID': 'sheet-1'}), \
+            patch('sheets_session.Credentials.from_service_account_file'), \
+            patch('sheets_session.gspread.authorize') as mock_authorize, \
+            patch('sheet_mirror.MIRROR_ENABLED', True), \
+            patch('sheet_mirror.MIRROR_PATH', str(tmp_path / "mirror.sqlite3")):
+        mock_authorize.return_value.open_by_key.return_value = spreadsheet
+
+        assert update_sheets_data(updates) == (1, 0, 0)
+        assert update_sheets_data(updates) == (0, 0, 0)
+        assert spreadsheet.values_batch_get.call_count == 1
+        spreadsheet.values_batch_update.assert_called_once()
+
+        update_sheets_data(updates)
+        assert spreadsheet.values_batch_get.call_count == 2
@@ -0,0 +1,104 @@
+"""
+Tests for the Sheets write planner
+"""
+
+from unittest.mock import Mock
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time_log
+from sheet_writes import plan_writes, write_planned
+
+
+@pytest.fixture(autouse=True)
+def clear_metrics():
+    time_log.run_metrics.clear()
+    yield
+    time_log.run_metrics.clear()
+
+
+class TestPlanWrites:
+
+    def test_adjacent_cells_of_a_row_become_one_range(self):
+        data = plan_writes({'data': [
+            {'range': 'B3', 'values': [['10:31, 15/01/24']]},
+            {'range': 'C3', 'values': [['15/01/24']]},
+            {'range': 'F3', 'values': [[6]]},
+            {'range': 'D3', 'values': [['10:30, 15/01/24']]},
+            {'range': 'E3', 'values': [['15/01/24']]},
+        ]})
+
+        assert data == [{'range': "'data'!B3:F3",
+                         'values': [['10:31, 15/01/24', '15/01/24', '10:30, 15/01/24', '15/01/24', 6]]}]
+
+    def test_gaps_are_not_filled(self):
+        data = plan_writes({'data': [
+            {'range': 'B3', 'values': [['a']]},
+            {'range': 'C3', 'values': [['b']]},
+            {'range': 'F3', 'values': [[1]]},
+        ]})
+
+        assert [update['range'] for update in data] == ["'data'!B3:C3", "'data'!F3"]
+
+    def test_same_columns_of_consecutive_rows_become_one_block(self):
+        data = plan_writes({'main': [
+            {'range': 'H4', 'values': [[3]]},
+            {'range': 'H2', 'values': [[1]]},
+            {'range': 'H3', 'values': [[2]]},
+            {'range': 'I6', 'values': [[7]]},
+        ]})
+
+        assert data == [
+            {'range': "'main'!H2:H4", 'values': [[1], [2], [3]]},
+            {'range': "'main'!I6", 'values': [[7]]},
+        ]
+
+    def test_rows_written_in_the_same_columns(self):
+        data = plan_writes({'data': [
+            {'range': f'{column}{row}', 'values': [[f'{column}{row}']]}
+            for row in (2, 3) for column in 'DE'
+        ]})
+
+        assert data == [{'range': "'data'!D2:E3", 'values': [['D2', 'E2'], ['D3', 'E3']]}]
+
+    def test_last_write_to_a_cell_wins(self):
+        data = plan_writes({'data': [
+            {'range': 'F3', 'values': [[6]]},
+            {'range': "'data'!E3:F3", 'values': [['x', 7]]},
+        ]})
+
+        assert data == [{'range': "'data'!E3:F3", 'values': [['x', 7]]}]
+
+    def test_tabs_are_kept_apart(self):
+        data = plan_writes({'data': [{'range': 'H2', 'values': [[1]]}], 'main': [{'range': 'H2', 'values': [[2]]}], 'other': []})
+
+        assert [update['range'] for update in data] == ["'data'!H2", "'main'!H2"]
+
+
+class TestWritePlanned:
+
+    def test_one_batch_update_and_savings_in_the_run_summary(self):
+        spreadsheet = Mock()
+        updates = {
+            'data': [{'range': column + '3', 'values': [[column]]} for column in 'BCDEF'],
+            'main': [{'range': 'H3', 'values': [[1]]}],
+        }
+
+        assert write_planned(spreadsheet, updates) == 2
+
+        spreadsheet.values_batch_update.assert_called_once()
+        body = spreadsheet.values_batch_update.call_args.args[0]
+        assert body['valueInputOption'] == 'USER_ENTERED'
+        assert [update['range'] for update in body['data']] == ["'data'!B3:F3", "'main'!H3"]
+        assert time_log.run_metrics["sheets ranges saved"] == 4
+        assert time_log.run_metrics["sheets request bytes saved"] > 0
+
+    def test_nothing_to_write(self):
+        spreadsheet = Mock()
+
+        assert write_planned(spreadsheet, {'data': [], 'main': []}) == 0
+        spreadsheet.values_batch_update.assert_not_called()
@@ -8,7 +8,7 @@ import gspread
 @pytest.fixture
 def mock_credentials():
     """Mock Google OAuth2 credentials"""
-    with patch('sheets_last_update.Credentials.from_service_account_file') as mock_creds:
+    with patch('sheets_session.Credentials.from_service_account_file') as mock_creds:
         mock_creds.return_value = Mock()
         yield mock_creds
 
@@ -16,7 +16,7 @@ def mock_credentials():
 @pytest.fixture
 def mock_gspread_client():
     """Mock gspread client and related objects"""
-    with patch('sheets_last_update.gspread.authorize') as mock_authorize:
+    with patch('sheets_session.gspread.authorize') as mock_authorize:
         # Create mock chain: client -> sheet -> worksheet
         mock_worksheet = Mock()
         mock_sheet = Mock()
@@ -120,7 +120,7 @@ class TestLastTimeUpdated:
         mock_load_dotenv
     ):
         """Test handling of missing credentials file"""
-        with patch('sheets_last_update.Credentials.from_service_account_file') as mock_creds:
+        with patch('sheets_session.Credentials.from_service_account_file') as mock_creds:
             mock_creds.side_effect = FileNotFoundError("Credentials file not found")
             
             from sheets_last_update import last_time_updated
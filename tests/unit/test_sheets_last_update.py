@@ -13,6 +13,7 @@ import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
 from sheets_last_update import last_time_updated
+from sheets_session import reset_sheets_session
 
 
 class TestLastTimeUpdated(unittest.TestCase):
@@ -21,8 +22,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_successful_timestamp_update(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test successful update of timestamp to dashboard"""
         
@@ -72,8 +73,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_timestamp_format(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test that timestamp is formatted correctly (DD-MM HH:MM)"""
         
@@ -91,6 +92,8 @@ class TestLastTimeUpdated(unittest.TestCase):
         for test_datetime, expected_format in test_cases:
             with self.subTest(datetime=test_datetime):
                 mock_datetime.now.return_value = test_datetime
+                # A new mocked client per case: don't reuse the cached worksheet
+                reset_sheets_session()
                 
                 mock_client = Mock()
                 mock_authorize.return_value = mock_client
@@ -135,8 +138,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_correct_cell_updated(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test that specifically cell C9 is updated"""
         
@@ -165,8 +168,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_dashboard_worksheet_accessed(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test that the 'dashboard' worksheet is specifically accessed"""
         
@@ -193,8 +196,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_timestamp_has_leading_apostrophe(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test that timestamp string starts with apostrophe to prevent Excel interpretation"""
         
@@ -224,8 +227,8 @@ class TestLastTimeUpdated(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_credentials_file_path(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test that correct credentials file is used"""
         
@@ -288,8 +291,8 @@ class TestIntegrationScenarios(unittest.TestCase):
     @patch('sheets_last_update.datetime')
     @patch('sheets_last_update.load_dotenv')
     @patch('sheets_last_update.os.getenv')
-    @patch('sheets_last_update.gspread.authorize')
-    @patch('sheets_last_update.Credentials.from_service_account_file')
+    @patch('sheets_session.gspread.authorize')
+    @patch('sheets_session.Credentials.from_service_account_file')
     def test_multiple_consecutive_updates(self, mock_creds, mock_authorize, mock_getenv, mock_load_dotenv, mock_datetime):
         """Test calling the function multiple times in succession"""
         
@@ -0,0 +1,73 @@
+"""
+Tests for the shared Sheets client
+"""
+
+from unittest.mock import Mock, patch
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time_log
+from sheets_session import SheetsSession, get_sheets_session, reset_sheets_session, KEY_FILE, SCOPES
+
+
+@pytest.fixture
+def gspread_client():
+    time_log.run_metrics.clear()
+    with patch('sheets_session.Credentials.from_service_account_file') as mock_creds, \
+            patch('sheets_session.gspread.authorize') as mock_authorize:
+        client = Mock()
+        mock_authorize.return_value = client
+        yield {'creds': mock_creds, 'authorize': mock_authorize, 'client': client}
+    time_log.run_metrics.clear()
+
+
+class TestSheetsSession:
+
+    def test_authorizes_and_opens_once(self, gspread_client):
+        session = SheetsSession()
+
+        data = session.worksheet('sheet-1', 'data')
+        assert session.worksheet('sheet-1', 'data') is data
+        session.worksheet('sheet-1', 'dashboard')
+        spreadsheet = session.spreadsheet('sheet-1')
+
+        gspread_client['creds'].assert_called_once_with(KEY_FILE, scopes=SCOPES)
+        gspread_client['authorize'].assert_called_once()
+        gspread_client['client'].open_by_key.assert_called_once_with('sheet-1')
+        assert spreadsheet.worksheet.call_count == 2
+        # data handle, spreadsheet metadata for dashboard, spreadsheet metadata
+        assert time_log.run_metrics["sheets round trips saved"] == 3
+
+    def test_key_path_setting(self, gspread_client):
+        with patch('sheets_session.KEY_PATH', '/keys/service-account.json'):
+            SheetsSession().client()
+
+        gspread_client['creds'].assert_called_once_with('/keys/service-account.json', scopes=SCOPES)
+
+    def test_spreadsheets_are_cached_per_id(self, gspread_client):
+        session = SheetsSession()
+        gspread_client['client'].open_by_key.side_effect = lambda key: Mock(name=key)
+
+        assert session.spreadsheet('a') is not session.spreadsheet('b')
+        assert gspread_client['client'].open_by_key.call_count == 2
+
+    def test_invalidate_authorizes_again(self, gspread_client):
+        session = SheetsSession()
+        session.worksheet('sheet-1', 'data')
+
+        session.invalidate()
+        session.worksheet('sheet-1', 'data')
+
+        assert gspread_client['authorize'].call_count == 2
+        assert gspread_client['client'].open_by_key.call_count == 2
+
+    def test_process_wide_session(self):
+        session = get_sheets_session()
+        assert get_sheets_session() is session
+
+        reset_sheets_session()
+        assert get_sheets_session() is not session
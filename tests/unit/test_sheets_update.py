@@ -11,7 +11,20 @@ import os
 # Add the parent directory to the path so we can import the module
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
 
-from sheets_update import update_sheets_data
+from sheets_update import update_sheets_data, route_updates, update_sheets_for_groups, read_columns
+from records import SheetUpdate
+from gspread.utils import a1_to_rowcol
+
+
+def _batch_get(mock_sheet, ranges):
+    """Fake values:batchGet: the requested columns of each worksheet's get_all_values()."""
+    value_ranges = []
+    for name in ranges:
+        title, columns = name.split('!')
+        first, last = (a1_to_rowcol(f"{column}1")[1] for column in columns.split(':'))
+        rows = mock_sheet.worksheet(title.strip("'")).get_all_values()
+        value_ranges.append({'range': name, 'values': [row[first - 1:last] for row in rows]})
+    return {'valueRanges': value_ranges}
 
 
 @pytest.fixture
@@ -25,8 +38,8 @@ def mock_env_setup():
 @pytest.fixture
 def mock_gspread_setup():
     """Mock gspread client setup"""
-    with patch('sheets_update.Credentials.from_service_account_file') as mock_creds:
-        with patch('sheets_update.gspread.authorize') as mock_authorize:
+    with patch('sheets_session.Credentials.from_service_account_file') as mock_creds:
+        with patch('sheets_session.gspread.authorize') as mock_authorize:
             mock_creds.return_value = Mock()
             
             mock_client = Mock()
@@ -34,6 +47,8 @@ def mock_gspread_setup():
             
             mock_sheet = Mock()
             mock_client.open_by_key.return_value = mock_sheet
+            # values:batchGet answered from the worksheet mocks each test sets up
+            mock_sheet.values_batch_get.side_effect = lambda ranges, params=None: _batch_get(mock_sheet, ranges)
             
             yield {
                 'creds': mock_creds,
@@ -93,7 +108,8 @@ class TestUpdateSheetsDataIntegration:
                 {
                     'sender': '972501234567',
                     'date': '2024-01-15',
-                    'datetime': '2024-01-15 10:30:00'
+                    'datetime': '2024-01-15 10:30:00',
+                    'class_number': 1
                 }
             ],
             'message_updates': [
@@ -120,27 +136,22 @@ class TestUpdateSheetsDataIntegration:
             call('main') == c for c in mock_gspread_setup['sheet'].worksheet.call_args_list
         )
         
-        # Verify data sheet was updated
-        mock_datasheet.batch_update.assert_called_once()
-        data_updates = mock_datasheet.batch_update.call_args[0][0]
-        
-        # Should update practice datetime for row 2
-        assert any(u['range'] == 'D2' for u in data_updates)
-        
-        # Should update message info for row 3
-        assert any(u['range'] == 'B3' for u in data_updates)
-        assert any(u['range'] == 'C3' for u in data_updates)
-        assert any(u['range'] == 'F3' for u in data_updates)  # Counter increment
-        
-        # Verify main sheet class counter was updated
-        mock_mainsheet.batch_update.assert_called_once()
-        main_updates = mock_mainsheet.batch_update.call_args[0][0]
-        
-        # Should increment class counter for שיעור 1 (column H, row 2)
-        assert any(u['range'] == 'H2' for u in main_updates)
+        # Verify both sheets were updated in one values:batchUpdate
+        mock_gspread_setup['sheet'].values_batch_update.assert_called_once()
+        written = {u['range']: u['values'] for u in mock_gspread_setup['sheet'].values_batch_update.call_args[0][0]['data']}
+        
+        assert written == {
+            # Practice datetime and date for row 2
+            "'data'!D2:E2": [['2024-01-15 10:30:00', '2024-01-15']],
+            # Message datetime and date for row 3, then its counter (D3:E3 are not written)
+            "'data'!B3:C3": [['2024-01-15 09:15:00', '2024-01-15']],
+            "'data'!F3": [[1]],
+            # Class counter for שיעור 1 (column H, row 2)
+            "'main'!H2": [[11]],
+        }
         
-        # Verify return value (class counters updated)
-        assert result == 1
+        # Verify return value (practice, message and class counter updates)
+        assert result == (1, 1, 1)
     
     def test_no_updates_needed(
         self, 
@@ -186,11 +197,10 @@ class TestUpdateSheetsDataIntegration:
         result = update_sheets_data(message_data)
         
         # Verify no batch updates were called
-        mock_datasheet.batch_update.assert_not_called()
-        mock_mainsheet.batch_update.assert_not_called()
+        mock_gspread_setup['sheet'].values_batch_update.assert_not_called()
         
         # Verify return value
-        assert result == 0
+        assert result == (0, 0, 0)
     
     def test_phone_number_normalization(
         self, 
@@ -226,7 +236,8 @@ class TestUpdateSheetsDataIntegration:
                 {
                     'sender': '972501234567',  # Normalized version
                     'date': '2024-01-15',
-                    'datetime': '2024-01-15 10:30:00'
+                    'datetime': '2024-01-15 10:30:00',
+                    'class_number': 1
                 }
             ],
             'message_updates': []
@@ -236,10 +247,11 @@ class TestUpdateSheetsDataIntegration:
         result = update_sheets_data(message_data)
         
         # Verify updates were made despite different formatting
-        mock_datasheet.batch_update.assert_called_once()
-        mock_mainsheet.batch_update.assert_called_once()
+        mock_gspread_setup['sheet'].values_batch_update.assert_called_once()
+        written = [u['range'] for u in mock_gspread_setup['sheet'].values_batch_update.call_args[0][0]['data']]
+        assert written == ["'data'!D2:E2", "'main'!H2"]
         
-        assert result == 1
+        assert result == (1, 0, 1)
     
     def test_missing_sheet_id_raises_error(self):
         """Test that missing SHEET_ID raises ValueError"""
@@ -277,11 +289,10 @@ class TestUpdateSheetsDataIntegration:
         result = update_sheets_data(message_data)
         
         # Verify no batch updates were called
-        mock_datasheet.batch_update.assert_not_called()
-        mock_mainsheet.batch_update.assert_not_called()
+        mock_gspread_setup['sheet'].values_batch_update.assert_not_called()
         
         # Verify return value
-        assert result == 0
+        assert result == (0, 0, 0)
     
     def test_multiple_practice_updates_same_phone(
         self, 
@@ -302,12 +313,14 @@ class TestUpdateSheetsDataIntegration:
                 {
                     'sender': '972501234567',
                     'date': '2024-01-15',
-                    'datetime': '2024-01-15 10:30:00'
+                    'datetime': '2024-01-15 10:30:00',
+                    'class_number': 1
                 },
                 {
                     'sender': '972501234567',
                     'date': '2024-01-15',
-                    'datetime': '2024-01-15 11:45:00'
+                    'datetime': '2024-01-15 11:45:00',
+                    'class_number': 1
                 }
             ],
             'message_updates': []
@@ -316,17 +329,21 @@ class TestUpdateSheetsDataIntegration:
         # Execute
         result = update_sheets_data(message_data)
         
-        # Verify updates were made
-        mock_datasheet.batch_update.assert_called_once()
-        mock_mainsheet.batch_update.assert_called_once()
+        # Verify updates were made, once per cell with the last update of the phone
+        mock_gspread_setup['sheet'].values_batch_update.assert_called_once()
+        data = mock_gspread_setup['sheet'].values_batch_update.call_args[0][0]['data']
+        assert data == [
+            {'range': "'data'!D2:E2", 'values': [['2024-01-15 11:45:00', '2024-01-15']]},
+            {'range': "'main'!H2", 'values': [[11]]},
+        ]
         
         # Verify return value
-        assert result == 1
+        assert result == (1, 0, 1)
     
     def test_credentials_file_not_found(self, mock_env_setup):
         """Test handling of missing credentials file"""
         
-        with patch('sheets_update.Credentials.from_service_account_file') as mock_creds:
+        with patch('sheets_session.Credentials.from_service_account_file') as mock_creds:
             mock_creds.side_effect = FileNotFoundError("Credentials file not found")
             
             message_data = {
@@ -384,4 +401,177 @@ def test_phone_normalization_variations(phone_input, expected_normalized):
     if normalized.startswith('+'):
         normalized = normalized[1:]
     
-    assert normalized == expected_normalized or phone_input.replace('+', '').replace('-', '').replace(' ', '') == expected_normalized
\ No newline at end of file
+    assert normalized == expected_normalized or phone_input.replace('+', '').replace('-', '').replace(' ', '') == expected_normalized
+
+def test_sheet_phones_are_normalized_like_senders(mock_env_setup, mock_gspread_setup):
+    """Domestic-format sheet rows match the 972-format senders of the formatter"""
+    mock_datasheet = Mock()
+    mock_datasheet.get_all_values.return_value = [
+        ['phone number', 'message_updates_datetime', 'message_updates_date',
+         'practice_updates_datetime', 'practice_updates_date', 'message_counter'],
+        ['050-123-4567', '', '', '', '', '0'],
+        ['52 987 6543', '', '', '', '', '0'],
+    ]
+    mock_mainsheet = Mock()
+    mock_mainsheet.get_all_values.return_value = [['phone number', 'class']]
+    mock_gspread_setup['sheet'].worksheet.side_effect = (
+        lambda name: mock_datasheet if name == 'data' else mock_mainsheet
+    )
+
+    result = update_sheets_data({
+        'practice_updates': [{'sender': '972501234567', 'date': '15/01/24', 'datetime': '10:30, 15/01/24'}],
+        'message_updates': [{'sender': '+972 52-987-6543', 'date': '15/01/24', 'datetime': '10:31, 15/01/24'}],
+    })
+
+    assert result == (1, 1, 0)
+    ranges = [u['range'] for u in mock_gspread_setup['sheet'].values_batch_update.call_args.args[0]['data']]
+    assert ranges == ["'data'!D2:E2", "'data'!B3:C3", "'data'!F3"]
+
+
+def test_wrong_phone_column_fails_the_run(mock_env_setup, mock_gspread_setup):
+    """A PHONE_COLUMN without the 'phone number' header would silently match nothing"""
+    mock_datasheet = Mock()
+    mock_datasheet.get_all_values.return_value = [['name', 'phone number'], ['Dana', '050-123-4567']]
+    mock_mainsheet = Mock()
+    mock_mainsheet.get_all_values.return_value = [['name', 'phone number']]
+    mock_gspread_setup['sheet'].worksheet.side_effect = (
+        lambda name: mock_datasheet if name == 'data' else mock_mainsheet
+    )
+
+    with pytest.raises(ValueError, match="Column A of the data sheet is 'name'"):
+        update_sheets_data({'practice_updates': [], 'message_updates': []})
+    mock_gspread_setup['sheet'].values_batch_update.assert_not_called()
+
+
+def test_failed_write_is_raised(mock_env_setup, mock_gspread_setup, mock_datasheet, mock_mainsheet):
+    """A failed values:batchUpdate propagates, so the callers don't save the message cursors"""
+    mock_gspread_setup['sheet'].worksheet.side_effect = (
+        lambda name: mock_datasheet if name == 'data' else mock_mainsheet
+    )
+    mock_gspread_setup['sheet'].values_batch_update.side_effect = RuntimeError("503 Service Unavailable")
+
+    with pytest.raises(RuntimeError, match="503"):
+        update_sheets_data({
+            'practice_updates': [{'sender': '972509876543', 'date': '15/01/24', 'datetime': '10:30, 15/01/24'}],
+            'message_updates': [],
+        })
+
+
+def test_one_batch_get_of_the_used_columns(mock_env_setup, mock_gspread_setup, mock_datasheet, mock_mainsheet):
+    """Both tabs are read in one values:batchGet, only the phone column, B-F on data and B, H-Y on main"""
+    mock_gspread_setup['sheet'].worksheet.side_effect = (
+        lambda name: mock_datasheet if name == 'data' else mock_mainsheet
+    )
+
+    update_sheets_data({'practice_updates': [], 'message_updates': []})
+
+    mock_gspread_setup['sheet'].values_batch_get.assert_called_once_with(
+        ["'data'!A:F", "'main'!A:B", "'main'!H:Y"]
+    )
+
+
+class TestReadColumns:
+    """Tests for the column-selective batchGet reader"""
+
+    def test_rows_are_laid_out_by_column(self):
+        spreadsheet = Mock()
+        spreadsheet.values_batch_get.return_value = {'valueRanges': [
+            {'range': "'main'!A1:B3", 'values': [['phone number', 'class'], ['0501234567', 'שיעור 1'], ['0521234567']]},
+            {'range': "'main'!D1:E2", 'values': [['x', 'y'], [], ['', '3']]},
+        ]}
+
+        tabs = read_columns(spreadsheet, {'main': [(4, 5), (1, 1), (2, 2)]})
+
+        spreadsheet.values_batch_get.assert_called_once_with(["'main'!A:B", "'main'!D:E"])
+        assert tabs == {'main': [
+            ['phone number', 'class', '', 'x', 'y'],
+            ['0501234567', 'שיעור 1', ''],
+            ['0521234567', '', '', '', '3'],
+        ]}
+
+    def test_empty_tab(self):
+        spreadsheet = Mock()
+        spreadsheet.values_batch_get.return_value = {'valueRanges': [{'range': "'data'!A1:F1000"}]}
+
+        assert read_columns(spreadsheet, {'data': [(1, 6)]}) == {'data': []}
+
+
+class TestRouteUpdates:
+    """Tests for per-group spreadsheet routing"""
+
+    MESSAGE_DATA = {
+        'practice_updates': [
+            {'sender': '972501234567', 'date': '15/01/24', 'datetime': '10:30, 15/01/24', 'group': 'Course A'},
+            {'sender': '972509876543', 'date': '15/01/24', 'datetime': '10:31, 15/01/24', 'group': 'Course B'},
+        ],
+        'message_updates': [
+            {'sender': '972501234567', 'date': '15/01/24', 'datetime': '10:32, 15/01/24', 'group': None},
+        ]
+    }
+
+    def test_unmapped_groups_go_to_default_sheet(self):
+        with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {}, clear=False):
+            os.environ.pop('GROUP_SHEETS', None)
+            routed = route_updates(self.MESSAGE_DATA)
+
+        assert list(routed) == [None]
+        assert len(routed[None]['practice_updates']) == 2
+        assert len(routed[None]['message_updates']) == 1
+
+    def test_mapped_groups_are_split(self):
+        with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'GROUP_SHEETS': '{"Course B": "sheet_b"}'}):
+            routed = route_updates(self.MESSAGE_DATA)
+
+        assert [u['group'] for u in routed['sheet_b']['practice_updates']] == ['Course B']
+        assert routed['sheet_b']['message_updates'] == []
+        assert [u['group'] for u in routed[None]['practice_updates']] == ['Course A']
+        assert len(routed[None]['message_updates']) == 1
+
+    def test_routes_records(self):
+        message_data = {
+            'practice_updates': [SheetUpdate('972501234567', '15/01/24', '10:30, 15/01/24', 'Course B')],
+            'message_updates': [],
+        }
+        with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'GROUP_SHEETS': '{"Course B": "sheet_b"}'}):
+            routed = route_updates(message_data)
+
+        assert routed['sheet_b']['practice_updates'] == message_data['practice_updates']
+
+    def test_update_per_destination_sheet(self):
+        with patch('sheets_update.load_dotenv'), \
+             patch.dict(os.environ, {'GROUP_SHEETS': '{"Course B": "sheet_b"}'}), \
+             patch('sheets_update.update_sheets_data', return_value=(0, 0, 0)) as mock_update:
+            update_sheets_for_groups(self.MESSAGE_DATA)
+
+        assert sorted(str(c.args[1]) for c in mock_update.call_args_list) == ['None', 'sheet_b']
+
+    def test_latest_message_per_phone_across_groups(self):
+        """Groups sharing a spreadsheet: the newer message wins, whatever the group order"""
+        message_data = {
+            'practice_updates': [
+                SheetUpdate('972501234567', '25/08/25', '20:00, 25/08/25', 'Course A'),
+                SheetUpdate('0501234567', '20/08/25', '10:00, 20/08/25', 'Course B'),
+                SheetUpdate('972509876543', '20/08/25', '10:00, 20/08/25', 'Course C'),
+            ],
+            'message_updates': [SheetUpdate('972501234567', '19/08/25', '09:00, 19/08/25', 'Course B')],
+        }
+        with patch('sheets_update.load_dotenv'), patch.dict(os.environ, {'GROUP_SHEETS': '{"Course C": "sheet_c"}'}):
+            routed = route_updates(message_data)
+
+        assert routed[None]['practice_updates'] == [message_data['practice_updates'][0]]
+        assert routed[None]['message_updates'] == message_data['message_updates']
+        assert routed['sheet_c']['practice_updates'] == [message_data['practice_updates'][2]]
+
+    def test_failed_sheet_is_raised_after_the_others(self):
+        def update(updates, sheet_id):
+            if sheet_id is None:
+                raise RuntimeError("quota exceeded")
+            return (1, 0, 0)
+
+        with patch('sheets_update.load_dotenv'), \
+             patch.dict(os.environ, {'GROUP_SHEETS': '{"Course B": "sheet_b"}'}), \
+             patch('sheets_update.update_sheets_data', side_effect=update) as mock_update:
+            with pytest.raises(RuntimeError, match="quota exceeded"):
+                update_sheets_for_groups(self.MESSAGE_DATA)
+
+        assert mock_update.call_count == 2
@@ -0,0 +1,112 @@
+"""
+Tests for the asynchronous logging queue
+"""
+
+import logging
+import queue
+import threading
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time_log
+from time_log import DroppingQueueHandler, start_log_listener, flush_logs
+
+
+class _Collect(logging.Handler):
+    def __init__(self):
+        super().__init__()
+        self.setFormatter(logging.Formatter("%(levelname)s %(message)s"))
+        self.lines = []
+        self.threads = set()
+
+    def emit(self, record):
+        self.threads.add(threading.get_ident())
+        self.lines.append(self.format(record))
+
+
+def _logger(handler):
+    logger = logging.getLogger("test_time_log")
+    logger.handlers = [handler]
+    logger.propagate = False
+    logger.setLevel(logging.DEBUG)
+    return logger
+
+
+class TestDroppingQueueHandler:
+
+    def test_full_queue_drops_and_counts_debug_and_info(self):
+        handler = DroppingQueueHandler(queue.Queue(2))
+        logger = _logger(handler)
+
+        for i in range(5):
+            logger.debug("row %d", i)
+
+        assert handler.queue.qsize() == 2
+        assert handler.dropped == 3
+
+    def test_full_queue_waits_for_warnings(self):
+        handler = DroppingQueueHandler(queue.Queue(1))
+        logger = _logger(handler)
+        logger.info("first")
+
+        # Nothing drains the queue: the warning waits, then counts as dropped
+        logger.warning("second")
+
+        assert handler.dropped == 1
+        assert handler.queue.get_nowait().getMessage() == "first"
+
+
+class TestLogListener:
+
+    def teardown_method(self):
+        flush_logs()
+
+    def test_records_are_written_by_the_background_thread(self):
+        target = _Collect()
+        logger = _logger(start_log_listener([target], 100))
+
+        logger.info("phone %s", "0501234567")
+        try:
+            raise ValueError("boom")
+        except ValueError:
+            logger.error("failed", exc_info=True)
+        flush_logs()
+
+        assert target.lines[0] == "INFO phone 0501234567"
+        assert target.lines[1].startswith("ERROR failed\nTraceback")
+        assert "ValueError: boom" in target.lines[1]
+        assert threading.get_ident() not in target.threads
+
+    def test_flush_with_a_full_queue_writes_every_record(self):
+        release = threading.Event()
+
+        class _Slow(_Collect):
+            def emit(self, record):
+                release.wait(5)
+                super().emit(record)
+
+        target = _Slow()
+        handler = start_log_listener([target], 5)
+        logger = _logger(handler)
+        for i in range(6):
+            # Warnings wait for room instead of being dropped
+            logger.warning("burst %d", i)
+        assert handler.queue.full()
+
+        threading.Timer(0.2, release.set).start()
+        flush_logs()
+
+        assert target.lines == [f"WARNING burst {i}" for i in range(6)]
+        assert handler.dropped == 0
+
+    def test_dropped_records_go_to_the_run_summary(self, caplog):
+        handler = start_log_listener([_Collect()], 100)
+        handler.dropped = 7
+
+        with caplog.at_level(logging.INFO):
+            time_log._log_metrics()
+
+        assert any("log records dropped" in line and line.endswith(" 7") for line in caplog.messages)
+        assert handler.dropped == 0
@@ -0,0 +1,94 @@
+"""
+Tests for the WhatsApp timestamp parser
+"""
+
+from datetime import datetime
+from unittest.mock import patch
+import random
+import sys
+import os
+
+import pytest
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from timestamp_parser import TimestampParser, parse_timestamp
+
+
+def strptime_fallback(timestamp):
+    """The previous parse: month-first, then day-first."""
+    for fmt in ("%H:%M, %m/%d/%Y", "%H:%M, %d/%m/%Y"):
+        try:
+            return datetime.strptime(timestamp, fmt)
+        except ValueError:
+            pass
+    return None
+
+
+class TestParseTimestamp:
+
+    @pytest.mark.parametrize("timestamp,expected", [
+        ("20:15, 25/08/2025", datetime(2025, 8, 25, 20, 15)),
+        ("20:15, 08/25/2025", datetime(2025, 8, 25, 20, 15)),
+        ("09:05, 05/08/2025", datetime(2025, 5, 8, 9, 5)),   # ambiguous: month first
+        ("9:05, 5/8/2025", datetime(2025, 5, 8, 9, 5)),
+        ("00:00, 29/02/2024", datetime(2024, 2, 29, 0, 0)),
+    ])
+    def test_parses(self, timestamp, expected):
+        assert parse_timestamp(timestamp) == expected
+
+    @pytest.mark.parametrize("timestamp", [
+        "", "?", "20:15", "25:00, 25/08/2025", "20:60, 25/08/2025",
+        "20:15, 31/31/2025", "20:15, 29/02/2025", "20:15, 25/08/25", "20:15 25/08/2025",
+    ])
+    def test_rejects(self, timestamp):
+        assert parse_timestamp(timestamp) is None
+
+    def test_agrees_with_the_strptime_fallback(self):
+        rng = random.Random(5)
+        for _ in range(3000):
+            timestamp = (
+                f"{rng.randint(0, 25):02d}:{rng.randint(0, 61):02d}, "
+                f"{rng.randint(0, 32):02d}/{rng.randint(0, 32):02d}/{rng.randint(2019, 2026)}"
+            )
+            assert parse_timestamp(timestamp) == strptime_fallback(timestamp), timestamp
+
+
+class TestTimestampParser:
+
+    def test_explicit_day_first(self):
+        parser = TimestampParser("DMY")
+
+        assert parser.parse("09:05, 05/08/2025") == datetime(2025, 8, 5, 9, 5)
+        assert parser.parse("09:05, 08/25/2025") is None
+
+    def test_explicit_month_first(self):
+        parser = TimestampParser("mdy")
+
+        assert parser.parse("09:05, 05/08/2025") == datetime(2025, 5, 8, 9, 5)
+        assert parser.parse("09:05, 25/08/2025") is None
+
+    def test_auto_locks_to_day_first(self):
+        parser = TimestampParser("auto")
+
+        assert parser.parse("09:05, 05/08/2025") == datetime(2025, 5, 8, 9, 5)
+        assert parser.parse("20:15, 25/08/2025") == datetime(2025, 8, 25, 20, 15)
+        assert parser.detected == "DMY"
+        assert parser.parse("09:05, 05/08/2025") == datetime(2025, 8, 5, 9, 5)
+
+    def test_auto_locks_to_month_first(self):
+        parser = TimestampParser("auto")
+
+        parser.parse("20:15, 08/25/2025")
+
+        assert parser.detected == "MDY"
+        assert parser.parse("09:05, 25/08/2025") is None
+
+    def test_order_from_env(self):
+        with patch('timestamp_parser.load_dotenv'), patch.dict(os.environ, {'TIMESTAMP_ORDER': 'DMY'}):
+            assert TimestampParser().order == "DMY"
+
+    def test_unknown_order(self):
+        with pytest.raises(ValueError, match="TIMESTAMP_ORDER"):
+            TimestampParser("YMD")
+
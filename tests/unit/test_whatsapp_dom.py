@@ -0,0 +1,170 @@
+"""
+Tests for WhatsApp Web message extraction
+"""
+
+from unittest.mock import Mock, patch
+from datetime import datetime
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from whatsapp_dom import read_messages, parse_pre_plain_text, iter_history, get_group_names, EXTRACT_MESSAGES_JS, SCROLL_UP_JS
+from message_cursor import message_key
+from records import RawMessage
+
+
+def _element(meta, texts):
+    element = Mock()
+    element.get_attribute.return_value = meta
+    spans = []
+    for t in texts:
+        span = Mock()
+        span.text = t
+        spans.append(span)
+    element.find_elements.return_value = spans
+    return element
+
+
+class TestParsePrePlainText:
+
+    def test_splits_timestamp_and_sender(self):
+        assert parse_pre_plain_text("[20:15, 25/08/2025] +972 50-123-4567: ") == (
+            "20:15, 25/08/2025", "+972 50-123-4567 "
+        )
+
+    def test_missing_meta(self):
+        assert parse_pre_plain_text(None) == ("?", "?")
+        assert parse_pre_plain_text("") == ("?", "?")
+
+
+class TestReadMessages:
+
+    def test_script_mode_is_a_single_round_trip(self):
+        driver = Mock()
+        driver.execute_script.return_value = [
+            ["[20:15, 25/08/2025] +972 50-123-4567: ", "עלה תרגול"],
+            ["[20:16, 25/08/2025] +972 52-000-0000: ", ""],
+        ]
+
+        messages = read_messages(driver, 20, mode="js")
+
+        driver.execute_script.assert_called_once()
+        assert driver.execute_script.call_args[0][1] == 20
+        driver.find_elements.assert_not_called()
+        assert messages == [
+            RawMessage("+972 50-123-4567 ", "20:15, 25/08/2025", "עלה תרגול"),
+            RawMessage("+972 52-000-0000 ", "20:16, 25/08/2025", ""),
+        ]
+
+    def test_script_mode_skips_malformed_rows(self):
+        driver = Mock()
+        driver.execute_script.return_value = [
+            ["no bracket", "x"],
+            ["[20:15, 25/08/2025] +972 50-123-4567: ", "hi"],
+        ]
+
+        messages = read_messages(driver, 20, mode="js")
+
+        assert [m.text for m in messages] == ["hi"]
+
+    def test_elements_mode_matches_script_mode(self):
+        meta = "[20:15, 25/08/2025] +972 50-123-4567: "
+        driver = Mock()
+        driver.find_elements.return_value = [_element(meta, ["שלחתי", "הודעה"])]
+        driver.execute_script.return_value = [[meta, "שלחתי הודעה"]]
+
+        assert read_messages(driver, 20, mode="elements") == read_messages(driver, 20, mode="js")
+
+    def test_elements_mode_keeps_last_window(self):
+        meta = "[20:15, 25/08/2025] +972 50-123-4567: "
+        driver = Mock()
+        driver.find_elements.return_value = [_element(meta, [str(i)]) for i in range(30)]
+
+        messages = read_messages(driver, 20, mode="elements")
+
+        assert [m.text for m in messages] == [str(i) for i in range(10, 30)]
+
+
+class FakeVirtualChat:
+    """Renders only `window` messages at a time, like WhatsApp's virtualized list."""
+
+    def __init__(self, metas_and_texts, window=5, step=3):
+        self.rows = metas_and_texts
+        self.window = window
+        self.step = step
+        self.bottom = len(metas_and_texts)
+
+    def execute_script(self, script, *args):
+        if script == EXTRACT_MESSAGES_JS:
+            return self.rows[max(0, self.bottom - self.window):self.bottom]
+        if script == SCROLL_UP_JS:
+            at_top = self.bottom <= self.window
+            self.bottom = max(self.window, self.bottom - self.step)
+            return at_top
+        raise AssertionError("unexpected script")
+
+
+def _history(n):
+    return [[f"[10:{i:02d}, 25/08/2025] +972 50-000-00{i:02d}: ", f"msg {i}"] for i in range(n)]
+
+
+class TestIterHistory:
+
+    def setup_method(self):
+        self.sleep = patch('whatsapp_dom.time.sleep').start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_reads_whole_history_newest_first_without_duplicates(self):
+        chat = FakeVirtualChat(_history(17))
+
+        texts = [m.text for m in iter_history(chat)]
+
+        assert texts == [f"msg {i}" for i in range(16, -1, -1)]
+
+    def test_stops_at_cursor(self):
+        chat = FakeVirtualChat(_history(17))
+        timestamp, sender = parse_pre_plain_text(_history(17)[6][0])
+        cursor = message_key({"timestamp": timestamp, "sender": sender, "text": "msg 6"})
+
+        texts = [m.text for m in iter_history(chat, cursor=cursor)]
+
+        assert texts == [f"msg {i}" for i in range(16, 6, -1)]
+
+    def test_stops_before_since(self):
+        chat = FakeVirtualChat(_history(17))
+
+        texts = [m.text for m in iter_history(chat, since=datetime(2025, 8, 25, 10, 12))]
+
+        assert texts == [f"msg {i}" for i in range(16, 11, -1)]
+
+    def test_max_messages(self):
+        chat = FakeVirtualChat(_history(17))
+
+        assert len(list(iter_history(chat, max_messages=4))) == 4
+
+    def test_is_lazy(self):
+        chat = FakeVirtualChat(_history(17))
+
+        history = iter_history(chat)
+        next(history)
+
+        assert chat.bottom == 17  # nothing scrolled before the first message was consumed
+
+
+class TestGetGroupNames:
+
+    def _names(self, value):
+        with patch('whatsapp_dom.load_dotenv'), patch.dict(os.environ, {'GROUP_NAME': value}):
+            return get_group_names()
+
+    def test_single_name(self):
+        assert self._names("Hebrew course, group 2") == ["Hebrew course, group 2"]
+
+    def test_json_list(self):
+        assert self._names('["Course A", "Course B"]') == ["Course A", "Course B"]
+
+    def test_empty(self):
+        assert self._names("") == []
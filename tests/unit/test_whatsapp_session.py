@@ -0,0 +1,162 @@
+"""
+Tests for the persistent WhatsApp Web session manager
+"""
+
+import pytest
+from unittest.mock import Mock, patch, PropertyMock, call
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from selenium.common.exceptions import WebDriverException
+from whatsapp_session import (
+    WhatsAppSession, WHATSAPP_URL, driver_factory_from_env,
+    LocalChromeFactory, HeadlessChromeFactory, RemoteGridFactory
+)
+
+
+@pytest.fixture
+def mock_chrome():
+    with patch('whatsapp_session.webdriver.Chrome') as mock_chrome_cls:
+        mock_chrome_cls.side_effect = lambda **kwargs: _make_driver()
+        yield mock_chrome_cls
+
+
+def _make_driver():
+    driver = Mock()
+    driver.window_handles = ['main']
+    driver.current_url = WHATSAPP_URL + '/'
+    driver.execute_cdp_cmd.side_effect = lambda cmd, params: (
+        {"userAgent": "Mozilla/5.0 HeadlessChrome/140.0"} if cmd == "Browser.getVersion" else {}
+    )
+    return driver
+
+
+@pytest.fixture
+def session(tmp_path, mock_chrome):
+    return WhatsAppSession(profile_dir=str(tmp_path / 'profile'))
+
+
+class TestWhatsAppSession:
+
+    def test_first_call_starts_browser_and_loads_whatsapp(self, session, mock_chrome):
+        driver = session.get_driver()
+
+        mock_chrome.assert_called_once()
+        driver.get.assert_called_once_with(WHATSAPP_URL)
+        assert session.just_loaded is True
+
+    def test_profile_dir_is_passed_to_chrome(self, session, mock_chrome):
+        session.get_driver()
+
+        options = mock_chrome.call_args.kwargs['options']
+        assert f"--user-data-dir={session.profile_dir}" in options.arguments
+
+    def test_warm_session_is_reused(self, session, mock_chrome):
+        first = session.get_driver()
+        second = session.get_driver()
+
+        assert first is second
+        assert mock_chrome.call_count == 1
+        assert session.just_loaded is False
+
+    def test_dead_session_reconnects(self, session, mock_chrome):
+        first = session.get_driver()
+        type(first).window_handles = PropertyMock(side_effect=WebDriverException("gone"))
+
+        second = session.get_driver()
+
+        assert second is not first
+        assert mock_chrome.call_count == 2
+        first.quit.assert_called_once()
+        assert session.just_loaded is True
+
+    def test_navigated_away_reloads_without_restart(self, session, mock_chrome):
+        driver = session.get_driver()
+        driver.current_url = 'about:blank'
+        driver.get.reset_mock()
+
+        assert session.get_driver() is driver
+        driver.get.assert_called_once_with(WHATSAPP_URL)
+        assert mock_chrome.call_count == 1
+
+    def test_close_quits_driver(self, session):
+        driver = session.get_driver()
+        session.close()
+
+        driver.quit.assert_called_once()
+        assert session.driver is None
+
+
+class TestDriverFactories:
+
+    def _factory(self, value):
+        with patch('whatsapp_session.load_dotenv'), patch.dict(os.environ, {'SCRAPER_DRIVER': value}):
+            return driver_factory_from_env()
+
+    def test_selected_from_config(self):
+        assert isinstance(self._factory('local'), LocalChromeFactory)
+        assert isinstance(self._factory('Headless'), HeadlessChromeFactory)
+        assert isinstance(self._factory('remote'), RemoteGridFactory)
+
+    def test_unknown_driver(self):
+        with pytest.raises(ValueError, match='SCRAPER_DRIVER'):
+            self._factory('firefox')
+
+    def test_factory_arguments_reach_chrome(self, tmp_path, mock_chrome):
+        session = WhatsAppSession(HeadlessChromeFactory(), profile_dir=str(tmp_path / 'profile'))
+        session.get_driver()
+
+        assert "--headless=new" in mock_chrome.call_args.kwargs['options'].arguments
+
+    def test_headless_blocks_media_and_hides_headless_user_agent(self, tmp_path, mock_chrome):
+        session = WhatsAppSession(HeadlessChromeFactory(), profile_dir=str(tmp_path / 'profile'))
+        driver = session.get_driver()
+
+        cdp = {c.args[0]: c.args[1] for c in driver.execute_cdp_cmd.call_args_list}
+        assert cdp["Network.setUserAgentOverride"] == {"userAgent": "Mozilla/5.0 Chrome/140.0"}
+        assert "*.woff2" in cdp["Network.setBlockedURLs"]["urls"]
+        # Blocking is in place before WhatsApp Web starts loading
+        assert driver.method_calls.index(call.get(WHATSAPP_URL)) > driver.method_calls.index(
+            call.execute_cdp_cmd("Network.setBlockedURLs", cdp["Network.setBlockedURLs"])
+        )
+
+    def test_remote_factory_uses_grid(self, tmp_path):
+        with patch('whatsapp_session.webdriver.Remote') as mock_remote:
+            mock_remote.side_effect = lambda **kwargs: _make_driver()
+            session = WhatsAppSession(RemoteGridFactory('http://grid:4444/wd/hub'), profile_dir=str(tmp_path / 'p'))
+            session.get_driver()
+
+        assert mock_remote.call_args.kwargs['command_executor'] == 'http://grid:4444/wd/hub'
+        assert "--no-sandbox" in mock_remote.call_args.kwargs['options'].arguments
+        assert not (tmp_path / 'p').exists()
+
+
+class TestBrowserPeakRss:
+
+    def _proc(self, root, pid, ppid, hwm_kb, comm="chrome"):
+        directory = root / str(pid)
+        directory.mkdir()
+        (directory / "stat").write_text(f"{pid} ({comm}) S {ppid} 1 1 0")
+        (directory / "status").write_text(f"Name:\t{comm}\nVmHWM:\t  {hwm_kb} kB\nVmRSS:\t 1 kB\n")
+
+    def test_sums_high_water_marks_of_browser_tree(self, tmp_path, session):
+        proc = tmp_path / "proc"
+        proc.mkdir()
+        self._proc(proc, 100, 1, 10_000, "chromedriver")
+        self._proc(proc, 101, 100, 200_000)
+        self._proc(proc, 102, 101, 300_000, "chrome (renderer)")
+        self._proc(proc, 103, 101, 50_000)
+        self._proc(proc, 200, 1, 999_999, "python")
+
+        session.get_driver()
+        session.driver.service.process.pid = 100
+
+        assert session.browser_peak_rss(str(proc)) == 550_000 * 1024
+
+    def test_remote_driver_has_no_local_process(self, session):
+        session.get_driver()
+        session.driver.service = None
+
+        assert session.browser_peak_rss() is None
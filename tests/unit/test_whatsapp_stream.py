@@ -0,0 +1,108 @@
+"""
+Tests for MutationObserver-based message streaming
+"""
+
+from unittest.mock import Mock, patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+from selenium.common.exceptions import WebDriverException
+from whatsapp_stream import stream_messages, INSTALL_OBSERVER_JS, DRAIN_JS
+from message_cursor import message_key
+from records import RawMessage
+
+META = "[20:1{}, 25/08/2025] +972 50-123-4567: "
+
+
+def _msg(i):
+    return RawMessage("+972 50-123-4567 ", f"20:1{i}, 25/08/2025", f"m{i}", "G")
+
+
+class FakeSession:
+
+    def __init__(self, drains):
+        self.driver = Mock()
+        self.drains = list(drains)
+        self.driver.execute_script.side_effect = self._execute
+        self.invalidated = 0
+        self.installs = 0
+
+    def _execute(self, script, *args):
+        if script == INSTALL_OBSERVER_JS:
+            self.installs += 1
+            return True
+        if script == DRAIN_JS:
+            result = self.drains.pop(0)
+            if isinstance(result, Exception):
+                raise result
+            return result
+        raise AssertionError("unexpected script")
+
+    def invalidate(self):
+        self.invalidated += 1
+
+
+class TestStreamMessages:
+
+    def setup_method(self):
+        patch('whatsapp_stream.time.sleep').start()
+        self.open = patch('whatsapp_stream.open_group', side_effect=lambda session, name: session.driver).start()
+        self.scrape = patch('whatsapp_stream.read_group').start()
+
+    def teardown_method(self):
+        patch.stopall()
+
+    def test_catch_up_then_drained_batches(self):
+        self.scrape.return_value = [_msg(0)]
+        session = FakeSession([
+            [[[META.format(1), "m1"], [META.format(2), "m2"]], 0],
+            [[], 0],
+        ])
+
+        stream = stream_messages(session, "G", cursor=None)
+
+        assert next(stream) == [_msg(0)]
+        assert next(stream) == [_msg(1), _msg(2)]
+        assert next(stream) == []
+        self.scrape.assert_called_once_with(session.driver, "G", None)
+
+    def test_reload_catches_up_from_last_streamed_message(self):
+        self.scrape.side_effect = [[], [_msg(3)]]
+        session = FakeSession([
+            [[[META.format(2), "m2"]], 0],
+            None,
+        ])
+
+        stream = stream_messages(session, "G")
+        next(stream)
+        next(stream)
+
+        assert next(stream) == [_msg(3)]
+        assert self.scrape.call_args_list[1].args == (session.driver, "G", message_key(_msg(2)))
+
+    def test_browser_error_reconnects(self):
+        self.scrape.side_effect = [[], [_msg(1)]]
+        session = FakeSession([WebDriverException("crashed")])
+
+        stream = stream_messages(session, "G")
+        next(stream)
+
+        assert next(stream) == [_msg(1)]
+        assert session.invalidated == 1
+
+    def test_observer_is_installed_before_the_catch_up_read(self):
+        """A message rendered between the install and the read is yielded once"""
+        session = FakeSession([
+            [[[META.format(1), "m1"], [META.format(2), "m2"]], 0],
+            [[[META.format(1), "m1"]], 0],
+        ])
+        self.scrape.side_effect = lambda driver, name, cursor: [_msg(0), _msg(1)] if session.installs else []
+
+        stream = stream_messages(session, "G")
+
+        assert next(stream) == [_msg(0), _msg(1)]
+        assert next(stream) == [_msg(2)]
+        # Only the first drain overlaps the catch-up read
+        assert next(stream) == [_msg(1)]
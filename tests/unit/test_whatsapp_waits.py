@@ -0,0 +1,102 @@
+"""
+Tests for readiness-driven browser waits and the wait profiler
+"""
+
+from unittest.mock import Mock, patch
+import sys
+import os
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '../..')))
+
+import time_log
+from whatsapp_waits import message_list_stable, chat_opened
+
+
+class TestMessageListStable:
+
+    def _driver(self, states):
+        driver = Mock()
+        driver.execute_script.side_effect = states
+        return driver
+
+    def test_not_stable_while_list_is_growing(self):
+        driver = self._driver([[5, 'a'], [8, 'b'], [9, 'c']])
+        condition = message_list_stable(quiet_period=1.0)
+
+        with patch('whatsapp_waits.time.monotonic', side_effect=[0.0, 2.0, 4.0]):
+            assert condition(driver) is False
+            assert condition(driver) is False
+            assert condition(driver) is False
+
+    def test_stable_after_quiet_period(self):
+        driver = self._driver([[5, 'a'], [5, 'a'], [5, 'a']])
+        condition = message_list_stable(quiet_period=1.0)
+
+        with patch('whatsapp_waits.time.monotonic', side_effect=[0.0, 0.5, 1.2]):
+            assert condition(driver) is False
+            assert condition(driver) is False
+            assert condition(driver) is True
+
+
+class TestChatOpened:
+
+    def _driver(self, *states):
+        driver = Mock()
+        driver.execute_script.side_effect = list(states)
+        return driver
+
+    def test_waits_for_the_header_of_the_requested_group(self):
+        """The previous chat is still on screen right after the click"""
+        driver = self._driver(["Course AParticipants", 20, "a"], [None, 0, ""], ["Course BParticipants", 12, "b"])
+        condition = chat_opened("Course B", previous_state=("Course AParticipants", 20, "a"))
+
+        assert condition(driver) is False
+        assert condition(driver) is False
+        assert condition(driver) is True
+
+    def test_chat_without_text_messages_on_a_cold_session(self):
+        """Only media or system messages on screen: the new header is enough"""
+        driver = self._driver([None, 0, ""], ["Course B", 0, ""])
+        condition = chat_opened("Course B", previous_state=(None, 0, ""))
+
+        assert condition(driver) is False
+        assert condition(driver) is True
+
+    def test_reopening_the_open_chat_waits_for_its_messages(self):
+        driver = self._driver(["Course B", 0, ""], ["Course B", 4, "b"])
+        condition = chat_opened("Course B", previous_state=("Course B", 0, ""))
+
+        assert condition(driver) is False
+        assert condition(driver) is True
+
+
+class TestTimedWait:
+
+    def setup_method(self):
+        time_log.wait_times.clear()
+
+    def test_records_duration_and_returns_result(self):
+        with patch('time_log.time.time', side_effect=[10.0, 12.5]):
+            result = time_log.timed_wait("login", lambda: "ready")
+
+        assert result == "ready"
+        assert time_log.wait_times == {"login": 2.5}
+
+    def test_accumulates_and_records_on_timeout(self):
+        def timeout():
+            raise TimeoutError()
+
+        with patch('time_log.time.time', side_effect=[0.0, 1.0, 5.0, 10.0]):
+            time_log.timed_wait("search_results", lambda: None)
+            try:
+                time_log.timed_wait("search_results", timeout)
+            except TimeoutError:
+                pass
+
+        assert time_log.wait_times == {"search_results": 6.0}
+
+    def test_summary_resets_wait_profile(self):
+        time_log.wait_times["chat_pane"] = 1.0
+        time_log.table_log({"open_whatsapp": 3.0}, 3.0)
+
+        assert time_log.wait_times == {}
@@ -1,13 +1,88 @@
+import atexit
 import logging
+import queue
+import threading
 import time
-from logging.handlers import RotatingFileHandler
+from logging.handlers import RotatingFileHandler, QueueHandler, QueueListener
 import os
 from dotenv import load_dotenv
 
 
+# Third-party loggers kept at INFO when LOG_LEVEL=DEBUG, so debug runs show this app's output
+_QUIET_LOGGERS = ("urllib3", "selenium", "google", "googleapiclient", "gspread")
+
+
+class DroppingQueueHandler(QueueHandler):
+    """
+    QueueHandler for a bounded queue. When the queue is full, records below
+    WARNING are dropped and counted in `dropped` instead of blocking the
+    caller; warnings and errors wait up to a second for room.
+    """
+
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            try:
+                if record.levelno < logging.WARNING:
+                    raise
+                self.queue.put(record, timeout=1)
+            except queue.Full:
+                self.dropped += 1
+
+
+class _BlockingStopListener(QueueListener):
+    """QueueListener whose stop() waits for room in a full queue instead of raising queue.Full."""
+
+    def enqueue_sentinel(self):
+        # The listener thread is still draining, so the queue frees up
+        self.queue.put(self._sentinel)
+
+
+# Background logging thread and its QueueHandler, while async logging is on
+_listener = None
+_queue_handler = None
+
+
+def start_log_listener(handlers, queue_size):
+    """
+    Serve `handlers` from a background thread through a queue of at most
+    `queue_size` records. Returns the QueueHandler to attach in their place;
+    the queue is flushed at exit (or by flush_logs()).
+    """
+    global _listener, _queue_handler
+    flush_logs()
+    _queue_handler = DroppingQueueHandler(queue.Queue(queue_size))
+    # The message is rendered on the calling thread (args may change later), the line format by the listener
+    _queue_handler.setFormatter(logging.Formatter("%(message)s"))
+    _listener = _BlockingStopListener(_queue_handler.queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    return _queue_handler
+
+
+def flush_logs():
+    """Write out every queued record and stop the background logging thread."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+atexit.register(flush_logs)
+
+
 def setup_handler():
     load_dotenv()
     CSV_DOWNLOAD = os.getenv("CSV_DOWNLOAD")
+    # DEBUG adds the per-message and per-row trace of the formatter and the Sheets stage
+    LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO").strip().upper()
+    level = logging.getLevelName(LOG_LEVEL)
+    if not isinstance(level, int):
+        raise ValueError(f"Unknown LOG_LEVEL '{LOG_LEVEL}', expected DEBUG, INFO, WARNING or ERROR")
     LOG_FILE = os.path.join(CSV_DOWNLOAD, "runtime.log")
     os.makedirs(CSV_DOWNLOAD, exist_ok=True)
 
@@ -20,6 +95,7 @@ def setup_handler():
         delay=True
     )
     handler.mode = "a"
+    handler.setFormatter(logging.Formatter("%(asctime)s - %(levelname)s - %(message)s"))
 
     # Console logging with UTF-8 (for emojis)
     console = logging.StreamHandler()
@@ -29,12 +105,22 @@ def setup_handler():
     except Exception:
         pass
 
+    # LOG_ASYNC: file and console writes happen on a background thread, behind a queue of
+    # LOG_QUEUE_SIZE records (debug/info records are dropped when it is full, see DroppingQueueHandler)
+    handlers = [handler, console]
+    if os.getenv("LOG_ASYNC", "true").strip().lower() in ("1", "true", "yes"):
+        handlers = [start_log_listener(handlers, int(os.getenv("LOG_QUEUE_SIZE", "10000")))]
+
     logging.basicConfig(
-        level=logging.INFO,
+        level=level,
         format="%(asctime)s - %(levelname)s - %(message)s",
-        handlers=[handler, console]
+        handlers=handlers
     )
 
+    if level < logging.INFO:
+        for name in _QUIET_LOGGERS:
+            logging.getLogger(name).setLevel(logging.INFO)
+
     logging.info(f"Log file initialized at: {LOG_FILE}")
 
 
@@ -53,12 +139,108 @@ def timed(label, func, *args, **kwargs):
         raise
 
 
+# Time spent in browser waits during the current run, keyed by wait label
+wait_times = {}
+_wait_lock = threading.Lock()
+
+
+def timed_wait(label, func, *args, **kwargs):
+    """Run a blocking wait and add its actual duration to the run's wait profile."""
+    start = time.time()
+    try:
+        return func(*args, **kwargs)
+    finally:
+        elapsed = time.time() - start
+        # Grid workers wait in parallel threads
+        with _wait_lock:
+            wait_times[label] = wait_times.get(label, 0.0) + elapsed
+        logging.info(f"wait {label} took {elapsed:.2f}s")
+
+
+# Other per-run measurements for the summary (e.g. browser memory), keyed by label
+run_metrics = {}
+
+
+def record_metric(label, value):
+    """Add a preformatted value to the run summary."""
+    run_metrics[label] = value
+
+
+def count_metric(label, amount=1):
+    """Add `amount` to a counter of the run summary."""
+    with _wait_lock:
+        run_metrics[label] = run_metrics.get(label, 0) + amount
+
+
+# Throughput of the message pipeline stages during the current run, keyed by stage label
+stage_stats = {}
+
+
+def record_stage(label, items, elapsed, max_queue=None):
+    """
+    Add a pipeline stage's item count and busy time to the run summary, with
+    the deepest its input queue got (None for stages without one).
+    """
+    with _wait_lock:
+        stats = stage_stats.setdefault(label, {"items": 0, "elapsed": 0.0, "max_queue": None})
+        stats["items"] += items
+        stats["elapsed"] += elapsed
+        if max_queue is not None:
+            stats["max_queue"] = max(stats["max_queue"] or 0, max_queue)
+    rate = items / elapsed if elapsed > 0 else 0.0
+    queue_info = f", queue peak {max_queue}" if max_queue is not None else ""
+    logging.info(f"stage {label}: {items} items in {elapsed:.2f}s ({rate:.1f}/s{queue_info})")
+
+
+def _log_stages():
+    """Log items, busy time, throughput and queue peak per pipeline stage, and reset them."""
+    if not stage_stats:
+        return
+    logging.info("-" * 50)
+    logging.info("PIPELINE STAGES")
+    for name, stats in stage_stats.items():
+        rate = stats["items"] / stats["elapsed"] if stats["elapsed"] > 0 else 0.0
+        queue_peak = "-" if stats["max_queue"] is None else stats["max_queue"]
+        logging.info(
+            f" - {name:<15} {stats['items']:>6} items {stats['elapsed']:>7.2f}s "
+            f"{rate:>9.1f}/s  queue peak {queue_peak}"
+        )
+    stage_stats.clear()
+
+
+def _log_metrics():
+    if _queue_handler is not None and _queue_handler.dropped:
+        record_metric("log records dropped", _queue_handler.dropped)
+        _queue_handler.dropped = 0
+    if not run_metrics:
+        return
+    logging.info("-" * 50)
+    logging.info("RUN METRICS")
+    for name, value in run_metrics.items():
+        logging.info(f" - {name:<25} {value:>8}")
+    run_metrics.clear()
+
+
+def _log_waits():
+    """Log the wait profile, slowest first, and reset it for the next run."""
+    if not wait_times:
+        return
+    logging.info("-" * 50)
+    logging.info("BROWSER WAITS")
+    for name, t in sorted(wait_times.items(), key=lambda item: item[1], reverse=True):
+        logging.info(f" - {name:<25} {t:>6.2f}s")
+    wait_times.clear()
+
+
 def table_log(runtimes, total_elapsed):
     # === Summary Table ===
     logging.info("\n" + "-" * 50)
     logging.info("SUMMARY OF TASK RUNTIMES")
     for name, t in runtimes.items():
         logging.info(f" - {name:<25} {t:>6.2f}s")
+    _log_stages()
+    _log_waits()
+    _log_metrics()
     logging.info("-" * 50)
     logging.info(f"TOTAL RUNTIME: {total_elapsed:.2f}s")
     logging.info("-" * 50)
@@ -70,6 +252,9 @@ def no_messages(total_elapsed: float):
     logging.info("No messages were processed.")
     logging.info("The Selenium process did not retrieve any messages from WhatsApp.")
     logging.info(f"Total runtime: {total_elapsed:.2f} seconds")
+    _log_stages()
+    _log_waits()
+    _log_metrics()
     logging.info("-" * 70)
     logging.info("Script ended early — no messages to process.")
     logging.info("=" * 70 + "\n")
\ No newline at end of file
@@ -0,0 +1,71 @@
+from datetime import datetime
+from dotenv import load_dotenv
+import os
+import re
+
+# "HH:MM, date" as it appears in data-pre-plain-text, e.g. "20:15, 25/08/2025"
+# Groups: hour, minute, first date field, second date field, year
+TIMESTAMP_PATTERN = r"\s*(\d{1,2}):(\d{1,2}),\s+(\d{1,2})/(\d{1,2})/(\d{4})\s*"
+_TIMESTAMP = re.compile(TIMESTAMP_PATTERN)
+
+ORDERS = ("auto", "MDY", "DMY")
+
+
+def _build(hour, minute, month, day, year):
+    try:
+        return datetime(year, month, day, hour, minute)
+    except ValueError:
+        return None
+
+
+class TimestampParser:
+    """
+    Parser for WhatsApp's "HH:MM, date" message timestamps.
+
+    `order` (TIMESTAMP_ORDER by default) fixes the date field order: 'DMY',
+    'MDY', or 'auto'. In auto mode an ambiguous date such as 05/08/2025 is
+    read month-first like before, until a date that only fits one order
+    (25/08/2025 is day-first) is seen: from then on this parser uses that
+    order for every timestamp. Use one parser per run, so a group's locale is
+    detected once.
+    """
+
+    def __init__(self, order=None):
+        if order is None:
+            load_dotenv()
+            order = os.getenv("TIMESTAMP_ORDER", "auto")
+        order = order.strip()
+        if order.lower() == "auto":
+            order = "auto"
+        else:
+            order = order.upper()
+        if order not in ORDERS:
+            raise ValueError(f"Unknown TIMESTAMP_ORDER '{order}', expected one of: {', '.join(ORDERS)}")
+        self.order = order
+        self.detected = None
+
+    def parse(self, timestamp):
+        """Return the timestamp as a datetime, or None if it does not parse."""
+        match = _TIMESTAMP.fullmatch(timestamp)
+        if match is None:
+            return None
+        hour, minute, first, second, year = map(int, match.groups())
+
+        order = self.detected or self.order
+        if order == "MDY":
+            return _build(hour, minute, first, second, year)
+        if order == "DMY":
+            return _build(hour, minute, second, first, year)
+
+        month_first = _build(hour, minute, first, second, year)
+        day_first = _build(hour, minute, second, first, year)
+        if month_first is None and day_first is not None:
+            self.detected = "DMY"
+        elif day_first is None and month_first is not None:
+            self.detected = "MDY"
+        return month_first or day_first
+
+
+def parse_timestamp(timestamp, order="auto"):
+    """One-off parse: month-first, then day-first in auto mode. Returns None if neither fits."""
+    return TimestampParser(order).parse(timestamp)
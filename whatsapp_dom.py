@@ -0,0 +1,162 @@
+from selenium.webdriver.common.by import By
+from dotenv import load_dotenv
+import json
+import os
+import time
+
+from timestamp_parser import TimestampParser
+from message_cursor import message_key
+from records import RawMessage
+
+# Returns [[data-pre-plain-text, text], ...] for the last `limit` messages in one round trip
+# (every rendered message when `limit` is null)
+EXTRACT_MESSAGES_JS = """
+const nodes = document.querySelectorAll('[data-pre-plain-text]');
+const limit = arguments[0] || nodes.length;
+const rows = [];
+for (let i = Math.max(0, nodes.length - limit); i < nodes.length; i++) {
+    const spans = nodes[i].querySelectorAll('span.selectable-text span');
+    rows.push([
+        nodes[i].getAttribute('data-pre-plain-text'),
+        Array.from(spans, span => span.innerText).join(' ')
+    ]);
+}
+return rows;
+"""
+
+# Scroll the chat pane up by most of a screen. Returns true if it was already at the top.
+SCROLL_UP_JS = """
+const first = document.querySelector('#main [data-pre-plain-text]');
+let pane = first;
+while (pane && pane !== document.body) {
+    const overflow = getComputedStyle(pane).overflowY;
+    if ((overflow === 'auto' || overflow === 'scroll') && pane.scrollHeight > pane.clientHeight) break;
+    pane = pane.parentElement;
+}
+if (!pane || pane === document.body) return true;
+const atTop = pane.scrollTop === 0;
+pane.scrollTop = Math.max(0, pane.scrollTop - pane.clientHeight * 0.8);
+return atTop;
+"""
+
+
+def get_group_names():
+    """
+    Groups to scrape from GROUP_NAME: a JSON list like PRACTICE_WORDS,
+    e.g. ["Course A", "Course B"], or a single plain group name.
+    """
+    load_dotenv()
+    value = (os.getenv("GROUP_NAME") or "").strip()
+    if value.startswith("["):
+        try:
+            return [name for name in json.loads(value) if name]
+        except (json.JSONDecodeError, TypeError):
+            print("Warning: Could not parse GROUP_NAME as a list, using it as one group name")
+    return [value] if value else []
+
+
+def parse_pre_plain_text(meta):
+    """
+    Split a data-pre-plain-text attribute into (timestamp, sender).
+    Example: "[20:15, 25/08/2025] +972 50-123-4567: " -> ("20:15, 25/08/2025", "+972 50-123-4567 ")
+    """
+    if not meta:
+        return "?", "?"
+    meta = meta.strip("[]")
+    timestamp, sender = meta.split("] ")[0], meta.split("] ")[1].replace(":", "")
+    return timestamp, sender
+
+
+def _extract_with_script(driver, limit):
+    """All messages in a single execute_script call, regardless of window size."""
+    message_data = []
+    for meta, text in driver.execute_script(EXTRACT_MESSAGES_JS, limit) or []:
+        try:
+            timestamp, sender = parse_pre_plain_text(meta)
+            message_data.append(RawMessage(sender, timestamp, text or ""))
+        except Exception as e:
+            print("Error reading message:", e)
+    return message_data
+
+
+def _extract_with_elements(driver, limit):
+    """Legacy path: several WebDriver round trips per message."""
+    messages = driver.find_elements(By.CSS_SELECTOR, '[data-pre-plain-text]')
+    last_messages = messages[-limit:] if len(messages) >= limit else messages
+
+    message_data = []
+    for msg in last_messages:
+        try:
+            timestamp, sender = parse_pre_plain_text(msg.get_attribute("data-pre-plain-text"))
+
+            # Extract message text (descendant spans)
+            text_elems = msg.find_elements(By.CSS_SELECTOR, 'span.selectable-text span')
+            text = " ".join([t.text for t in text_elems]) if text_elems else ""
+
+            message_data.append(RawMessage(sender, timestamp, text))
+        except Exception as e:
+            print("Error reading message:", e)
+    return message_data
+
+
+def read_messages(driver, limit=20, mode=None):
+    """
+    Read the last `limit` messages of the open chat as RawMessage records.
+    EXTRACTION_MODE selects 'js' (default, one round trip) or 'elements'
+    (per-element WebDriver calls, kept as a fallback).
+    """
+    if mode is None:
+        load_dotenv()
+        mode = os.getenv("EXTRACTION_MODE", "js").strip().lower()
+
+    if mode == "elements":
+        return _extract_with_elements(driver, limit)
+    return _extract_with_script(driver, limit)
+
+
+def iter_history(driver, cursor=None, since=None, max_messages=None, scroll_pause=0.5, max_idle_scrolls=3):
+    """
+    Yield messages of the open chat newest first, scrolling the pane upward as it goes.
+
+    Stops at the first message matching `cursor`, the first message older than
+    the `since` datetime, after `max_messages`, or when scrolling stops revealing
+    new messages. WhatsApp virtualizes the message list, so only the rendered
+    window is read per step and only the previous window's keys are kept for
+    de-duplication: memory stays bounded however far back the scroll goes.
+    """
+    previous_keys = set()
+    yielded = 0
+    idle_scrolls = 0
+    timestamp_parser = TimestampParser() if since is not None else None
+
+    while True:
+        window = _extract_with_script(driver, None)
+        window_keys = set()
+        new_in_window = 0
+
+        for message in reversed(window):
+            key = message_key(message)
+            window_keys.add(key)
+            if key in previous_keys:
+                continue
+
+            if cursor is not None and key == cursor:
+                return
+            if since is not None:
+                timestamp_dt = timestamp_parser.parse(message.timestamp)
+                if timestamp_dt is not None and timestamp_dt < since:
+                    return
+
+            yield message
+            new_in_window += 1
+            yielded += 1
+            if max_messages is not None and yielded >= max_messages:
+                return
+
+        idle_scrolls = idle_scrolls + 1 if new_in_window == 0 else 0
+        if idle_scrolls >= max_idle_scrolls:
+            return
+
+        previous_keys = window_keys
+        driver.execute_script(SCROLL_UP_JS)
+        time.sleep(scroll_pause)
@@ -0,0 +1,218 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.webdriver.common.keys import Keys
+from selenium.webdriver import ActionChains
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from dotenv import load_dotenv
+import logging
+import os
+
+from whatsapp_session import WhatsAppSession
+from whatsapp_dom import read_messages, iter_history, get_group_names
+from message_cursor import messages_after, cursor_for
+from whatsapp_waits import wait_for_login, wait_for_chat_ready, chat_state
+from time_log import timed_wait, record_metric
+
+logger = logging.getLogger(__name__)
+
+
+def _load_whatsapp(session):
+    """Get a live driver from the session, waiting for the login if WhatsApp Web was just (re)loaded."""
+    driver = session.get_driver()
+    if session.just_loaded:
+        print("Opening WhatsApp Web...")
+        print(session.factory.login_hint)
+        print(f"Waiting for WhatsApp to load (up to {session.factory.login_timeout}s)...")
+
+        # Wait for chat list to appear (indicates successful login)
+        try:
+            wait_for_login(driver, session.factory.login_timeout)
+            print("WhatsApp Web loaded successfully!")
+        except TimeoutException:
+            print("Timeout waiting for WhatsApp to load. Please ensure QR code was scanned.")
+            raise
+    else:
+        print("Reusing open WhatsApp Web session")
+    return driver
+
+
+def _record_browser_memory(session):
+    """Put the local browser's peak RSS into the run summary."""
+    peak = session.browser_peak_rss()
+    if peak is not None:
+        record_metric("browser_peak_rss", f"{peak / 2**20:.0f} MB")
+
+
+def _group_names():
+    """GROUP_NAME as a list of groups, failing loudly when it is missing."""
+    group_names = get_group_names()
+
+    # Check if GROUP_NAME exists
+    if not group_names:
+        print("ERROR: GROUP_NAME not found!")
+        print("Available environment variables:")
+        for key in os.environ.keys():
+            if 'GROUP' in key:
+                print(f"  {key} = {os.environ[key]}")
+        raise ValueError("GROUP_NAME environment variable is not set. Please set it with -e GROUP_NAME='your group name'")
+
+    print(f"env group names: {group_names}")
+    return group_names
+
+
+def _open_group(driver, group_name):
+    """Search the group in the sidebar, open it and wait for the chat to settle."""
+    wait = WebDriverWait(driver, 30)
+    # The chat open before the click (warm session, previous group) stays on screen until the switch
+    previous_state = chat_state(driver)
+
+    # --- Focus the LEFT SIDEBAR search box ---
+    search_box = timed_wait("search_box", wait.until, EC.element_to_be_clickable(
+        (By.CSS_SELECTOR, '#side [role="textbox"][contenteditable="true"]')
+    ))
+    search_box.click()
+    search_box.send_keys(Keys.CONTROL, 'a')
+    search_box.send_keys(Keys.BACK_SPACE)
+    search_box.send_keys(group_name)
+
+    # --- Select the first search result ---
+    first_result = None
+    try:
+        results = timed_wait("search_results", WebDriverWait(driver, 5).until,
+            EC.presence_of_all_elements_located(
+                (By.CSS_SELECTOR, 'div[data-testid="cell-frame-container"]')
+            )
+        )
+        if results:
+            first_result = results[0]
+    except TimeoutException:
+        pass
+
+    if not first_result:
+        try:
+            results = timed_wait("search_results", WebDriverWait(driver, 5).until,
+                EC.presence_of_all_elements_located(
+                    (By.XPATH, '//div[@role="listbox"]//div[@role="option"]')
+                )
+            )
+            if results:
+                first_result = results[0]
+        except TimeoutException:
+            pass
+
+    if first_result:
+        driver.execute_script("arguments[0].scrollIntoView({block:'center'});", first_result)
+        driver.execute_script("arguments[0].click();", first_result)
+    else:
+        ActionChains(driver).send_keys(Keys.ARROW_DOWN).send_keys(Keys.ENTER).perform()
+
+    print(f"Opened group: {group_name}")
+    wait_for_chat_ready(driver, group_name=group_name, previous_state=previous_state)
+
+
+def open_group(session, group_name):
+    """Open one group on the session's browser. Returns the driver, with the chat on screen."""
+    driver = _load_whatsapp(session)
+    _open_group(driver, group_name)
+    return driver
+
+
+def read_group(driver, group_name, cursor=None):
+    """The last HISTORY_WINDOW messages of the open chat newer than `cursor`, tagged with the group."""
+    window = int(os.getenv("HISTORY_WINDOW", "20"))
+    return [message._replace(group=group_name) for message in messages_after(read_messages(driver, window), cursor)]
+
+
+def scrape_group(session, group_name, cursor=None):
+    """Open one group on the session's browser and return its new messages, tagged with the group."""
+    return read_group(open_group(session, group_name), group_name, cursor)
+
+
+def iter_whatsapp(session=None, cursors=None, factory=None):
+    """
+    Generator form of open_whatsapp: yields each group's new messages as soon
+    as the group has been read, so the caller can process them while the next
+    group is being opened.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = WhatsAppSession(factory)
+
+    count = 0
+    try:
+        load_dotenv()
+        for group_name in _group_names():
+            for message in scrape_group(session, group_name, cursor_for(cursors, group_name)):
+                count += 1
+                yield message
+
+        print("\nFinished reading messages!")
+        print(f"{count} new messages read")
+
+    except WebDriverException:
+        # Don't hand a broken browser to the next cycle
+        session.invalidate()
+        raise
+
+    finally:
+        _record_browser_memory(session)
+        if owns_session:
+            session.close()
+
+
+def open_whatsapp(session=None, cursors=None, factory=None):
+    """
+    Read the last HISTORY_WINDOW (default 20) messages of every group in
+    GROUP_NAME, walking the groups in turn on one browser and tagging each
+    message with its "group".
+    Pass a WhatsAppSession to reuse a warm browser across runs; without one a
+    session is created from `factory` (SCRAPER_DRIVER by default) for this
+    call and closed when it returns.
+    With cursors (see message_cursor.load_cursors) only messages newer than
+    each group's cursor are returned.
+    """
+    message_data = list(iter_whatsapp(session, cursors, factory))
+
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("=== New messages ===")
+        for m in message_data:
+            logger.debug("%s", m)
+    return message_data
+
+
+def backfill_whatsapp(session=None, cursors=None, since=None, max_messages=None, factory=None):
+    """
+    Generator over the history of every group in GROUP_NAME, newest message
+    first within each group, every message tagged with its "group".
+    Scrolls each chat upward until it reaches the group's cursor, a message
+    older than the `since` datetime or `max_messages`; messages are yielded
+    while scrolling so the caller can process them before the scroll finishes.
+    """
+    owns_session = session is None
+    if owns_session:
+        session = WhatsAppSession(factory)
+
+    count = 0
+    try:
+        load_dotenv()
+        driver = _load_whatsapp(session)
+
+        for group_name in _group_names():
+            _open_group(driver, group_name)
+
+            history = iter_history(driver, cursor=cursor_for(cursors, group_name), since=since, max_messages=max_messages)
+            for message in history:
+                count += 1
+                yield message._replace(group=group_name)
+
+        print(f"\nBackfill finished: {count} messages read")
+
+    except WebDriverException:
+        session.invalidate()
+        raise
+
+    finally:
+        _record_browser_memory(session)
+        if owns_session:
+            session.close()
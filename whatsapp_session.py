@@ -0,0 +1,240 @@
+from selenium import webdriver
+from selenium.webdriver.chrome.options import Options
+from selenium.common.exceptions import WebDriverException
+from dotenv import load_dotenv
+import os
+
+WHATSAPP_URL = "https://web.whatsapp.com"
+DEFAULT_GRID_URL = "http://localhost:4444/wd/hub"
+
+# Media, avatars and fonts are never read by the scraper
+BLOCKED_URL_PATTERNS = [
+    "*.jpg", "*.jpeg", "*.png", "*.gif", "*.webp", "*.svg", "*.ico",
+    "*.mp4", "*.webm", "*.ogg", "*.mp3", "*.opus",
+    "*.woff", "*.woff2", "*.ttf",
+    "*mmg.whatsapp.net*", "*pps.whatsapp.net*", "*media*.whatsapp.net*",
+]
+
+
+class LocalChromeFactory:
+    """Chrome on this machine, with a visible window for the QR scan."""
+
+    name = "local"
+    arguments = []
+    login_timeout = 120
+    login_hint = "Please scan QR code if needed and wait for WhatsApp to load..."
+    local_profile = True
+
+    def create(self, options):
+        return webdriver.Chrome(options=options)
+
+    def prepare(self, driver):
+        """Hook run on a new driver before WhatsApp Web is loaded."""
+
+
+class HeadlessChromeFactory(LocalChromeFactory):
+    """
+    Lean local Chrome: no window, a small viewport, a capped disk cache, and
+    images, media and fonts blocked through CDP so only the app shell and
+    message text are fetched and rendered.
+    There is no way to scan a QR code, so the profile must already be linked
+    (run once with the local driver first).
+    """
+
+    name = "headless"
+    arguments = [
+        "--headless=new",
+        "--window-size=1024,768",
+        "--blink-settings=imagesEnabled=false",
+        "--disk-cache-size=33554432",
+        "--mute-audio",
+        "--disable-extensions",
+        "--disable-background-networking",
+    ]
+    login_hint = "Headless mode: using the already linked Chrome profile..."
+
+    def prepare(self, driver):
+        # WhatsApp Web refuses the HeadlessChrome user agent
+        user_agent = driver.execute_cdp_cmd("Browser.getVersion", {})["userAgent"]
+        driver.execute_cdp_cmd("Network.enable", {})
+        driver.execute_cdp_cmd("Network.setUserAgentOverride", {"userAgent": user_agent.replace("HeadlessChrome", "Chrome")})
+        driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+
+
+class RemoteGridFactory:
+    """A Selenium Grid node, e.g. the selenium/standalone-chrome container."""
+
+    name = "remote"
+    arguments = ["--no-sandbox", "--disable-dev-shm-usage"]
+    login_timeout = 300
+    login_hint = "Please scan QR code via VNC viewer at http://localhost:7900 (password: secret)"
+    local_profile = False
+
+    def __init__(self, grid_url=None):
+        load_dotenv()
+        self.grid_url = grid_url or os.getenv("SELENIUM_GRID_URL", DEFAULT_GRID_URL)
+
+    def create(self, options):
+        return webdriver.Remote(command_executor=self.grid_url, options=options)
+
+    def prepare(self, driver):
+        """Hook run on a new driver before WhatsApp Web is loaded."""
+
+
+DRIVER_FACTORIES = {
+    "local": LocalChromeFactory,
+    "headless": HeadlessChromeFactory,
+    "remote": RemoteGridFactory,
+}
+
+
+def driver_factory_from_env():
+    """The driver factory selected by SCRAPER_DRIVER: local (default), headless or remote."""
+    load_dotenv()
+    name = os.getenv("SCRAPER_DRIVER", "local").strip().lower()
+    if name not in DRIVER_FACTORIES:
+        raise ValueError(f"Unknown SCRAPER_DRIVER '{name}', expected one of: {', '.join(DRIVER_FACTORIES)}")
+    return DRIVER_FACTORIES[name]()
+
+
+def _descendant_pids(root_pid, proc_root="/proc"):
+    """All processes below root_pid (chromedriver -> chrome -> renderers, GPU, ...)."""
+    children = {}
+    for entry in os.listdir(proc_root):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(os.path.join(proc_root, entry, "stat")) as f:
+                stat = f.read()
+        except OSError:
+            continue
+        # The command name may contain spaces and parentheses: parse after the last ')'
+        ppid = int(stat.rsplit(")", 1)[1].split()[1])
+        children.setdefault(ppid, []).append(int(entry))
+
+    pids = []
+    stack = list(children.get(root_pid, []))
+    while stack:
+        pid = stack.pop()
+        pids.append(pid)
+        stack.extend(children.get(pid, []))
+    return pids
+
+
+class WhatsAppSession:
+    """
+    Keeps one logged-in WhatsApp Web driver warm across polling cycles.
+
+    Chrome runs with a persistent user-data-dir (CHROME_PROFILE_DIR, default
+    'whatsapp_session') so the QR login survives browser restarts. The driver
+    is only rebuilt when the health check fails, so a cycle on a warm session
+    skips browser startup and the WhatsApp Web boot entirely.
+    The browser itself comes from a driver factory (see DRIVER_FACTORIES),
+    SCRAPER_DRIVER by default.
+    """
+
+    def __init__(self, factory=None, profile_dir=None):
+        load_dotenv()
+        self.factory = factory or driver_factory_from_env()
+        self.profile_dir = os.path.abspath(profile_dir or os.getenv("CHROME_PROFILE_DIR", "whatsapp_session"))
+        self.driver = None
+        self.just_loaded = False
+        self.starts = 0
+
+    def _build_options(self):
+        chrome_options = Options()
+        chrome_options.add_argument("--disable-notifications")
+        chrome_options.add_argument(f"--user-data-dir={self.profile_dir}")
+        for argument in self.factory.arguments:
+            chrome_options.add_argument(argument)
+        return chrome_options
+
+    def _start(self):
+        """Launch a new browser and load WhatsApp Web."""
+        if self.factory.local_profile:
+            os.makedirs(self.profile_dir, exist_ok=True)
+
+        self.driver = self.factory.create(self._build_options())
+        self.factory.prepare(self.driver)
+
+        self.starts += 1
+        print(f"Started {self.factory.name} browser session #{self.starts} (profile: {self.profile_dir})")
+        self.driver.get(WHATSAPP_URL)
+        self.just_loaded = True
+
+    def is_alive(self):
+        """Cheap health check: the browser answers and still has a window open."""
+        if self.driver is None:
+            return False
+        try:
+            return bool(self.driver.window_handles)
+        except WebDriverException:
+            return False
+
+    def get_driver(self):
+        """
+        Return a live driver on WhatsApp Web, reconnecting only if the old one died.
+        After the call, `just_loaded` tells the caller whether WhatsApp Web was
+        (re)loaded and still needs the login wait.
+        """
+        self.just_loaded = False
+
+        if not self.is_alive():
+            if self.driver is not None:
+                print("Browser session is not responding, reconnecting...")
+                self.invalidate()
+            self._start()
+            return self.driver
+
+        try:
+            on_whatsapp = self.driver.current_url.startswith(WHATSAPP_URL)
+        except WebDriverException:
+            on_whatsapp = False
+
+        if not on_whatsapp:
+            print("Browser navigated away from WhatsApp Web, reloading...")
+            self.driver.get(WHATSAPP_URL)
+            self.just_loaded = True
+
+        return self.driver
+
+    def browser_peak_rss(self, proc_root="/proc"):
+        """
+        Peak resident memory in bytes of the local browser: the sum of the
+        VmHWM high-water marks of every process under chromedriver.
+        Returns None for remote browsers or where /proc is not available.
+        """
+        process = getattr(getattr(self.driver, "service", None), "process", None)
+        if process is None or not os.path.isdir(proc_root):
+            return None
+
+        total_kb = 0
+        for pid in _descendant_pids(process.pid, proc_root):
+            try:
+                with open(os.path.join(proc_root, str(pid), "status")) as f:
+                    for line in f:
+                        if line.startswith("VmHWM:"):
+                            total_kb += int(line.split()[1])
+                            break
+            except (OSError, ValueError):
+                continue
+        return total_kb * 1024
+
+    def invalidate(self):
+        """Drop the current driver so the next get_driver() starts a new one."""
+        if self.driver is not None:
+            try:
+                self.driver.quit()
+            except WebDriverException:
+                pass
+        self.driver = None
+
+    def close(self):
+        self.invalidate()
+        print("Browser closed.")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
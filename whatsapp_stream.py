@@ -0,0 +1,119 @@
+from selenium.common.exceptions import WebDriverException
+import time
+
+from whatsapp_dom import parse_pre_plain_text
+from whatsapp_scraper import open_group, read_group
+from message_cursor import message_key
+from records import RawMessage
+
+# Capture new messages of the open chat into window.__waCapture.buffer.
+# Re-running it on the same chat is a no-op; a new chat pane gets a new observer.
+INSTALL_OBSERVER_JS = """
+const maxBuffer = arguments[0];
+const pane = document.querySelector('#main');
+if (!pane) return false;
+const existing = window.__waCapture;
+if (existing && existing.pane === pane) return true;
+if (existing) existing.observer.disconnect();
+
+const capture = {pane: pane, buffer: [], dropped: 0, seen: new WeakSet()};
+const push = (node) => {
+    if (capture.seen.has(node)) return;
+    capture.seen.add(node);
+    const spans = node.querySelectorAll('span.selectable-text span');
+    capture.buffer.push([
+        node.getAttribute('data-pre-plain-text'),
+        Array.from(spans, span => span.innerText).join(' ')
+    ]);
+    if (capture.buffer.length > maxBuffer) {
+        capture.buffer.shift();
+        capture.dropped++;
+    }
+};
+// Messages already on screen are read by the catch-up read that follows the install
+pane.querySelectorAll('[data-pre-plain-text]').forEach(node => capture.seen.add(node));
+capture.observer = new MutationObserver(mutations => {
+    for (const mutation of mutations) {
+        for (const node of mutation.addedNodes) {
+            if (node.nodeType !== Node.ELEMENT_NODE) continue;
+            if (node.matches('[data-pre-plain-text]')) push(node);
+            node.querySelectorAll('[data-pre-plain-text]').forEach(push);
+        }
+    }
+});
+capture.observer.observe(pane, {childList: true, subtree: true});
+window.__waCapture = capture;
+return true;
+"""
+
+# Hand over and clear the buffer in one round trip; null means the observer is gone (page reloaded)
+DRAIN_JS = """
+const capture = window.__waCapture;
+if (!capture || !document.contains(capture.pane)) return null;
+const rows = capture.buffer;
+const dropped = capture.dropped;
+capture.buffer = [];
+capture.dropped = 0;
+return [rows, dropped];
+"""
+
+
+def _to_messages(rows, group_name):
+    messages = []
+    for meta, text in rows:
+        try:
+            timestamp, sender = parse_pre_plain_text(meta)
+        except Exception as e:
+            print("Error reading message:", e)
+            continue
+        messages.append(RawMessage(sender, timestamp, text or "", group_name))
+    return messages
+
+
+def stream_messages(session, group_name, cursor=None, interval=5.0, max_buffer=5000):
+    """
+    Generator of message batches from an open chat, pushed by a MutationObserver.
+
+    The first batch is a catch-up read of the chat window (everything after
+    `cursor`), then every `interval` seconds the JS buffer is drained and its
+    new messages are yielded (an empty list when nothing arrived).
+    The observer is installed before the catch-up read, so a message rendered
+    in between is in both: the first drain skips what the catch-up yielded.
+    If the browser dies or the page reloads, the chat is reopened and caught up
+    again from the last yielded message, so nothing between the two is lost.
+    The JS buffer holds at most `max_buffer` messages between drains.
+    """
+    observing = False
+    caught_up = set()
+    while True:
+        try:
+            if not observing:
+                driver = open_group(session, group_name)
+                if not driver.execute_script(INSTALL_OBSERVER_JS, max_buffer):
+                    raise WebDriverException("chat pane not found for the message observer")
+                batch = read_group(driver, group_name, cursor)
+                caught_up = {message_key(message) for message in batch}
+                observing = True
+                print(f"Streaming new messages from '{group_name}' every {interval}s")
+            else:
+                time.sleep(interval)
+                drained = session.driver.execute_script(DRAIN_JS)
+                if drained is None:
+                    print("Message observer is gone, reopening the chat...")
+                    observing = False
+                    continue
+                rows, dropped = drained
+                if dropped:
+                    print(f"Warning: stream buffer overflowed, {dropped} messages dropped")
+                batch = [message for message in _to_messages(rows, group_name) if message_key(message) not in caught_up]
+                caught_up = set()
+        except WebDriverException as e:
+            print(f"Browser error while streaming ({e}), reconnecting...")
+            session.invalidate()
+            observing = False
+            time.sleep(interval)
+            continue
+
+        if batch:
+            cursor = message_key(batch[-1])
+        yield batch
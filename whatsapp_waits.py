@@ -0,0 +1,112 @@
+from selenium.webdriver.common.by import By
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+import os
+import time
+
+from time_log import timed_wait
+
+SEARCH_BOX = (By.CSS_SELECTOR, '#side [role="textbox"][contenteditable="true"]')
+CHAT_HEADER = (By.CSS_SELECTOR, '#main header')
+
+# One round trip: how many message nodes are rendered and what the newest one is
+_MESSAGE_LIST_STATE_JS = """
+const nodes = document.querySelectorAll('#main [data-pre-plain-text]');
+const last = nodes.length ? nodes[nodes.length - 1] : null;
+return [nodes.length, last ? last.getAttribute('data-pre-plain-text') + last.textContent.length : ''];
+"""
+
+# The same plus the text of the open chat's header (null while no chat pane is rendered)
+_CHAT_STATE_JS = """
+const header = document.querySelector('#main header');
+const nodes = document.querySelectorAll('#main [data-pre-plain-text]');
+const last = nodes.length ? nodes[nodes.length - 1] : null;
+return [header ? header.textContent : null, nodes.length, last ? last.getAttribute('data-pre-plain-text') + last.textContent.length : ''];
+"""
+
+
+def chat_state(driver):
+    """(header text, message count, newest message) of the open chat, to tell a chat switch apart later."""
+    state = driver.execute_script(_CHAT_STATE_JS)
+    return tuple(state) if state else (None, 0, '')
+
+
+class chat_opened:
+    """
+    Expected condition: the chat pane shows `group_name`.
+    The pane of the previously open chat is still on screen while the switch
+    is in progress, so the header must name the requested group, and the
+    pane must show a message or differ from `previous_state` (chat_state()
+    taken before the click): another header, or another message list. A chat
+    with no text messages on screen (only media or system messages) thus
+    counts as opened once its header replaces the previous one.
+    """
+
+    def __init__(self, group_name, previous_state=None):
+        self.group_name = group_name
+        self.previous_state = previous_state
+
+    def __call__(self, driver):
+        state = chat_state(driver)
+        header, count = state[0], state[1]
+        if header is None or self.group_name not in header:
+            return False
+        if self.previous_state is None:
+            return True
+        previous_header = self.previous_state[0]
+        return count > 0 or header != previous_header or state[1:] != self.previous_state[1:]
+
+
+class message_list_stable:
+    """
+    Expected condition: the rendered message list has not changed for `quiet_period` seconds.
+    WhatsApp streams the chat history in after the pane opens, so the list is
+    only safe to read once the count and the newest message stop moving.
+    """
+
+    def __init__(self, quiet_period=1.0):
+        self.quiet_period = quiet_period
+        self.last_state = None
+        self.stable_since = None
+
+    def __call__(self, driver):
+        state = driver.execute_script(_MESSAGE_LIST_STATE_JS)
+        state = tuple(state) if state else (0, '')
+        now = time.monotonic()
+
+        if state != self.last_state:
+            self.last_state = state
+            self.stable_since = now
+            return False
+
+        return now - self.stable_since >= self.quiet_period
+
+
+def wait_for_login(driver, timeout):
+    """Wait until the chat list sidebar is rendered (WhatsApp Web is logged in and loaded)."""
+    return timed_wait(
+        "login",
+        WebDriverWait(driver, timeout).until,
+        EC.presence_of_element_located(SEARCH_BOX)
+    )
+
+
+def wait_for_chat_ready(driver, timeout=30, quiet_period=None, group_name=None, previous_state=None):
+    """
+    Wait until the opened chat pane is rendered and its message list has settled
+    for `quiet_period` seconds (CHAT_SETTLE_SECONDS, default 1).
+    With `group_name` the pane must show that group first (see chat_opened),
+    not the chat that was open before the click.
+    """
+    if quiet_period is None:
+        quiet_period = float(os.getenv("CHAT_SETTLE_SECONDS", "1.0"))
+    timed_wait(
+        "chat_pane",
+        WebDriverWait(driver, timeout, poll_frequency=0.25).until,
+        chat_opened(group_name, previous_state) if group_name else EC.presence_of_element_located(CHAT_HEADER)
+    )
+    timed_wait(
+        "message_list_stable",
+        WebDriverWait(driver, timeout, poll_frequency=0.25).until,
+        message_list_stable(quiet_period)
+    )